@@ -1,7 +1,7 @@
 """Flask application factory."""
 
 import os
-from flask import Flask, send_from_directory
+from flask import Flask
 from app.config import config
 from app.extensions import db, jwt, cors
 
@@ -33,25 +33,41 @@ def create_app(config_name=None):
     from app.api.outfit import outfit_bp
     from app.api.feedback import feedback_bp
     from app.api.weather import weather_bp
+    from app.api.uploads import uploads_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(wardrobe_bp)
     app.register_blueprint(outfit_bp)
     app.register_blueprint(feedback_bp)
     app.register_blueprint(weather_bp)
+    app.register_blueprint(uploads_bp)
 
-    # Serve uploaded images
-    @app.route('/uploads/<filename>')
-    def uploaded_file(filename):
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    # Request latency hooks and the Prometheus /metrics endpoint
+    from app import metrics
+    metrics.init_app(app)
+
+    # Opt-in per-request profiling (only active when PROFILE_TOKEN is set)
+    from app import profiling
+    profiling.init_app(app)
+
+    # Register CLI commands
+    from app.cli import register_cli
+    register_cli(app)
+
+    # Readiness check endpoint: 503 until warm-up has finished and the DB answers
+    app.extensions['warmup'] = {'status': 'skipped', 'vision_model': 'lazy', 'duration_ms': None}
 
-    # Health check endpoint
     @app.route('/health')
     def health():
-        return {'status': 'ok', 'service': 'StyleSync API'}, 200
+        from app.warmup import readiness
+        is_ready, details = readiness(app)
+        return details, 200 if is_ready else 503
 
     # Create database tables
     with app.app_context():
         db.create_all()
+        from app.schema import add_missing_columns, add_missing_indexes
+        add_missing_columns()
+        add_missing_indexes()
 
     return app
@@ -0,0 +1,369 @@
+"""
+Perceptual colour scoring for the SRA.
+
+Dominant colours are converted once from hex to CIELAB, where Euclidean
+distance (CIE76 delta E) roughly tracks perceived difference: ``#1a1a1a``
+and ``#1b1b1b`` are about 0.3 apart, well under the ~2.3 a person can see.
+Two scores are computed on padded palette arrays of shape (n, MAX_COLORS, 3):
+
+- ``harmony_matrix``: how well each top's palette goes with each bottom's
+  (neutrals go with anything; analogous, complementary and triadic hues
+  score above clashing ones; some lightness contrast is rewarded).
+- ``match_totals``: a soft version of "this colour appears in a liked
+  outfit", counting near shades as partial matches.
+
+Harmony depends only on the garments, so ``PairMatrixCache`` keeps a
+top x bottom harmony matrix per user and updates it a row or column at a
+time as items are added, re-analysed or deleted. Ranking a wardrobe is then
+a lookup plus the per-request preference adjustment.
+"""
+
+import logging
+import threading
+from functools import lru_cache
+from collections import OrderedDict, namedtuple
+from app.colors import NO_COLOR
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy not available - falling back to exact colour matching")
+
+# VAA extracts three dominant colours per garment
+MAX_COLORS = 3
+
+# Delta E at which two colours stop counting as the same shade
+MATCH_DELTA_E = 10.0
+# Below this chroma a colour is treated as a neutral (black, grey, white, beige)
+NEUTRAL_CHROMA = 12.0
+# Lightness difference that earns the full contrast bonus
+CONTRAST_SCALE = 40.0
+# Harmony assumed for pairs where either item has no colours
+NO_COLOR_HARMONY = 0.5
+HUE_FLOOR = 0.25
+
+# Rows processed per block, bounding the (rows, cols, K, K) temporaries
+_BLOCK_ROWS = 256
+
+# sRGB (D65) -> XYZ, and the D65 reference white
+_SRGB_TO_XYZ = (
+    (0.4124564, 0.3575761, 0.1804375),
+    (0.2126729, 0.7151522, 0.0721750),
+    (0.0193339, 0.1191920, 0.9503041),
+)
+_WHITE_D65 = (0.95047, 1.0, 1.08883)
+
+
+def rgb_to_lab(rgb):
+    """Convert sRGB values in 0-255 (array of shape (..., 3)) to CIELAB."""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ np.array(_SRGB_TO_XYZ).T / np.array(_WHITE_D65)
+    delta = 6 / 29
+    f = np.where(xyz > delta ** 3, np.cbrt(xyz), xyz / (3 * delta ** 2) + 4 / 29)
+    return np.stack([
+        116 * f[..., 1] - 16,
+        500 * (f[..., 0] - f[..., 1]),
+        200 * (f[..., 1] - f[..., 2]),
+    ], axis=-1)
+
+
+@lru_cache(maxsize=4096)
+def hex_to_lab(hex_color):
+    """CIELAB (L, a, b) tuple for a hex colour, or None if it does not parse."""
+    try:
+        value = hex_color.lstrip('#')
+        if len(value) != 6:
+            return None
+        rgb = [int(value[i:i + 2], 16) for i in (0, 2, 4)]
+    except (ValueError, AttributeError):
+        return None
+    return tuple(float(v) for v in rgb_to_lab(rgb))
+
+
+def palettes_to_lab(palettes):
+    """
+    Convert hex palettes to padded Lab arrays.
+
+    Returns:
+        tuple of (lab float32 (n, MAX_COLORS, 3), mask bool (n, MAX_COLORS))
+    """
+    lab = np.zeros((len(palettes), MAX_COLORS, 3), dtype=np.float32)
+    mask = np.zeros((len(palettes), MAX_COLORS), dtype=bool)
+    for i, colors in enumerate(palettes):
+        k = 0
+        for color in colors or []:
+            value = hex_to_lab(color)
+            if value is None:
+                continue
+            lab[i, k] = value
+            mask[i, k] = True
+            k += 1
+            if k == MAX_COLORS:
+                break
+    return lab, mask
+
+
+def packed_to_lab(packed):
+    """
+    Convert packed 0xRRGGBB colours (int array (n, MAX_COLORS), NO_COLOR
+    padded at the end) to padded Lab arrays in one vectorised pass.
+
+    Returns:
+        tuple of (lab float32 (n, MAX_COLORS, 3), mask bool (n, MAX_COLORS))
+    """
+    packed = np.asarray(packed, dtype=np.int64)
+    mask = packed != NO_COLOR
+    rgb = np.stack([(packed >> 16) & 255, (packed >> 8) & 255, packed & 255], axis=-1)
+    lab = rgb_to_lab(rgb).astype(np.float32)
+    lab[~mask] = 0
+    return lab, mask
+
+
+def items_to_lab(items):
+    """Padded Lab arrays for wardrobe items' dominant colours, from their packed values."""
+    packed = np.full((len(items), MAX_COLORS), NO_COLOR, dtype=np.int64)
+    for i, item in enumerate(items):
+        colors = item.get_packed_colors()[:MAX_COLORS]
+        packed[i, :len(colors)] = colors
+    return packed_to_lab(packed)
+
+
+def _color_harmony(lab_a, lab_b):
+    """Harmony in [0, 1] of colour pairs, broadcasting Lab arrays (..., 3)."""
+    chroma_a = np.hypot(lab_a[..., 1], lab_a[..., 2])
+    chroma_b = np.hypot(lab_b[..., 1], lab_b[..., 2])
+    hue_a = np.degrees(np.arctan2(lab_a[..., 2], lab_a[..., 1]))
+    hue_b = np.degrees(np.arctan2(lab_b[..., 2], lab_b[..., 1]))
+    dh = np.abs(hue_a - hue_b) % 360
+    dh = np.minimum(dh, 360 - dh)
+
+    hue_term = np.maximum.reduce([
+        np.exp(-(dh / 25) ** 2),                 # analogous / tonal
+        0.85 * np.exp(-((dh - 180) / 25) ** 2),  # complementary
+        0.6 * np.exp(-((dh - 120) / 15) ** 2),   # triadic
+        np.full_like(dh, HUE_FLOOR),
+    ])
+    neutral = (chroma_a < NEUTRAL_CHROMA) | (chroma_b < NEUTRAL_CHROMA)
+    hue_term = np.where(neutral, 1.0, hue_term)
+    contrast = np.clip(np.abs(lab_a[..., 0] - lab_b[..., 0]) / CONTRAST_SCALE, 0, 1)
+    return 0.75 * hue_term + 0.25 * contrast
+
+
+def harmony_matrix(lab_a, mask_a, lab_b, mask_b):
+    """
+    Palette harmony between every item of a and every item of b.
+
+    Each item pair scores the mean harmony over its colour pairs.
+
+    Returns:
+        float32 array of shape (len(a), len(b))
+    """
+    out = np.full((len(lab_a), len(lab_b)), NO_COLOR_HARMONY, dtype=np.float32)
+    if not len(lab_a) or not len(lab_b):
+        return out
+    for start in range(0, len(lab_a), _BLOCK_ROWS):
+        block = slice(start, start + _BLOCK_ROWS)
+        pair = _color_harmony(lab_a[block, None, :, None, :], lab_b[None, :, None, :, :])
+        weight = mask_a[block, None, :, None] & mask_b[None, :, None, :]
+        count = weight.sum(axis=(2, 3))
+        total = (pair * weight).sum(axis=(2, 3))
+        np.divide(total, count, out=out[block], where=count > 0)
+    return out
+
+
+def match_totals(lab_a, mask_a, lab_b, mask_b, weights_b=None):
+    """
+    Soft count of colour matches of each item of a against all items of b.
+
+    For every colour of an a-item and every b-item, the closest b colour
+    contributes 1 for the same shade (times the b-item's weight, if given),
+    falling to 0 at MATCH_DELTA_E.
+
+    Returns:
+        float32 array of shape (len(a),)
+    """
+    totals = np.zeros(len(lab_a), dtype=np.float32)
+    if not len(lab_a) or not len(lab_b):
+        return totals
+    for start in range(0, len(lab_b), _BLOCK_ROWS):
+        block = slice(start, start + _BLOCK_ROWS)
+        distance = np.linalg.norm(lab_a[:, None, :, None, :] - lab_b[None, block, None, :, :], axis=-1)
+        similarity = np.clip(1 - distance / MATCH_DELTA_E, 0, 1) * mask_b[None, block, None, :]
+        best = similarity.max(axis=-1) * mask_a[:, None, :]
+        if weights_b is not None:
+            best = best * np.asarray(weights_b, dtype=np.float32)[None, block, None]
+        totals += best.sum(axis=(1, 2))
+    return totals
+
+
+PairLookup = namedtuple('PairLookup', ['harmony', 'top_lab', 'top_mask', 'bottom_lab', 'bottom_mask'])
+
+
+class _Side:
+    """The items along one axis of a pair matrix, with their Lab palettes."""
+
+    def __init__(self):
+        self.ids = []
+        self.signatures = []
+        self.index = {}
+        self.lab = np.zeros((0, MAX_COLORS, 3), dtype=np.float32)
+        self.mask = np.zeros((0, MAX_COLORS), dtype=bool)
+
+    def stale(self, items):
+        """Boolean keep-mask dropping items whose colours changed, or None."""
+        keep = None
+        for item in items:
+            position = self.index.get(item.id)
+            if position is not None and self.signatures[position] != tuple(item.get_packed_colors()):
+                if keep is None:
+                    keep = np.ones(len(self.ids), dtype=bool)
+                keep[position] = False
+        return keep
+
+    def missing(self, items):
+        seen = set()
+        new_items = []
+        for item in items:
+            if item.id not in self.index and item.id not in seen:
+                seen.add(item.id)
+                new_items.append(item)
+        return new_items
+
+    def filter(self, keep):
+        self.ids = [item_id for item_id, kept in zip(self.ids, keep) if kept]
+        self.signatures = [sig for sig, kept in zip(self.signatures, keep) if kept]
+        self.index = {item_id: position for position, item_id in enumerate(self.ids)}
+        self.lab = self.lab[keep]
+        self.mask = self.mask[keep]
+
+    def append(self, items, lab, mask):
+        for item in items:
+            self.index[item.id] = len(self.ids)
+            self.ids.append(item.id)
+            self.signatures.append(tuple(item.get_packed_colors()))
+        self.lab = np.concatenate([self.lab, lab])
+        self.mask = np.concatenate([self.mask, mask])
+
+    def positions(self, items):
+        return np.fromiter((self.index[item.id] for item in items), dtype=np.intp, count=len(items))
+
+
+class PairMatrix:
+    """Top x bottom harmony matrix for one wardrobe."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tops = _Side()
+        self.bottoms = _Side()
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.tops.ids) + len(self.bottoms.ids)
+
+    def remove(self, item_id):
+        for axis, side in ((0, self.tops), (1, self.bottoms)):
+            if item_id in side.index:
+                keep = np.ones(len(side.ids), dtype=bool)
+                keep[side.index[item_id]] = False
+                self._drop(axis, side, keep)
+
+    def _drop(self, axis, side, keep):
+        side.filter(keep)
+        self.matrix = self.matrix[keep] if axis == 0 else self.matrix[:, keep]
+
+    def lookup(self, tops, bottoms):
+        """Sync the given items into the matrix and return their block of it."""
+        keep = self.tops.stale(tops)
+        if keep is not None:
+            self._drop(0, self.tops, keep)
+        keep = self.bottoms.stale(bottoms)
+        if keep is not None:
+            self._drop(1, self.bottoms, keep)
+
+        new_bottoms = self.bottoms.missing(bottoms)
+        if new_bottoms:
+            lab, mask = items_to_lab(new_bottoms)
+            columns = harmony_matrix(self.tops.lab, self.tops.mask, lab, mask)
+            self.matrix = np.concatenate([self.matrix, columns], axis=1)
+            self.bottoms.append(new_bottoms, lab, mask)
+
+        new_tops = self.tops.missing(tops)
+        if new_tops:
+            lab, mask = items_to_lab(new_tops)
+            rows = harmony_matrix(lab, mask, self.bottoms.lab, self.bottoms.mask)
+            self.matrix = np.concatenate([self.matrix, rows], axis=0)
+            self.tops.append(new_tops, lab, mask)
+
+        top_positions = self.tops.positions(tops)
+        bottom_positions = self.bottoms.positions(bottoms)
+        return PairLookup(
+            self.matrix[np.ix_(top_positions, bottom_positions)],
+            self.tops.lab[top_positions], self.tops.mask[top_positions],
+            self.bottoms.lab[bottom_positions], self.bottoms.mask[bottom_positions],
+        )
+
+
+class PairMatrixCache:
+    """
+    Per-user PairMatrix instances for the most recently used wardrobes.
+
+    Lookups add new items and recompute items whose colours changed, so each
+    process stays correct even when another one handled the upload. Deleted
+    items are dropped by ``remove_item``; rows for items deleted through
+    another process are only wasted space until the user is evicted.
+    """
+
+    def __init__(self, max_users=128):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, user_id, create):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+            elif create:
+                entry = self._entries[user_id] = PairMatrix()
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+            return entry
+
+    def lookup(self, user_id, tops, bottoms):
+        """Harmony of every top with every bottom, plus the items' Lab palettes."""
+        if user_id is None or self.max_users <= 0:
+            return PairMatrix().lookup(tops, bottoms)
+        entry = self._get(user_id, create=True)
+        with entry.lock:
+            return entry.lookup(tops, bottoms)
+
+    def remove_item(self, user_id, item_id):
+        entry = self._get(user_id, create=False)
+        if entry is not None:
+            with entry.lock:
+                entry.remove(item_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_pair_cache(max_users=128):
+    """The process-wide pair matrix cache, or None without NumPy."""
+    global _cache
+    if not NUMPY_AVAILABLE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PairMatrixCache(max_users)
+        _cache.max_users = max_users
+    return _cache
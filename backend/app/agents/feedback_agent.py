@@ -7,16 +7,30 @@ and transforms them into training data points for the Styling Recommendation Age
 Responsible for:
 - Creating JSON training signal files in the feedback_data directory
 - Triggering incremental learning in the SRA
-- Tracking color/style combinations that users approve or reject
+- Tracking color/style combinations that users approve or reject, as
+  per-user totals that decay with age (rolled up as feedback is written)
 """
 
 import os
 import json
+import hashlib
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.extensions import db
+from app.metrics import instrument
+from app.models.feedback import TrainingSignal, PreferenceRollup, PreferenceRollupCursor
 
 logger = logging.getLogger(__name__)
 
+# Rolled-up combinations lighter than this are dropped (about 6.6 half-lives)
+ROLLUP_MIN_WEIGHT = 0.01
+# A user's rollup weights are moved to the current time this many half-lives after the last move
+ROLLUP_REBASE_HALF_LIVES = 8
+# Combination keys per IN (...) query when loading rollups
+ROLLUP_QUERY_BATCH = 500
+
 
 class FeedbackAgent:
     """
@@ -30,8 +44,12 @@ class FeedbackAgent:
     def __init__(self, app_config):
         self.config = app_config
         self.feedback_dir = app_config.get('FEEDBACK_DATA_DIR', 'feedback_data')
+        self.half_life = app_config.get('PREFERENCE_HALF_LIFE_DAYS', 90) * 86400  # seconds
+        self.max_combinations = app_config.get('PREFERENCE_MAX_COMBINATIONS', 50)
+        self.settle = timedelta(seconds=app_config.get('SIGNAL_SETTLE_SECONDS', 60))
         os.makedirs(self.feedback_dir, exist_ok=True)
 
+    @instrument('fa.process_feedback')
     def process_feedback(self, user_id, outfit, reaction):
         """
         Process user feedback and create training signal.
@@ -52,6 +70,31 @@ class FeedbackAgent:
         logger.info(f"Feedback Agent processed {reaction} feedback for outfit {outfit.id}")
         return training_signal
 
+    @instrument('fa.process_feedback_batch')
+    def process_feedback_batch(self, user_id, reactions):
+        """
+        Process a batch of feedback into training signals with one file write.
+
+        Args:
+            user_id: str - the user's ID
+            reactions: list of (Outfit model instance, 'liked' or 'disliked')
+
+        Returns:
+            list of dicts - the training signal data, in the order given
+        """
+        training_signals = [
+            self._extract_training_signal(user_id, outfit, reaction) for outfit, reaction in reactions
+        ]
+        if training_signals:
+            # One file holding the list; microseconds keep batches in the same second apart
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+            self._write_training_signal_file(
+                training_signals, filename=f"training_signal_{user_id}_{timestamp}_batch.json"
+            )
+
+        logger.info(f"Feedback Agent processed {len(training_signals)} feedback signals for user {user_id}")
+        return training_signals
+
     def _extract_training_signal(self, user_id, outfit, reaction):
         """Extract structured training data from outfit feedback."""
         top = outfit.top_item
@@ -79,10 +122,11 @@ class FeedbackAgent:
         }
         return training_signal
 
-    def _write_training_signal_file(self, training_signal):
-        """Write training signal to JSON file for the SRA incremental training."""
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        filename = f"training_signal_{training_signal['user_id']}_{timestamp}.json"
+    def _write_training_signal_file(self, training_signal, filename=None):
+        """Write training signal (or a list of them) to JSON file for the SRA incremental training."""
+        if filename is None:
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            filename = f"training_signal_{training_signal['user_id']}_{timestamp}.json"
         filepath = os.path.join(self.feedback_dir, filename)
 
         try:
@@ -92,41 +136,250 @@ class FeedbackAgent:
         except Exception as e:
             logger.error(f"Failed to write training signal: {e}")
 
-    def get_user_preferences(self, user_id):
+    @instrument('fa.get_user_preferences')
+    def get_user_preferences(self, user_id, now=None):
         """
         Aggregate user preferences from historical feedback for the SRA.
-        Scans training signal files to build preference profile.
+
+        Starts from the user's time-decayed rollups and folds in the training
+        signals recorded since the last rollup, so new feedback counts at
+        once. Feedback is rolled up as it is written (see rollup_user), so
+        that tail stays short; a user whose history predates rollups is
+        rolled up on their first read. Each distinct combination appears
+        once with its weight: 1 for feedback given just now, halving every
+        PREFERENCE_HALF_LIFE_DAYS.
+        Only the PREFERENCE_MAX_COMBINATIONS heaviest per reaction are
+        returned, keeping the payload bounded however long the history is.
 
         Returns:
-            dict with liked/disliked color and style combinations
+            dict with user_id and liked/disliked combinations (styles, colors,
+            occasion and weight), heaviest first
         """
-        liked_combinations = []
-        disliked_combinations = []
-
+        now = now or datetime.utcnow()
+        totals = {}
         try:
-            for filename in os.listdir(self.feedback_dir):
-                if not filename.startswith(f"training_signal_{user_id}"):
-                    continue
-                filepath = os.path.join(self.feedback_dir, filename)
-                with open(filepath, 'r') as f:
-                    signal = json.load(f)
-
-                combo = {
-                    'top_style': signal['style_combination'].get('top_style'),
-                    'bottom_style': signal['style_combination'].get('bottom_style'),
-                    'top_colors': signal['color_combination'].get('top_colors', []),
-                    'bottom_colors': signal['color_combination'].get('bottom_colors', []),
-                    'occasion': signal.get('occasion'),
-                }
-
-                if signal['reaction'] == 'liked':
-                    liked_combinations.append(combo)
+            cursor = db.session.get(PreferenceRollupCursor, user_id)
+            if cursor is None and self.fold_new_signals(user_id, now):
+                cursor = db.session.get(PreferenceRollupCursor, user_id, populate_existing=True)
+            recent = {}
+            self._fold_signals(recent, self._signals_since(user_id, cursor, now).yield_per(1000), now)
+
+            # All of a user's rollups are weighed as of the same time, so the
+            # heaviest stored ones stay the heaviest; only those and the ones
+            # new signals add to can make the cut.
+            rows = []
+            if cursor is not None and cursor.as_of is not None:
+                query = db.session.query(
+                    PreferenceRollup.combination_key, PreferenceRollup.reaction, PreferenceRollup.combination,
+                    PreferenceRollup.weight,
+                ).filter(PreferenceRollup.user_id == user_id)
+                for is_liked in (PreferenceRollup.reaction == 'liked', PreferenceRollup.reaction != 'liked'):
+                    rows += query.filter(is_liked).order_by(PreferenceRollup.weight.desc()).limit(
+                        self.max_combinations).all()
+                if recent:
+                    rows += query.filter(PreferenceRollup.combination_key.in_(list(recent))).all()
+                decay = self._decay(now - cursor.as_of)
+            for key, reaction, combination, weight in rows:
+                if key not in totals:
+                    totals[key] = [reaction, json.loads(combination), weight * decay]
+            for key, (reaction, combination, weight) in recent.items():
+                if key in totals:
+                    totals[key][2] += weight
                 else:
-                    disliked_combinations.append(combo)
+                    totals[key] = [reaction, combination, weight]
         except Exception as e:
             logger.error(f"Failed to aggregate preferences: {e}")
 
+        combinations = {'liked': [], 'disliked': []}
+        for reaction, combination, weight in sorted(totals.values(), key=lambda total: -total[2]):
+            group = combinations['liked' if reaction == 'liked' else 'disliked']
+            if len(group) < self.max_combinations:
+                group.append(dict(combination, weight=round(weight, 4)))
+
         return {
-            'liked_combinations': liked_combinations,
-            'disliked_combinations': disliked_combinations,
+            'user_id': user_id,
+            'liked_combinations': combinations['liked'],
+            'disliked_combinations': combinations['disliked'],
         }
+
+    @instrument('fa.rollup_preferences')
+    def rollup_user(self, user_id, now=None):
+        """
+        Fold a user's settled training signals into their rollups; the
+        caller commits.
+
+        A signal's created_at comes from its writer's clock before commit,
+        so signals younger than SIGNAL_SETTLE_SECONDS may still commit
+        behind a later one. They are left for a later fold, so the cursor
+        never moves past a signal that is not visible yet.
+
+        Only the combinations the new signals fall into are written: weights
+        are kept as of the user's cursor time, which moves (rescaling all of
+        the user's rollups and dropping those below ROLLUP_MIN_WEIGHT) only
+        every ROLLUP_REBASE_HALF_LIVES half-lives.
+
+        Rollups of the same user run one at a time: the user's cursor row is
+        created if missing and locked before anything is read, and stays
+        locked until the caller's transaction ends.
+
+        Returns:
+            int - the number of signals folded in
+        """
+        now = now or datetime.utcnow()
+        settled = now - self.settle
+        if self._signals_since(user_id, db.session.get(PreferenceRollupCursor, user_id), settled).first() is None:
+            return 0
+
+        cursor = self._lock_cursor(user_id, now)
+        if cursor.as_of is None:
+            cursor.as_of = now
+        elif (now - cursor.as_of).total_seconds() > ROLLUP_REBASE_HALF_LIVES * self.half_life:
+            self._rebase(cursor, now)
+
+        added = {}
+        last = None
+        folded = 0
+        for signal in self._signals_since(user_id, cursor, settled).yield_per(1000):
+            reaction, combination = signal_combination(signal)
+            key = combination_key(reaction, combination)
+            # Weight as of the cursor time; above 1 for signals after it
+            weight = 0.5 ** ((cursor.as_of - signal.created_at).total_seconds() / self.half_life)
+            if key in added:
+                added[key][2] += weight
+            else:
+                added[key] = [reaction, combination, weight]
+            last = signal
+            folded += 1
+        if last is None:
+            return 0
+
+        keys = list(added)
+        rollups = {}
+        for start in range(0, len(keys), ROLLUP_QUERY_BATCH):
+            rollups.update((rollup.combination_key, rollup) for rollup in PreferenceRollup.query.filter(
+                PreferenceRollup.user_id == user_id,
+                PreferenceRollup.combination_key.in_(keys[start:start + ROLLUP_QUERY_BATCH]),
+            ).populate_existing())
+        for key, (reaction, combination, weight) in added.items():
+            rollup = rollups.get(key)
+            if rollup is None:
+                db.session.add(PreferenceRollup(
+                    user_id=user_id, combination_key=key, reaction=reaction,
+                    combination=json.dumps(combination, sort_keys=True), weight=weight,
+                ))
+            else:
+                rollup.weight += weight
+
+        cursor.created_at = last.created_at
+        cursor.signal_id = last.id
+        return folded
+
+    def fold_new_signals(self, user_id, now=None):
+        """
+        Roll up a user's settled training signals and commit; used on read
+        for users whose history predates rollups.
+
+        Best effort: on a database error (e.g. a lock timeout) the fold is
+        rolled back and left for the next write or periodic rollup.
+
+        Returns:
+            int - the number of signals folded in
+        """
+        try:
+            folded = self.rollup_user(user_id, now)
+            db.session.commit()
+            return folded
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning(f"Preference rollup for user {user_id} failed, leaving it for later: {e}")
+            return 0
+
+    def prune_signal_files(self, cutoff):
+        """Delete training signal files last written before cutoff (a datetime). Returns the count."""
+        removed = 0
+        cutoff_ts = (cutoff - datetime(1970, 1, 1)).total_seconds()
+        for entry in os.scandir(self.feedback_dir):
+            if entry.name.startswith('training_signal_') and entry.stat().st_mtime < cutoff_ts:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError as e:
+                    logger.error(f"Failed to delete training signal file {entry.path}: {e}")
+        return removed
+
+    def _decay(self, age):
+        """Weight left after `age` (a timedelta) for feedback with weight 1."""
+        return 0.5 ** (max(age.total_seconds(), 0) / self.half_life)
+
+    def _fold_signals(self, totals, signals, now):
+        """Add decayed TrainingSignal rows to totals (key -> [reaction, combination, weight])."""
+        for signal in signals:
+            reaction, combination = signal_combination(signal)
+            key = combination_key(reaction, combination)
+            weight = self._decay(now - signal.created_at)
+            if key in totals:
+                totals[key][2] += weight
+            else:
+                totals[key] = [reaction, combination, weight]
+
+    @staticmethod
+    def _lock_cursor(user_id, now):
+        """
+        The user's rollup cursor, created if missing and locked until the
+        transaction ends.
+
+        The row is written before it is read: SQLite ignores FOR UPDATE and
+        takes its write lock on the first write instead.
+        """
+        touched = PreferenceRollupCursor.query.filter_by(user_id=user_id).update(
+            {PreferenceRollupCursor.updated_at: now}, synchronize_session=False
+        )
+        if not touched:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(PreferenceRollupCursor(user_id=user_id, updated_at=now))
+            except IntegrityError:
+                pass  # created by a concurrent rollup; the query below waits for its lock
+        return PreferenceRollupCursor.query.filter_by(user_id=user_id).with_for_update().populate_existing().one()
+
+    def _rebase(self, cursor, now):
+        """Move a user's rollup weights to now, dropping those decayed below ROLLUP_MIN_WEIGHT."""
+        PreferenceRollup.query.filter_by(user_id=cursor.user_id).update(
+            {PreferenceRollup.weight: PreferenceRollup.weight * self._decay(now - cursor.as_of)},
+            synchronize_session=False,
+        )
+        PreferenceRollup.query.filter(
+            PreferenceRollup.user_id == cursor.user_id, PreferenceRollup.weight < ROLLUP_MIN_WEIGHT,
+        ).delete(synchronize_session=False)
+        cursor.as_of = now
+
+    @staticmethod
+    def _signals_since(user_id, cursor, until):
+        """Query for a user's training signals after the rollup cursor, up to until, in (created_at, id) order."""
+        query = TrainingSignal.query.filter(
+            TrainingSignal.user_id == user_id, TrainingSignal.created_at <= until,
+        )
+        if cursor is not None and cursor.created_at is not None:
+            query = query.filter(or_(
+                TrainingSignal.created_at > cursor.created_at,
+                and_(TrainingSignal.created_at == cursor.created_at, TrainingSignal.id > cursor.signal_id),
+            ))
+        return query.order_by(TrainingSignal.created_at, TrainingSignal.id)
+
+
+def signal_combination(signal):
+    """(reaction, combination dict) for a TrainingSignal row."""
+    top_style, _, bottom_style = (signal.style_combination or '').partition('+')
+    colors = signal.get_color_combination()
+    return signal.reaction, {
+        'top_style': top_style if top_style not in ('', 'unknown') else None,
+        'bottom_style': bottom_style if bottom_style not in ('', 'unknown') else None,
+        'top_colors': colors.get('top_colors', []),
+        'bottom_colors': colors.get('bottom_colors', []),
+        'occasion': signal.occasion,
+    }
+
+
+def combination_key(reaction, combination):
+    """Stable key identifying a reaction to a combination."""
+    return hashlib.sha1(json.dumps([reaction, combination], sort_keys=True).encode()).hexdigest()
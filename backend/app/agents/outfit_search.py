@@ -0,0 +1,157 @@
+"""
+Multi-slot outfit search for the SRA.
+
+An outfit fills at most one item per slot (top, bottom, outerwear, shoes,
+accessory); top and bottom are required, the rest optional. Its score is
+the sum of per-item (unary) scores plus pairwise compatibility scores
+between every two filled slots. Trying every combination multiplies the
+candidate counts of all slots, so the search:
+
+1. prunes each slot to its best few candidates (``top_k``), ranked by
+   their own score plus their best compatibility with the other slots;
+2. runs branch-and-bound over the slots, expanding the most promising
+   item first so good outfits are found early, and cutting any branch
+   whose optimistic bound cannot beat the k-th best outfit found so far;
+3. stops at a time budget and returns the best outfits found until then.
+"""
+
+import time
+import heapq
+import logging
+from itertools import count
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+SLOTS = ('top', 'bottom', 'outerwear', 'shoes', 'accessory')
+REQUIRED_SLOTS = ('top', 'bottom')
+
+SLOT_CATEGORIES = {
+    'top': {'shirt', 'top', 'blouse', 'hoodie', 'dress'},
+    'bottom': {'pants', 'jeans', 'skirt', 'leggings'},
+    'outerwear': {'jacket', 'coat'},
+    'shoes': {'shoes', 'sneakers', 'boots', 'sandals', 'heels'},
+    'accessory': {'bag', 'hat', 'scarf', 'belt', 'jewelry', 'tie'},
+}
+
+# Categories that name their slot outright, even on items saved as a 'top'
+_CATEGORY_SLOTS = {
+    category: slot
+    for slot in ('outerwear', 'shoes', 'accessory')
+    for category in SLOT_CATEGORIES[slot]
+}
+
+
+def category_slot(category):
+    """The slot a category belongs in, or None if unknown."""
+    for slot, categories in SLOT_CATEGORIES.items():
+        if category in categories:
+            return slot
+    return None
+
+
+def item_slot(item):
+    """
+    The slot a wardrobe item fills.
+
+    Outerwear, shoe and accessory categories win over outfit_part, since
+    items uploaded before those slots existed were saved as tops.
+    """
+    slot = _CATEGORY_SLOTS.get(item.category)
+    if slot:
+        return slot
+    if item.outfit_part in SLOTS:
+        return item.outfit_part
+    return category_slot(item.category) or 'top'
+
+
+def top_k(values, k):
+    """Indices of the k largest values, largest first; ties in random order."""
+    values = np.asarray(values)
+    return np.lexsort((np.random.random(values.shape), -values))[:k]
+
+
+def search(options, unary, pairwise, limit=1, budget=None):
+    """
+    Branch-and-bound search for the best slot assignments.
+
+    Args:
+        options: list of (slot, items) in search order; an optional slot
+                 lists None as one of its items
+        unary: list of float arrays, unary[i][j] = score of options[i][1][j]
+        pairwise: dict (i, k) with i < k -> float array of shape
+                  (len(options[i][1]), len(options[k][1]))
+        limit: number of outfits to return
+        budget: seconds before the search stops with what it has
+
+    Returns:
+        tuple of (list of (score, {slot: item}) best first, stats dict)
+    """
+    n = len(options)
+    deadline = time.perf_counter() + budget if budget else None
+    # best_pair[(i, k)]: best score each option of slot k can get with any option of slot i
+    best_pair = {(i, k): matrix.max(axis=0) for (i, k), matrix in pairwise.items()}
+
+    results = []  # min-heap of (score, tiebreak, choices)
+    tiebreak = count()
+    stats = {'nodes': 0, 'pruned': 0, 'timed_out': False}
+
+    def threshold():
+        return results[0][0] if len(results) >= limit else -np.inf
+
+    def gains(depth, choices):
+        """Score each option at `depth` adds given the choices made so far."""
+        gain = unary[depth].copy()
+        for i, choice in enumerate(choices):
+            gain += pairwise[(i, depth)][choice]
+        return gain
+
+    def bound(depth, choices):
+        """Optimistic score still available from slots depth..n-1."""
+        total = 0.0
+        for k in range(depth, n):
+            gain = gains(k, choices)
+            for i in range(depth, k):
+                gain = gain + best_pair[(i, k)]
+            total += gain.max()
+        return total
+
+    def expand(depth, choices, score):
+        stats['nodes'] += 1
+        if deadline is not None and time.perf_counter() > deadline and results:
+            stats['timed_out'] = True
+            return
+        if depth == n:
+            entry = (score, next(tiebreak), tuple(choices))
+            if len(results) < limit:
+                heapq.heappush(results, entry)
+            elif score > results[0][0]:
+                heapq.heapreplace(results, entry)
+            return
+        gain = gains(depth, choices)
+        for choice in np.lexsort((np.random.random(gain.shape), -gain)):
+            child = score + gain[choice]
+            choices.append(choice)
+            if child + bound(depth + 1, choices) > threshold():
+                expand(depth + 1, choices, child)
+            else:
+                stats['pruned'] += 1
+            choices.pop()
+            if stats['timed_out']:
+                return
+
+    expand(0, [], 0.0)
+
+    outfits = []
+    for score, _, choices in sorted(results, reverse=True):
+        assignment = {}
+        for (slot, items), choice in zip(options, choices):
+            if items[choice] is not None:
+                assignment[slot] = items[choice]
+        outfits.append((float(score), assignment))
+    return outfits, stats
@@ -0,0 +1,382 @@
+"""
+Learned outfit preference model for the SRA.
+
+A bilinear logistic regression over compact item features (style, category
+and colour buckets). For a top t, bottom b, occasion o and user u:
+
+    logit = x_t W x_b + (a + A[o] + U_a[u]) . x_t + (b + B[o] + U_b[u]) . x_b
+
+so scoring every top/bottom pair in a wardrobe is one small matrix multiply
+(X_top W X_bottom^T plus two broadcast vectors). Colours are bucketed by hue
+and lightness, so feedback on one shade generalises to similar ones.
+
+Training runs offline (``flask preferences train``): the shared weights are
+fitted on all TrainingSignal rows, then per-user offsets are fitted in a
+process pool for users with enough feedback. Each run is saved as a
+versioned directory of .npy files; serving processes memory-map the current
+version and pick up new ones without a restart.
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import colorsys
+import threading
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy not available - learned preference model disabled")
+
+# Bump when the feature layout changes; older artifacts are then ignored
+FEATURE_VERSION = 1
+
+STYLES = ['casual', 'formal', 'sporty']
+CATEGORIES = ['shirt', 'top', 'blouse', 'hoodie', 'jacket', 'dress', 'pants', 'jeans', 'skirt', 'leggings']
+OCCASIONS = ['gym', 'friends', 'formal', 'casual', 'work']
+HUE_BINS = 12
+NEUTRALS = ['black', 'grey', 'white']
+
+_STYLE_OFFSET = 0
+_CATEGORY_OFFSET = _STYLE_OFFSET + len(STYLES)
+_COLOR_OFFSET = _CATEGORY_OFFSET + len(CATEGORIES)
+_BIAS_INDEX = _COLOR_OFFSET + len(NEUTRALS) + HUE_BINS * 2
+FEATURE_DIM = _BIAS_INDEX + 1
+
+CURRENT_FILE = 'CURRENT'
+
+
+def color_bucket(hex_color):
+    """Map a hex colour to a bucket index: a neutral, or hue bin x dark/light."""
+    try:
+        value = hex_color.lstrip('#')
+        r, g, b = (int(value[i:i + 2], 16) / 255 for i in (0, 2, 4))
+    except (ValueError, AttributeError, IndexError):
+        return None
+    h, s, v = colorsys.rgb_to_hsv(r, g, b)
+    if v < 0.2:
+        return 0  # black
+    if s < 0.2:
+        return 1 if v < 0.8 else 2  # grey, white
+    hue_bin = min(int(h * HUE_BINS), HUE_BINS - 1)
+    return len(NEUTRALS) + hue_bin * 2 + (1 if v >= 0.6 else 0)
+
+
+def item_features(style, category, colors):
+    """Feature vector for one garment (float32, length FEATURE_DIM)."""
+    x = np.zeros(FEATURE_DIM, dtype=np.float32)
+    if style in STYLES:
+        x[_STYLE_OFFSET + STYLES.index(style)] = 1.0
+    if category in CATEGORIES:
+        x[_CATEGORY_OFFSET + CATEGORIES.index(category)] = 1.0
+    buckets = [bucket for bucket in (color_bucket(c) for c in colors or []) if bucket is not None]
+    for bucket in buckets:
+        x[_COLOR_OFFSET + bucket] += 1.0 / len(buckets)
+    x[_BIAS_INDEX] = 1.0
+    return x
+
+
+def features_for_items(items):
+    """Stack feature vectors for ClothingItem instances into an (n, FEATURE_DIM) matrix."""
+    if not items:
+        return np.zeros((0, FEATURE_DIM), dtype=np.float32)
+    return np.stack([item_features(i.style, i.category, i.get_dominant_colors()) for i in items])
+
+
+def _occasion_index(occasion):
+    return OCCASIONS.index(occasion) if occasion in OCCASIONS else None
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class PreferenceModel:
+    """Trained weights for scoring top/bottom pairs; arrays may be memory-mapped."""
+
+    def __init__(self, version, bilinear, linear, occasion, user_ids, user_weights, meta=None):
+        self.version = version
+        self.bilinear = bilinear          # (d, d)
+        self.linear = linear              # (2, d): top, bottom
+        self.occasion = occasion          # (2, n_occasions, d)
+        self.user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+        self.user_weights = user_weights  # (n_users, 2, d)
+        self.meta = meta or {}
+
+    def _linear_terms(self, occasion, user_id):
+        top, bottom = np.array(self.linear[0]), np.array(self.linear[1])
+        occ = _occasion_index(occasion)
+        if occ is not None:
+            top += self.occasion[0, occ]
+            bottom += self.occasion[1, occ]
+        row = self.user_index.get(user_id)
+        if row is not None:
+            top += self.user_weights[row, 0]
+            bottom += self.user_weights[row, 1]
+        return top, bottom
+
+    def score_matrix(self, top_features, bottom_features, occasion, user_id=None):
+        """Logits for every (top, bottom) pair: shape (n_tops, n_bottoms)."""
+        top_linear, bottom_linear = self._linear_terms(occasion, user_id)
+        scores = top_features @ self.bilinear @ bottom_features.T
+        scores += (top_features @ top_linear)[:, None]
+        scores += (bottom_features @ bottom_linear)[None, :]
+        return scores
+
+    def score_pairs(self, tops, bottoms, occasion, user_id=None):
+        """Logits for every pair of ClothingItem tops and bottoms."""
+        return self.score_matrix(features_for_items(tops), features_for_items(bottoms), occasion, user_id)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('feature_version') != FEATURE_VERSION or meta.get('feature_dim') != FEATURE_DIM:
+            raise ValueError(f"Preference model {path} uses an incompatible feature layout")
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode)
+                  for name in ('bilinear', 'linear', 'occasion', 'user_weights')}
+        return cls(meta['version'], arrays['bilinear'], arrays['linear'], arrays['occasion'],
+                   meta.get('user_ids', []), arrays['user_weights'], meta)
+
+    def save(self, model_dir, keep=3):
+        """Write this model as a new version and point CURRENT at it."""
+        os.makedirs(model_dir, exist_ok=True)
+        final_path = os.path.join(model_dir, self.version)
+        tmp_path = final_path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in ('bilinear', 'linear', 'occasion', 'user_weights'):
+            np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(getattr(self, name), dtype=np.float32))
+        meta = dict(self.meta, version=self.version, feature_version=FEATURE_VERSION, feature_dim=FEATURE_DIM,
+                    user_ids=sorted(self.user_index, key=self.user_index.get))
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, final_path)
+
+        # Switch readers over atomically
+        pointer_tmp = os.path.join(model_dir, CURRENT_FILE + '.tmp')
+        with open(pointer_tmp, 'w') as f:
+            f.write(self.version)
+        os.replace(pointer_tmp, os.path.join(model_dir, CURRENT_FILE))
+        _prune_versions(model_dir, keep)
+        return final_path
+
+
+def _prune_versions(model_dir, keep):
+    versions = sorted(name for name in os.listdir(model_dir)
+                      if name.startswith('v') and os.path.isdir(os.path.join(model_dir, name)))
+    for name in versions[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(model_dir, name), ignore_errors=True)
+
+
+class PreferenceModelStore:
+    """
+    Serves the current model version for one directory, memory-mapped.
+
+    The CURRENT pointer is re-read at most every reload_interval seconds, so
+    a newly trained version is picked up by every process without a restart.
+    """
+
+    def __init__(self, model_dir, reload_interval=30):
+        self.model_dir = model_dir
+        self.reload_interval = reload_interval
+        self._model = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            with self._lock:
+                if now - self._checked_at >= self.reload_interval:
+                    self._checked_at = now
+                    self._reload()
+        return self._model
+
+    def _reload(self):
+        try:
+            with open(os.path.join(self.model_dir, CURRENT_FILE)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            self._model = None
+            return
+        if self._model is not None and self._model.version == version:
+            return
+        try:
+            self._model = PreferenceModel.load(os.path.join(self.model_dir, version))
+            logger.info(f"Loaded preference model {version}")
+        except Exception as e:
+            logger.error(f"Failed to load preference model {version}: {e}")
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_preference_model(model_dir, reload_interval=30):
+    """Get the current model for a directory (shared per process), or None."""
+    if not NUMPY_AVAILABLE or not model_dir:
+        return None
+    with _stores_lock:
+        store = _stores.get(model_dir)
+        if store is None:
+            store = _stores[model_dir] = PreferenceModelStore(model_dir, reload_interval)
+        store.reload_interval = reload_interval
+    return store.get()
+
+
+# --- Training ---------------------------------------------------------------
+
+def _pair_features(top_x, bottom_x, occ):
+    """Flattened logistic-regression features for a batch of examples."""
+    n = top_x.shape[0]
+    d = FEATURE_DIM
+    occ_onehot = np.zeros((n, len(OCCASIONS)), dtype=np.float32)
+    valid = occ >= 0
+    occ_onehot[np.nonzero(valid)[0], occ[valid]] = 1.0
+    return np.concatenate([
+        np.einsum('ni,nj->nij', top_x, bottom_x).reshape(n, d * d),
+        top_x,
+        bottom_x,
+        np.einsum('no,ni->noi', occ_onehot, top_x).reshape(n, -1),
+        np.einsum('no,ni->noi', occ_onehot, bottom_x).reshape(n, -1),
+    ], axis=1)
+
+
+def _logits(w, top_x, bottom_x, occ, chunk_size=8192):
+    """Logits for many examples, in chunks to bound the feature matrix size."""
+    return np.concatenate([
+        _pair_features(top_x[i:i + chunk_size], bottom_x[i:i + chunk_size], occ[i:i + chunk_size]) @ w
+        for i in range(0, len(occ), chunk_size)
+    ])
+
+
+def _fit_global(top_x, bottom_x, occ, labels, epochs, batch_size, l2, learning_rate, seed):
+    """Mini-batch Adam on the logistic loss; returns the flat weight vector."""
+    rng = np.random.default_rng(seed)
+    n = len(labels)
+    dim = FEATURE_DIM * FEATURE_DIM + 2 * FEATURE_DIM + 2 * len(OCCASIONS) * FEATURE_DIM
+    w = np.zeros(dim, dtype=np.float64)
+    m, v = np.zeros_like(w), np.zeros_like(w)
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    step = 0
+    for _ in range(epochs):
+        order = rng.permutation(n)
+        for start in range(0, n, batch_size):
+            idx = order[start:start + batch_size]
+            phi = _pair_features(top_x[idx], bottom_x[idx], occ[idx])
+            error = _sigmoid(phi @ w) - labels[idx]
+            grad = phi.T @ error / len(idx) + l2 * w
+            step += 1
+            m = beta1 * m + (1 - beta1) * grad
+            v = beta2 * v + (1 - beta2) * grad * grad
+            w -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+    return w
+
+
+def _unpack(w):
+    d = FEATURE_DIM
+    n_occ = len(OCCASIONS)
+    bilinear = w[:d * d].reshape(d, d)
+    offset = d * d
+    linear = np.stack([w[offset:offset + d], w[offset + d:offset + 2 * d]])
+    offset += 2 * d
+    occasion = np.stack([
+        w[offset:offset + n_occ * d].reshape(n_occ, d),
+        w[offset + n_occ * d:offset + 2 * n_occ * d].reshape(n_occ, d),
+    ])
+    return bilinear, linear, occasion
+
+
+def _fit_user(args):
+    """Fit one user's linear offsets with the shared model's logits held fixed."""
+    user_id, top_x, bottom_x, base_logits, labels, l2, iterations = args
+    x = np.concatenate([top_x, bottom_x], axis=1)
+    u = np.zeros(x.shape[1])
+    for _ in range(iterations):
+        p = _sigmoid(base_logits + x @ u)
+        grad = x.T @ (p - labels) / len(labels) + l2 * u
+        hessian = (x.T * (p * (1 - p))) @ x / len(labels) + l2 * np.eye(x.shape[1])
+        u -= np.linalg.solve(hessian, grad)
+    return user_id, u.reshape(2, FEATURE_DIM)
+
+
+def train(examples, workers=None, epochs=20, batch_size=1024, l2=1e-3, learning_rate=0.05,
+          user_l2=0.1, min_user_examples=10, holdout=0.1, seed=42):
+    """
+    Train a model from feedback examples.
+
+    Args:
+        examples: list of dicts with user_id, occasion, liked (bool),
+                  top/bottom: (style, category, colors)
+        workers: process pool size for the per-user fits
+
+    Returns:
+        PreferenceModel (not yet saved)
+    """
+    if not examples:
+        raise ValueError("No training examples")
+
+    top_x = np.stack([item_features(*e['top']) for e in examples])
+    bottom_x = np.stack([item_features(*e['bottom']) for e in examples])
+    occ = np.array([_occasion_index(e['occasion']) if _occasion_index(e['occasion']) is not None else -1
+                    for e in examples], dtype=np.int64)
+    labels = np.array([1.0 if e['liked'] else 0.0 for e in examples])
+    user_ids = [e['user_id'] for e in examples]
+
+    rng = np.random.default_rng(seed)
+    is_holdout = rng.random(len(examples)) < holdout if len(examples) >= 50 else np.zeros(len(examples), bool)
+    train_idx = np.nonzero(~is_holdout)[0]
+
+    w = _fit_global(top_x[train_idx], bottom_x[train_idx], occ[train_idx], labels[train_idx],
+                    epochs, batch_size, l2, learning_rate, seed)
+    bilinear, linear, occasion = _unpack(w)
+    base_logits = _logits(w, top_x, bottom_x, occ)
+
+    # Per-user offsets, fitted independently in a process pool
+    by_user = {}
+    for i in train_idx:
+        by_user.setdefault(user_ids[i], []).append(i)
+    jobs = [
+        (user_id, top_x[idx], bottom_x[idx], base_logits[idx], labels[idx], user_l2, 8)
+        for user_id, idx in ((u, np.array(rows)) for u, rows in by_user.items())
+        if len(idx) >= min_user_examples
+    ]
+    user_fits = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            user_fits = list(pool.map(_fit_user, jobs, chunksize=max(1, len(jobs) // 64)))
+
+    fitted_users = [user_id for user_id, _ in user_fits]
+    user_weights = (np.stack([u for _, u in user_fits]) if user_fits
+                    else np.zeros((0, 2, FEATURE_DIM)))
+    model = PreferenceModel(
+        f"v{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}",
+        bilinear.astype(np.float32), linear.astype(np.float32), occasion.astype(np.float32),
+        fitted_users, user_weights.astype(np.float32),
+    )
+
+    # Held-out evaluation (including the per-user offsets)
+    meta = {'examples': len(examples), 'users': len(fitted_users), 'trained_at': datetime.utcnow().isoformat()}
+    holdout_idx = np.nonzero(is_holdout)[0]
+    if len(holdout_idx):
+        logits = base_logits[holdout_idx].copy()
+        for n, i in enumerate(holdout_idx):
+            row = model.user_index.get(user_ids[i])
+            if row is not None:
+                logits[n] += top_x[i] @ user_weights[row, 0] + bottom_x[i] @ user_weights[row, 1]
+        p = np.clip(_sigmoid(logits), 1e-7, 1 - 1e-7)
+        y = labels[holdout_idx]
+        meta['holdout_log_loss'] = float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+        meta['holdout_accuracy'] = float(np.mean((p >= 0.5) == (y == 1)))
+    model.meta = meta
+    return model
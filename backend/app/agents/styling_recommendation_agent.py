@@ -15,6 +15,15 @@ import json
 import logging
 import random
 from datetime import datetime
+from app.metrics import instrument
+from app.agents.preference_model import get_preference_model
+from app.agents import color_harmony, outfit_search
+from app.agents.outfit_search import SLOTS, REQUIRED_SLOTS, item_slot
+
+try:
+    import numpy as np  # only used when color_harmony.NUMPY_AVAILABLE
+except ImportError:
+    np = None
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +40,25 @@ OCCASION_STYLE_MAP = {
 # Weather temperature thresholds
 WARM_THRESHOLD = 15  # degrees Celsius
 
+# Weight of colour harmony (0-1) against the preference score; one liked
+# style combination is worth 2
+HARMONY_WEIGHT = 2.0
+
+# Optional slots (outerwear, shoes, accessory): reward for wearing the piece
+# at all, for suiting the occasion, and for sharing a style with another piece
+SLOT_FILL_BONUS = 1.0
+OCCASION_STYLE_BONUS = 0.5
+STYLE_MATCH_BONUS = 0.25
+
+# Ranked outfits kept per (occasion, weather bucket) when planning several days
+PLAN_ALTERNATIVES = 20
+
+
+def get_weather_bucket(weather_data):
+    """Collapse weather data to the 'warm'/'cold' bucket the SRA filters on."""
+    temp = weather_data.get('temperature', weather_data.get('temp', 20))
+    return 'warm' if temp >= WARM_THRESHOLD else 'cold'
+
 
 class StylingRecommendationAgent:
     """
@@ -46,7 +74,59 @@ class StylingRecommendationAgent:
         self.ollama_url = app_config.get('OLLAMA_BASE_URL', 'http://localhost:11434')
         self.ollama_model = app_config.get('OLLAMA_MODEL', 'llama3.2')
 
-    def generate_outfit(self, wardrobe_items, occasion, weather_data, user_preferences=None):
+    def _get_preference_model(self):
+        """The learned preference model, if one has been trained."""
+        return get_preference_model(
+            self.config.get('PREFERENCE_MODEL_DIR'),
+            self.config.get('PREFERENCE_MODEL_RELOAD_INTERVAL', 30),
+        )
+
+    def _pair_scores(self, tops, bottoms, user_preferences):
+        """
+        Score every top/bottom pair as colour harmony plus preference.
+
+        Harmony comes from the per-user pair matrix cache; the preference
+        adjustment mirrors _score_combination with perceptual colour matches.
+
+        Returns:
+            float32 array of shape (len(tops), len(bottoms))
+        """
+        cache = color_harmony.get_pair_cache(self.config.get('PAIR_CACHE_MAX_USERS', 128))
+        lookup = cache.lookup(tops[0].user_id, tops, bottoms)
+        scores = HARMONY_WEIGHT * lookup.harmony
+
+        liked_combinations = (user_preferences or {}).get('liked_combinations', [])
+        if not liked_combinations:
+            return scores
+
+        # +2 for each liked combination with the same top and bottom style
+        # (scaled by its weight, which decays with the age of the feedback)
+        style_counts = {}
+        for liked in liked_combinations:
+            key = (liked.get('top_style'), liked.get('bottom_style'))
+            style_counts[key] = style_counts.get(key, 0) + 2 * liked.get('weight', 1)
+        styles = {style: i for i, style in enumerate({item.style for item in tops + bottoms})}
+        table = np.zeros((len(styles), len(styles)), dtype=np.float32)
+        for (top_style, bottom_style), bonus in style_counts.items():
+            if top_style in styles and bottom_style in styles:
+                table[styles[top_style], styles[bottom_style]] = bonus
+        top_styles = np.array([styles[top.style] for top in tops])
+        bottom_styles = np.array([styles[bottom.style] for bottom in bottoms])
+        scores = scores + table[np.ix_(top_styles, bottom_styles)]
+
+        # +1 (or less, for near shades) per colour found in a liked outfit
+        liked_top_lab, liked_top_mask = color_harmony.palettes_to_lab(
+            [liked.get('top_colors', []) for liked in liked_combinations])
+        liked_bottom_lab, liked_bottom_mask = color_harmony.palettes_to_lab(
+            [liked.get('bottom_colors', []) for liked in liked_combinations])
+        weights = [liked.get('weight', 1) for liked in liked_combinations]
+        top_matches = color_harmony.match_totals(
+            lookup.top_lab, lookup.top_mask, liked_top_lab, liked_top_mask, weights)
+        bottom_matches = color_harmony.match_totals(
+            lookup.bottom_lab, lookup.bottom_mask, liked_bottom_lab, liked_bottom_mask, weights)
+        return scores + top_matches[:, None] + bottom_matches[None, :]
+
+    def generate_outfit(self, wardrobe_items, occasion, weather_data, user_preferences=None, explain=True):
         """
         Generate an outfit recommendation.
 
@@ -55,52 +135,257 @@ class StylingRecommendationAgent:
             occasion: str - the occasion for the outfit
             weather_data: dict - current weather information
             user_preferences: dict - learned preferences from feedback history
+            explain: bool - ask LLaMA for the explanation; when False the
+                     rule-based one is used and the caller can call
+                     explain_outfit later
 
         Returns:
-            dict with: top_item, bottom_item, explanation
+            dict with: top, bottom, items (slot -> item, including optional
+            outerwear, shoes and accessory), explanation
         """
         if not wardrobe_items:
             return None
 
-        # Step 1: Filter items by weather suitability
-        weather_suitable = self._filter_by_weather(wardrobe_items, weather_data)
+        # Steps 1-3: Filter by weather and occasion, group items by slot
+        slots = self._slot_candidates(wardrobe_items, occasion, weather_data)
 
-        # Step 2: Filter by occasion style
-        occasion_suitable = self._filter_by_occasion(weather_suitable, occasion)
+        if not slots['top'] or not slots['bottom']:
+            return self._single_item_outfit(wardrobe_items, occasion, weather_data, explain)
+
+        # Step 4: Score and select best combination using preferences
+        items, = self._rank_outfits(slots, occasion, weather_data, user_preferences, 1)
+
+        # Step 5: Generate explanation with LLaMA
+        return self._build_recommendation(items, occasion, weather_data, explain)
 
-        # Step 3: Separate tops and bottoms
-        tops = [item for item in occasion_suitable if item.outfit_part == 'top' or
-                item.category in {'shirt', 'top', 'blouse', 'hoodie', 'jacket', 'dress'}]
-        bottoms = [item for item in occasion_suitable if item.outfit_part == 'bottom' or
-                   item.category in {'pants', 'jeans', 'skirt', 'leggings'}]
+    def recommend_outfits(self, wardrobe_items, occasion, weather_data, user_preferences=None, limit=3):
+        """
+        Generate the top-ranked outfit recommendations, best first.
 
-        # Fallback: use all items if filtered lists are too small
-        if not tops:
-            tops = [item for item in wardrobe_items if item.outfit_part == 'top' or
-                    item.category in {'shirt', 'top', 'blouse', 'hoodie', 'jacket', 'dress'}]
-        if not bottoms:
-            bottoms = [item for item in wardrobe_items if item.outfit_part == 'bottom' or
-                       item.category in {'pants', 'jeans', 'skirt', 'leggings'}]
+        Used for precomputing suggestions off-peak; each entry has the same
+        shape as the result of generate_outfit.
 
-        if not tops or not bottoms:
-            return self._single_item_outfit(wardrobe_items, occasion, weather_data)
+        Returns:
+            list of dicts with: top, bottom, items, explanation
+        """
+        if not wardrobe_items:
+            return []
 
-        # Step 4: Score and select best combination using preferences
-        top, bottom = self._select_best_pair(tops, bottoms, user_preferences, occasion)
+        slots = self._slot_candidates(wardrobe_items, occasion, weather_data)
+        if not slots['top'] or not slots['bottom']:
+            return [self._single_item_outfit(wardrobe_items, occasion, weather_data)]
 
-        # Step 5: Generate explanation with LLaMA
-        explanation = self._generate_explanation(top, bottom, occasion, weather_data)
+        ranked = self._rank_outfits(slots, occasion, weather_data, user_preferences, limit)
+        return [self._build_recommendation(items, occasion, weather_data) for items in ranked]
+
+    @instrument('sra.scoring')
+    def _rank_outfits(self, slots, occasion, weather_data, user_preferences, limit):
+        """
+        The `limit` best slot -> item assignments for grouped candidates, best first.
+
+        Uses the multi-slot search; without NumPy, tops and bottoms are paired
+        by _score_combination alone.
+        """
+        if outfit_search.NUMPY_AVAILABLE:
+            return [items for _, items in self._search_outfits(
+                slots, occasion, weather_data, user_preferences, limit)]
+
+        liked_combinations = (user_preferences or {}).get('liked_combinations', [])
+        scored = [
+            (self._score_combination(top, bottom, liked_combinations, occasion), random.random(), top, bottom)
+            for top in slots['top']
+            for bottom in slots['bottom']
+        ]
+        # Highest score first; the random key breaks ties between equal scores
+        scored.sort(key=lambda entry: (entry[0], entry[1]), reverse=True)
+        return [{'top': top, 'bottom': bottom} for _, _, top, bottom in scored[:limit]]
+
+    def plan_outfits(self, wardrobe_items, days, user_preferences=None, no_repeat_days=0, explain=True):
+        """
+        Plan outfits for a list of days in one pass.
 
+        Days with the same occasion and weather bucket share one search for
+        their best PLAN_ALTERNATIVES outfits. Days are then filled in date
+        order with the best alternative that repeats no item worn within
+        no_repeat_days; only when every alternative does is the day searched
+        again without those items. Explanations for the whole plan come from
+        a single LLaMA prompt.
+
+        Args:
+            wardrobe_items: List of ClothingItem model instances
+            days: list of dicts with date (datetime.date), occasion and weather
+            user_preferences: dict - learned preferences from feedback history
+            no_repeat_days: an item is not planned again until this many days
+                            after it was last planned (0 allows repeats)
+            explain: bool - ask LLaMA for the explanations (one request)
+
+        Returns:
+            list of dicts shaped like generate_outfit's result plus date,
+            in the order of days
+        """
+        if not wardrobe_items or not days:
+            return []
+
+        candidates = {}    # (occasion, bucket) -> slots
+        alternatives = {}  # (occasion, bucket) -> ranked slot -> item assignments
+        last_worn = {}     # item id -> date last planned
+        plan = [None] * len(days)
+
+        for index in sorted(range(len(days)), key=lambda i: days[i]['date']):
+            day = days[index]
+            occasion, weather_data = day['occasion'], day['weather']
+            context = (occasion, get_weather_bucket(weather_data))
+            if context not in candidates:
+                slots = self._slot_candidates(wardrobe_items, occasion, weather_data)
+                candidates[context] = slots
+                alternatives[context] = self._rank_outfits(
+                    slots, occasion, weather_data, user_preferences, PLAN_ALTERNATIVES
+                ) if slots['top'] and slots['bottom'] else []
+            slots = candidates[context]
+
+            blocked = {
+                item_id for item_id, worn in last_worn.items()
+                if no_repeat_days > 0 and (day['date'] - worn).days < no_repeat_days
+            }
+            if not slots['top'] or not slots['bottom']:
+                items = self._single_item_outfit(wardrobe_items, occasion, weather_data, explain=False)['items']
+            else:
+                items = next((
+                    outfit for outfit in alternatives[context]
+                    if not any(item.id in blocked for item in outfit.values())
+                ), None)
+            if items is None:
+                # Search again without the blocked items; a required slot with
+                # nothing left keeps them rather than going empty
+                unblocked = {}
+                for slot, slot_items in slots.items():
+                    unblocked[slot] = [item for item in slot_items if item.id not in blocked]
+                    if not unblocked[slot] and slot in REQUIRED_SLOTS:
+                        unblocked[slot] = slot_items
+                items, = self._rank_outfits(unblocked, occasion, weather_data, user_preferences, 1)
+
+            for item in items.values():
+                last_worn[item.id] = day['date']
+            recommendation = self._build_recommendation(items, occasion, weather_data, explain=False)
+            recommendation['date'] = day['date']
+            plan[index] = recommendation
+
+        if explain:
+            explanations = self.explain_plan([
+                (day['date'], recommendation['items'], day['occasion'], day['weather'])
+                for day, recommendation in zip(days, plan)
+            ])
+            for recommendation, explanation in zip(plan, explanations):
+                recommendation['explanation'] = explanation
+        return plan
+
+    def _build_recommendation(self, items, occasion, weather_data, explain=True):
+        """Recommendation dict for a slot -> item assignment, with its explanation."""
+        top, bottom = items.get('top'), items.get('bottom')
+        extras = {slot: item for slot, item in items.items() if slot not in REQUIRED_SLOTS}
+        explain_fn = self._generate_explanation if explain else self._fallback_explanation
         return {
             'top': top,
             'bottom': bottom,
-            'explanation': explanation,
+            'items': items,
+            'explanation': explain_fn(top, bottom, occasion, weather_data, extras),
         }
 
+    def _slot_candidates(self, wardrobe_items, occasion, weather_data):
+        """Filter items for the weather and occasion and group them by outfit slot."""
+        # Step 1: Filter items by weather suitability
+        weather_suitable = self._filter_by_weather(wardrobe_items, weather_data)
+
+        # Step 2: Filter by occasion style
+        occasion_suitable = self._filter_by_occasion(weather_suitable, occasion)
+
+        # Step 3: Group by slot
+        slots = {slot: [] for slot in SLOTS}
+        for item in occasion_suitable:
+            slots[item_slot(item)].append(item)
+
+        # Fallback: use all of the slot's items if the filter removed them all
+        for slot in SLOTS:
+            if not slots[slot]:
+                slots[slot] = [item for item in wardrobe_items if item_slot(item) == slot]
+
+        # Coats and jackets only for cold weather
+        if get_weather_bucket(weather_data) == 'warm':
+            slots['outerwear'] = []
+        return slots
+
+    @instrument('sra.outfit_search')
+    def _search_outfits(self, slots, occasion, weather_data, user_preferences, limit=1):
+        """
+        Find the best multi-slot outfits (see outfit_search).
+
+        Top/bottom compatibility is the learned model's score, or colour
+        harmony plus preferences; optional slots score their fit for the
+        occasion and their colour harmony and style agreement with every
+        other piece.
+
+        Returns:
+            list of (score, {slot: item}), best first
+        """
+        tops, bottoms = slots['top'], slots['bottom']
+        max_candidates = max(self.config.get('OUTFIT_SLOT_CANDIDATES', 12), limit)
+
+        model = self._get_preference_model()
+        if model is not None:
+            pair_scores = model.score_pairs(tops, bottoms, occasion, (user_preferences or {}).get('user_id'))
+        else:
+            pair_scores = self._pair_scores(tops, bottoms, user_preferences)
+
+        # Prune tops and bottoms to those in the best pairs
+        top_index = outfit_search.top_k(pair_scores.max(axis=1), max_candidates)
+        bottom_index = outfit_search.top_k(pair_scores.max(axis=0), max_candidates)
+        options = [('top', [tops[i] for i in top_index]), ('bottom', [bottoms[j] for j in bottom_index])]
+        unary = [np.zeros(len(top_index), dtype=np.float32), np.zeros(len(bottom_index), dtype=np.float32)]
+        pairwise = {(0, 1): np.asarray(pair_scores[np.ix_(top_index, bottom_index)], dtype=np.float32)}
+        # Per option: palette and styles of its real items (without the empty choice)
+        features = []
+        for _, items in options:
+            lab, mask = color_harmony.items_to_lab(items)
+            features.append((lab, mask, np.array([item.style for item in items], dtype=object)))
+
+        occasion_styles = OCCASION_STYLE_MAP.get(occasion, ['casual'])
+        for slot in SLOTS:
+            candidates = slots[slot] if slot not in REQUIRED_SLOTS else []
+            if not candidates:
+                continue
+            lab, mask = color_harmony.items_to_lab(candidates)
+            styles = np.array([item.style for item in candidates], dtype=object)
+            fit = SLOT_FILL_BONUS + OCCASION_STYLE_BONUS * np.isin(styles, occasion_styles)
+            compat = [
+                HARMONY_WEIGHT * color_harmony.harmony_matrix(other_lab, other_mask, lab, mask)
+                + STYLE_MATCH_BONUS * (other_styles[:, None] == styles)
+                for other_lab, other_mask, other_styles in features
+            ]
+
+            # Prune on the item's own fit plus its best match with each chosen slot
+            keep = outfit_search.top_k(fit + sum(matrix.max(axis=0) for matrix in compat), max_candidates)
+            depth = len(options)
+            # The trailing None option leaves the slot empty (scores 0 throughout)
+            options.append((slot, [candidates[i] for i in keep] + [None]))
+            unary.append(np.append(fit[keep], 0).astype(np.float32))
+            for i, matrix in enumerate(compat):
+                pairwise[(i, depth)] = np.pad(matrix[:, keep], ((0, 0), (0, 1))).astype(np.float32)
+            features.append((lab[keep], mask[keep], styles[keep]))
+
+        # Rows for the None options of earlier optional slots are zero too
+        for (i, k), matrix in pairwise.items():
+            if matrix.shape[0] < len(options[i][1]):
+                pairwise[(i, k)] = np.pad(matrix, ((0, len(options[i][1]) - matrix.shape[0]), (0, 0)))
+
+        budget = self.config.get('OUTFIT_SEARCH_BUDGET_MS', 50) / 1000
+        outfits, stats = outfit_search.search(options, unary, pairwise, limit, budget)
+        if stats['timed_out']:
+            logger.info(f"Outfit search hit its {budget * 1000:.0f} ms budget after {stats['nodes']} nodes")
+        return outfits
+
     def _filter_by_weather(self, items, weather_data):
         """Filter clothing items by weather suitability."""
-        temp = weather_data.get('temperature', weather_data.get('temp', 20))
-        is_warm = temp >= WARM_THRESHOLD
+        is_warm = get_weather_bucket(weather_data) == 'warm'
 
         suitable = []
         for item in items:
@@ -120,71 +405,127 @@ class StylingRecommendationAgent:
         suitable = [item for item in items if item.style in preferred_styles]
         return suitable if suitable else items  # Fallback to all items
 
-    def _select_best_pair(self, tops, bottoms, user_preferences, occasion):
-        """Select the best top-bottom combination based on preferences."""
-        if not user_preferences:
-            return random.choice(tops), random.choice(bottoms)
-
-        # Score pairs based on liked color combinations and styles
-        liked_combinations = user_preferences.get('liked_combinations', [])
-        best_score = -1
-        best_top = random.choice(tops)
-        best_bottom = random.choice(bottoms)
-
-        for top in tops:
-            for bottom in bottoms:
-                score = self._score_combination(top, bottom, liked_combinations, occasion)
-                if score > best_score:
-                    best_score = score
-                    best_top = top
-                    best_bottom = bottom
-
-        return best_top, best_bottom
-
     def _score_combination(self, top, bottom, liked_combinations, occasion):
         """Score a top-bottom combination based on learned preferences."""
         score = 0
+        top_colors = top.get_dominant_colors()
+        bottom_colors = bottom.get_dominant_colors()
 
         for liked in liked_combinations:
+            # Recent feedback weighs more (see FeedbackAgent.get_user_preferences)
+            weight = liked.get('weight', 1)
+
             # Reward matching style combinations
             if (liked.get('top_style') == top.style and
                     liked.get('bottom_style') == bottom.style):
-                score += 2
+                score += 2 * weight
 
             # Reward matching color combinations
-            top_colors = top.get_dominant_colors()
-            bottom_colors = bottom.get_dominant_colors()
             liked_top_colors = liked.get('top_colors', [])
             liked_bottom_colors = liked.get('bottom_colors', [])
 
             for tc in top_colors:
                 if tc in liked_top_colors:
-                    score += 1
+                    score += weight
             for bc in bottom_colors:
                 if bc in liked_bottom_colors:
-                    score += 1
+                    score += weight
 
         return score
 
-    def _single_item_outfit(self, wardrobe_items, occasion, weather_data):
+    def _single_item_outfit(self, wardrobe_items, occasion, weather_data, explain=True):
         """Handle case where only tops or bottoms exist."""
         item = random.choice(wardrobe_items)
-        explanation = self._generate_explanation(
-            item if item.outfit_part == 'top' else None,
-            item if item.outfit_part == 'bottom' else None,
-            occasion,
-            weather_data,
-        )
-        return {
-            'top': item if item.outfit_part == 'top' else None,
-            'bottom': item if item.outfit_part == 'bottom' else None,
-            'explanation': explanation,
-        }
+        slot = item_slot(item)
+        return self._build_recommendation({slot: item}, occasion, weather_data, explain)
+
+    def explain_outfit(self, top, bottom, occasion, weather_data, extras=None):
+        """Generate the LLaMA explanation for an already selected outfit."""
+        return self._generate_explanation(top, bottom, occasion, weather_data, extras)
+
+    @instrument('sra.llm_plan_explanation')
+    def explain_plan(self, days):
+        """
+        Generate the explanations for a planned set of outfits with one LLaMA call.
 
-    def _generate_explanation(self, top, bottom, occasion, weather_data):
+        Args:
+            days: list of (date, {slot: item}, occasion, weather_data)
+
+        Returns:
+            list of explanation strings in the order of days; any day the
+            reply does not cover gets the rule-based explanation
+        """
+        explanations = [None] * len(days)
+        blocks = []
+        for number, (date, items, occasion, weather_data) in enumerate(days, 1):
+            temp = weather_data.get('temperature', weather_data.get('temp', 20))
+            condition = weather_data.get('condition', weather_data.get('weather', 'clear'))
+            pieces = '; '.join(f"{slot}: {self._describe_item(item)}" for slot, item in items.items())
+            blocks.append(f"{number}. {date.isoformat()} - {occasion}, {condition}, {temp}°C - {pieces}")
+
+        try:
+            import requests
+            plan_lines = '\n'.join(blocks)
+            prompt = f"""You are a professional fashion stylist. Here is an outfit plan, one outfit per day:
+
+{plan_lines}
+
+For each day, write 2-3 brief, encouraging sentences explaining why the outfit works for the occasion and weather. Be specific about color coordination and style.
+Reply with only a JSON array of {len(days)} strings, one per day, in the same order."""
+
+            response = requests.post(
+                f"{self.ollama_url}/api/generate",
+                json={
+                    "model": self.ollama_model,
+                    "prompt": prompt,
+                    "stream": False,
+                    "format": "json",
+                },
+                timeout=60 + 15 * len(days),
+            )
+
+            if response.status_code == 200:
+                reply = self._parse_plan_reply(response.json().get('response', ''))
+                for i, explanation in enumerate(reply[:len(days)]):
+                    if isinstance(explanation, str) and explanation.strip():
+                        explanations[i] = explanation.strip()
+                logger.info(f"LLaMA explained {sum(e is not None for e in explanations)}/{len(days)} planned outfits")
+        except Exception as e:
+            logger.warning(f"LLaMA plan explanation failed (Ollama may not be running): {e}")
+
+        # Fallback: rule-based explanation for anything the reply missed
+        for i, (_, items, occasion, weather_data) in enumerate(days):
+            if explanations[i] is None:
+                extras = {slot: item for slot, item in items.items() if slot not in REQUIRED_SLOTS}
+                explanations[i] = self._fallback_explanation(
+                    items.get('top'), items.get('bottom'), occasion, weather_data, extras)
+        return explanations
+
+    @staticmethod
+    def _parse_plan_reply(text):
+        """The list of explanations in a plan reply: a JSON array, or an object wrapping one."""
+        try:
+            reply = json.loads(text)
+        except (json.JSONDecodeError, TypeError):
+            start, end = text.find('['), text.rfind(']')
+            if start < 0 or end < start:
+                return []
+            try:
+                reply = json.loads(text[start:end + 1])
+            except json.JSONDecodeError:
+                return []
+        if isinstance(reply, dict):
+            reply = next((value for value in reply.values() if isinstance(value, list)), list(reply.values()))
+        return reply if isinstance(reply, list) else []
+
+    @instrument('sra.llm_explanation')
+    def _generate_explanation(self, top, bottom, occasion, weather_data, extras=None):
         """Use LLaMA via Ollama to generate a natural language outfit explanation."""
         top_desc = self._describe_item(top) if top else "no top selected"
         bottom_desc = self._describe_item(bottom) if bottom else "no bottom selected"
+        extra_lines = ''.join(
+            f"- {slot.capitalize()}: {self._describe_item(item)}\n" for slot, item in (extras or {}).items()
+        )
         temp = weather_data.get('temperature', weather_data.get('temp', 20))
         condition = weather_data.get('condition', weather_data.get('weather', 'clear'))
 
@@ -195,7 +536,7 @@ class StylingRecommendationAgent:
 Outfit details:
 - Top: {top_desc}
 - Bottom: {bottom_desc}
-- Occasion: {occasion}
+{extra_lines}- Occasion: {occasion}
 - Weather: {condition}, {temp}°C
 
 Write 2-3 sentences explaining why this outfit works for the occasion and weather. Be specific about color coordination and style. Keep it friendly and concise."""
@@ -220,16 +561,16 @@ Write 2-3 sentences explaining why this outfit works for the occasion and weathe
             logger.warning(f"LLaMA explanation failed (Ollama may not be running): {e}")
 
         # Fallback: rule-based explanation
-        return self._fallback_explanation(top, bottom, occasion, weather_data)
+        return self._fallback_explanation(top, bottom, occasion, weather_data, extras)
 
     def _describe_item(self, item):
         """Create a text description of a clothing item."""
         if not item:
             return "none"
-        colors = ', '.join(item.get_dominant_colors()[:2]) if item.get_dominant_colors() else "unknown color"
+        colors = ', '.join(item.get_dominant_colors()[:2]) or "unknown color"
         return f"{colors} {item.style} {item.category}"
 
-    def _fallback_explanation(self, top, bottom, occasion, weather_data):
+    def _fallback_explanation(self, top, bottom, occasion, weather_data, extras=None):
         """Generate a simple rule-based explanation when LLaMA is unavailable."""
         temp = weather_data.get('temperature', weather_data.get('temp', 20))
         condition = weather_data.get('condition', weather_data.get('weather', 'clear'))
@@ -241,6 +582,10 @@ Write 2-3 sentences explaining why this outfit works for the occasion and weathe
             parts.append(f"{bottom.style} {bottom.category}")
 
         outfit_str = " paired with ".join(parts) if parts else "this outfit"
+        if extras:
+            pieces = [f"{item.style} {item.category}" for item in extras.values()]
+            outfit_str += ", finished with " + (
+                pieces[0] if len(pieces) == 1 else ", ".join(pieces[:-1]) + " and " + pieces[-1])
         temp_desc = "warm" if temp >= WARM_THRESHOLD else "cold"
 
         return (f"This outfit combines {outfit_str}, perfect for a {occasion} occasion. "
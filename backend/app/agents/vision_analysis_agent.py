@@ -13,7 +13,10 @@ Transforms raw image data into structured clothing metadata.
 import os
 import json
 import logging
+import threading
 from io import BytesIO
+from app.metrics import instrument
+from app.agents.outfit_search import category_slot
 
 logger = logging.getLogger(__name__)
 
@@ -67,8 +70,50 @@ YOLO_TO_CLOTHING_MAP = {
     'leggings': 'pants',
 }
 
-TOP_CATEGORIES = {'shirt', 'top', 'blouse', 'hoodie', 'jacket', 'dress'}
-BOTTOM_CATEGORIES = {'pants', 'jeans', 'skirt', 'leggings'}
+# One YOLOv8 model per process, shared by every agent instance. When the app
+# is preloaded before forking, workers share these weights copy-on-write.
+_shared_yolo_model = None
+_yolo_load_lock = threading.Lock()
+# Ultralytics predictors are not safe to call from several threads at once
+_yolo_inference_lock = threading.Lock()
+
+
+def load_yolo_model(model_path='yolov8n.pt'):
+    """Load the shared YOLOv8 model once per process."""
+    global _shared_yolo_model
+    if not YOLO_AVAILABLE:
+        return None
+    if _shared_yolo_model is None:
+        with _yolo_load_lock:
+            if _shared_yolo_model is None:
+                try:
+                    # Use nano model for speed; it handles general object detection
+                    _shared_yolo_model = YOLO(model_path)
+                    logger.info("YOLOv8 model loaded successfully")
+                except Exception as e:
+                    logger.error(f"Failed to load YOLOv8 model: {e}")
+                    return None
+    return _shared_yolo_model
+
+
+def warm_up_yolo_model(model_path='yolov8n.pt'):
+    """
+    Load the shared model and run one dummy inference so the predictor is
+    initialised before the first real upload.
+
+    Returns:
+        bool - True if the model is loaded and ready
+    """
+    model = load_yolo_model(model_path)
+    if model is None:
+        return False
+    if PIL_AVAILABLE:
+        try:
+            with _yolo_inference_lock:
+                model(Image.new('RGB', (64, 64)), verbose=False)
+        except Exception as e:
+            logger.warning(f"YOLOv8 warm-up inference failed: {e}")
+    return True
 
 
 class VisionAnalysisAgent:
@@ -82,23 +127,12 @@ class VisionAnalysisAgent:
 
     def __init__(self, app_config):
         self.config = app_config
-        self._yolo_model = None
         self.ollama_url = app_config.get('OLLAMA_BASE_URL', 'http://localhost:11434')
         self.ollama_model = app_config.get('OLLAMA_MODEL', 'llama3.2')
 
     def _get_yolo_model(self):
-        """Lazy-load YOLOv8 model."""
-        if not YOLO_AVAILABLE:
-            return None
-        if self._yolo_model is None:
-            try:
-                # Use nano model for speed; it handles general object detection
-                self._yolo_model = YOLO('yolov8n.pt')
-                logger.info("YOLOv8 model loaded successfully")
-            except Exception as e:
-                logger.error(f"Failed to load YOLOv8 model: {e}")
-                return None
-        return self._yolo_model
+        """Lazy-load the shared YOLOv8 model."""
+        return load_yolo_model(self.config.get('YOLO_MODEL_PATH', 'yolov8n.pt'))
 
     def analyze_image(self, image_path, user_metadata=None):
         """
@@ -125,11 +159,16 @@ class VisionAnalysisAgent:
         # Step 1: Preprocess image
         preprocessed_path = self._preprocess_image(image_path)
 
-        # Step 2: Extract dominant colors
-        result['dominant_colors'] = self._extract_colors(preprocessed_path or image_path)
+        try:
+            # Step 2: Extract dominant colors
+            result['dominant_colors'] = self._extract_colors(preprocessed_path or image_path)
 
-        # Step 3: Detect clothing category via YOLOv8
-        detected_category = self._detect_category_yolo(preprocessed_path or image_path)
+            # Step 3: Detect clothing category via YOLOv8
+            detected_category = self._detect_category_yolo(preprocessed_path or image_path)
+        finally:
+            # The preprocessed copy is only needed for analysis
+            if preprocessed_path and os.path.exists(preprocessed_path):
+                os.remove(preprocessed_path)
 
         # Step 4: Use LLaMA for style classification if category detected
         if detected_category:
@@ -160,12 +199,15 @@ class VisionAnalysisAgent:
 
         return result
 
+    @instrument('vaa.preprocess')
     def _preprocess_image(self, image_path):
         """Preprocess image using OpenCV and Pillow for better analysis."""
         if not PIL_AVAILABLE:
             return None
         try:
             img = Image.open(image_path)
+            # Let JPEG decode at a reduced scale close to the target size
+            img.draft('RGB', (640, 640))
 
             # Convert to RGB if needed
             if img.mode != 'RGB':
@@ -181,6 +223,7 @@ class VisionAnalysisAgent:
             logger.error(f"Image preprocessing failed: {e}")
             return None
 
+    @instrument('vaa.extract_colors')
     def _extract_colors(self, image_path):
         """Extract dominant colors from clothing image using ColorThief."""
         if not COLORTHIEF_AVAILABLE:
@@ -201,8 +244,9 @@ class VisionAnalysisAgent:
         if not PIL_AVAILABLE:
             return []
         try:
-            img = Image.open(image_path).convert('RGB')
-            img = img.resize((100, 100))
+            img = Image.open(image_path)
+            img.draft('RGB', (100, 100))
+            img = img.convert('RGB').resize((100, 100))
             pixels = list(img.getdata())
             # Simple dominant color: average of most common pixels
             r = sum(p[0] for p in pixels) // len(pixels)
@@ -213,6 +257,7 @@ class VisionAnalysisAgent:
             logger.error(f"Pillow color extraction failed: {e}")
             return []
 
+    @instrument('vaa.detect_category_yolo')
     def _detect_category_yolo(self, image_path):
         """Use YOLOv8 to detect clothing category in the image."""
         model = self._get_yolo_model()
@@ -220,7 +265,8 @@ class VisionAnalysisAgent:
             return None
 
         try:
-            results = model(image_path, verbose=False)
+            with _yolo_inference_lock:
+                results = model(image_path, verbose=False)
             for result in results:
                 for box in result.boxes:
                     class_name = model.names[int(box.cls[0])].lower()
@@ -233,6 +279,7 @@ class VisionAnalysisAgent:
             logger.error(f"YOLOv8 detection failed: {e}")
             return None
 
+    @instrument('vaa.classify_llm')
     def _classify_with_llama(self, image_path, detected_category, colors):
         """Use LLaMA via Ollama to classify style and weather suitability."""
         try:
@@ -276,12 +323,8 @@ Respond ONLY with a JSON object in this exact format:
         return {'style': 'casual', 'weather_suitability': 'warm'}
 
     def _infer_outfit_part(self, category):
-        """Infer whether clothing is a top or bottom based on category."""
-        if category in TOP_CATEGORIES:
-            return 'top'
-        elif category in BOTTOM_CATEGORIES:
-            return 'bottom'
-        return 'top'
+        """Infer the outfit slot (top, bottom, outerwear, shoes, accessory) from the category."""
+        return category_slot(category) or 'top'
 
     @staticmethod
     def _rgb_to_hex(rgb):
@@ -1,6 +1,6 @@
 """Feedback API controller - handles user outfit feedback."""
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.feedback_service import FeedbackService
 
@@ -36,3 +36,35 @@ def submit_feedback(user_id):
         return jsonify({'message': error}), 404
 
     return jsonify({'message': 'Feedback submitted successfully', 'feedback': result}), 200
+
+
+@feedback_bp.route('/api/users/<user_id>/feedback/batch', methods=['POST'])
+@jwt_required()
+def submit_feedback_batch(user_id):
+    if not _verify_user(user_id):
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Request body is required'}), 400
+
+    max_batch = current_app.config.get('FEEDBACK_BATCH_MAX', 100)
+    entries = data.get('reactions')
+    if not isinstance(entries, list) or not 1 <= len(entries) <= max_batch:
+        return jsonify({'message': f'reactions must be a list of 1 to {max_batch} entries'}), 400
+
+    reactions = []
+    for entry in entries:
+        outfit_id = entry.get('outfit_id') if isinstance(entry, dict) else None
+        reaction = (entry.get('feedback') or entry.get('reaction')) if isinstance(entry, dict) else None
+        if not isinstance(outfit_id, str) or not outfit_id or not reaction:
+            return jsonify({'message': 'Each reaction needs outfit_id and feedback'}), 400
+        if reaction not in ('liked', 'disliked'):
+            return jsonify({'message': 'feedback must be "liked" or "disliked"'}), 400
+        reactions.append((outfit_id, reaction))
+
+    result, error = FeedbackService.submit_feedback_batch(user_id, reactions)
+    if error:
+        return jsonify({'message': error}), 404
+
+    return jsonify({'message': f'{len(result)} feedback entries submitted successfully', 'feedback': result}), 200
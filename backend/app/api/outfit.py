@@ -1,8 +1,10 @@
 """Outfit API controller - handles outfit generation and saved outfits."""
 
-from flask import Blueprint, request, jsonify
+from datetime import date
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.outfit_service import OutfitService
+from app.services.weather_service import WeatherService
 
 outfit_bp = Blueprint('outfit', __name__)
 
@@ -12,6 +14,45 @@ def _verify_user(user_id):
     return current_user == user_id
 
 
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _weather_error(weather_data):
+    """Validation message for a client-supplied weather snapshot, or None if it is usable."""
+    if weather_data is None:
+        return None
+    if not isinstance(weather_data, dict):
+        return 'weather must be an object'
+    for key in ('temperature', 'temp'):
+        if key in weather_data and not _is_number(weather_data[key]):
+            return f'weather {key} must be a number'
+    return None
+
+
+def _parse_location(data):
+    """
+    Optional location a request body gives for server-side weather lookups.
+
+    Returns:
+        tuple of (dict with city, lat and lon, error message)
+    """
+    location = {
+        'city': data.get('city'),
+        'lat': data.get('lat'),
+        'lon': data.get('lon'),
+    }
+    if location['city'] is not None and not isinstance(location['city'], str):
+        return None, 'city must be a string'
+    for key in ('lat', 'lon'):
+        if location[key] is not None:
+            try:
+                location[key] = float(location[key])
+            except (TypeError, ValueError):
+                return None, f'{key} must be a number'
+    return WeatherService.validate_location(**location)
+
+
 @outfit_bp.route('/api/users/<user_id>/outfit/generate', methods=['POST'])
 @jwt_required()
 def generate_outfit(user_id):
@@ -23,18 +64,77 @@ def generate_outfit(user_id):
         return jsonify({'message': 'Request body is required'}), 400
 
     occasion = data.get('occasion')
-    weather_data = data.get('weather', {})
+    weather_data = data.get('weather')
 
     if not occasion:
         return jsonify({'message': 'Occasion is required'}), 400
+    error = _weather_error(weather_data)
+    if error:
+        return jsonify({'message': error}), 400
+
+    # Optional location used when the server resolves the weather itself
+    location, error = _parse_location(data)
+    if error:
+        return jsonify({'message': error}), 400
 
-    outfit, error = OutfitService.generate_outfit(user_id, occasion, weather_data)
+    outfit, error = OutfitService.generate_outfit(
+        user_id, occasion, weather_data, location,
+        idempotency_key=request.headers.get('Idempotency-Key'),
+    )
     if error:
         return jsonify({'message': error}), 422
 
     return jsonify(outfit), 200
 
 
+@outfit_bp.route('/api/users/<user_id>/outfit/plan', methods=['POST'])
+@jwt_required()
+def plan_outfits(user_id):
+    if not _verify_user(user_id):
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Request body is required'}), 400
+
+    max_days = current_app.config.get('OUTFIT_PLAN_MAX_DAYS', 14)
+    raw_days = data.get('days')
+    if not isinstance(raw_days, list) or not 1 <= len(raw_days) <= max_days:
+        return jsonify({'message': f'days must be a list of 1 to {max_days} entries'}), 400
+
+    days = []
+    for entry in raw_days:
+        if not isinstance(entry, dict) or not entry.get('occasion'):
+            return jsonify({'message': 'Each day needs a date and an occasion'}), 400
+        try:
+            day = date.fromisoformat(str(entry.get('date')))
+        except ValueError:
+            return jsonify({'message': 'Each day needs a date in YYYY-MM-DD format'}), 400
+        weather_data = entry.get('weather')
+        error = _weather_error(weather_data)
+        if error:
+            return jsonify({'message': error}), 400
+        days.append({'date': day, 'occasion': entry['occasion'], 'weather': weather_data})
+
+    try:
+        no_repeat_days = int(data.get('no_repeat_days', 0))
+    except (TypeError, ValueError):
+        no_repeat_days = -1
+    if no_repeat_days < 0:
+        return jsonify({'message': 'no_repeat_days must be a non-negative integer'}), 400
+
+    # Optional location used for days without a forecast
+    location, error = _parse_location(data)
+    if error:
+        return jsonify({'message': error}), 400
+
+    outfits, error = OutfitService.plan_outfits(user_id, days, no_repeat_days, location)
+    if error:
+        return jsonify({'message': error}), 422
+
+    return jsonify({'outfits': outfits}), 200
+
+
 @outfit_bp.route('/api/users/<user_id>/outfits/saved', methods=['GET'])
 @jwt_required()
 def get_saved_outfits(user_id):
@@ -0,0 +1,63 @@
+"""Uploads controller - serves stored wardrobe images.
+
+Images are served without authentication, so their names must not be
+guessable: upload keys are content hashes keyed with UPLOAD_KEY_SECRET (or,
+for older uploads, random UUIDs), which nobody holding an image can compute.
+Keys are never rewritten, so responses are marked immutable and cached for a
+year. In
+``flask`` mode Werkzeug answers ETag revalidation and Range requests itself;
+in ``x-accel-redirect`` or ``x-sendfile`` mode the response only carries a
+header telling the reverse proxy which file to send, so no Python worker
+streams image bytes. Backends without local files are streamed from storage.
+"""
+
+import os
+import mimetypes
+from flask import Blueprint, Response, current_app, request, send_from_directory, abort
+from app.storage import get_storage
+
+uploads_bp = Blueprint('uploads', __name__)
+
+
+@uploads_bp.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    config = current_app.config
+    storage = get_storage()
+    max_age = config.get('UPLOAD_CACHE_MAX_AGE', 31536000)
+    mode = config.get('UPLOAD_SERVE_MODE', 'flask')
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if storage.root is None:
+        try:
+            if not storage.exists(filename):
+                abort(404)
+            data = storage.open(filename).read()
+        except ValueError:
+            abort(404)
+        response = Response(data, mimetype=mimetype)
+        response.set_etag(filename.rsplit('/', 1)[-1])
+        response.cache_control.max_age = max_age
+        response.make_conditional(request)
+    elif mode == 'flask':
+        response = send_from_directory(
+            storage.root, filename, max_age=max_age, conditional=True, etag=True
+        )
+    else:
+        try:
+            path = storage.path(filename)
+        except ValueError:
+            abort(404)
+        if not os.path.isfile(path):
+            abort(404)
+
+        response = Response(mimetype=mimetype)
+        if mode == 'x-accel-redirect':
+            prefix = config.get('UPLOAD_ACCEL_PREFIX', '/protected-uploads/')
+            response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + filename
+        else:
+            response.headers['X-Sendfile'] = path
+        response.cache_control.max_age = max_age
+
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -3,6 +3,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.wardrobe_service import WardrobeService
+from app.services.similarity_service import SimilarityService
+from app.colors import NO_COLOR, pack_color
 
 wardrobe_bp = Blueprint('wardrobe', __name__)
 
@@ -19,7 +21,20 @@ def get_wardrobe(user_id):
     if not _verify_user(user_id):
         return jsonify({'message': 'Unauthorized'}), 403
 
-    items = WardrobeService.get_wardrobe(user_id)
+    color = None
+    tolerance = 0
+    if request.args.get('color'):
+        color = pack_color(request.args['color'])
+        if color == NO_COLOR:
+            return jsonify({'message': 'color must be a #rrggbb hex colour'}), 400
+        try:
+            tolerance = int(request.args.get('color_tolerance', 0))
+        except ValueError:
+            tolerance = -1
+        if not 0 <= tolerance <= 255:
+            return jsonify({'message': 'color_tolerance must be an integer from 0 to 255'}), 400
+
+    items = WardrobeService.get_wardrobe(user_id, color, tolerance)
     return jsonify(items), 200
 
 
@@ -41,10 +56,29 @@ def add_item(user_id):
     if not form_data['category'] or not form_data['style']:
         return jsonify({'message': 'Category and style are required'}), 400
 
-    item = WardrobeService.add_item(user_id, file, form_data)
+    item, error = WardrobeService.add_item(user_id, file, form_data)
+    if error:
+        return jsonify({'message': error}), 400
     return jsonify(item), 201
 
 
+@wardrobe_bp.route('/api/users/<user_id>/wardrobe/changes', methods=['GET'])
+@jwt_required()
+def get_wardrobe_changes(user_id):
+    if not _verify_user(user_id):
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        since = -1
+    if since < 0:
+        return jsonify({'message': 'since must be a non-negative integer cursor'}), 400
+
+    changes = WardrobeService.get_changes(user_id, since)
+    return jsonify(changes), 200
+
+
 @wardrobe_bp.route('/api/users/<user_id>/wardrobe/<item_id>', methods=['GET'])
 @jwt_required()
 def get_item(user_id, item_id):
@@ -57,6 +91,29 @@ def get_item(user_id, item_id):
     return jsonify(item), 200
 
 
+@wardrobe_bp.route('/api/users/<user_id>/wardrobe/<item_id>/similar', methods=['GET'])
+@jwt_required()
+def get_similar_items(user_id, item_id):
+    if not _verify_user(user_id):
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= 50:
+        return jsonify({'message': 'limit must be an integer between 1 and 50'}), 400
+
+    items, error = SimilarityService.find_similar(
+        user_id, item_id, limit, outfit_part=request.args.get('outfit_part') or None
+    )
+    if error == 'Item not found':
+        return jsonify({'message': error}), 404
+    if error:
+        return jsonify({'message': error}), 422
+    return jsonify(items), 200
+
+
 @wardrobe_bp.route('/api/users/<user_id>/wardrobe/<item_id>', methods=['DELETE'])
 @jwt_required()
 def delete_item(user_id, item_id):
@@ -0,0 +1,212 @@
+"""Flask CLI commands for batch and maintenance jobs.
+
+Run with ``flask --app run <group> <command>`` from the backend directory.
+"""
+
+import click
+from flask.cli import AppGroup
+
+suggestions_cli = AppGroup('suggestions', help='Precomputed outfit suggestions.')
+images_cli = AppGroup('images', help='Wardrobe image maintenance.')
+jobs_cli = AppGroup('jobs', help='Background job queue.')
+preferences_cli = AppGroup('preferences', help='Learned outfit preference model.')
+
+
+@suggestions_cli.command('precompute')
+@click.option('--user', 'user_id', default=None, help='Only precompute for this user ID.')
+@click.option('--bucket', 'buckets', multiple=True, type=click.Choice(['warm', 'cold']),
+              help='Weather bucket to compute (repeatable). Defaults to all.')
+def precompute_suggestions(user_id, buckets):
+    """Precompute top outfits per occasion and weather bucket (run off-peak)."""
+    from app.services.suggestion_service import SuggestionService, WEATHER_BUCKETS
+    from app.services.weather_service import WeatherService
+
+    buckets = buckets or WEATHER_BUCKETS
+    forecast = WeatherService.get_current_weather()
+
+    if user_id:
+        count = SuggestionService.precompute_for_user(user_id, buckets, forecast)
+        click.echo(f"Stored {count} suggestions for user {user_id}")
+    else:
+        users, count = SuggestionService.precompute_all(buckets, forecast)
+        click.echo(f"Stored {count} suggestions for {users} users")
+
+
+@images_cli.command('backfill-variants')
+@click.option('--workers', type=int, default=None, help='Process pool size (default: CPU count).')
+@click.option('--batch-size', type=int, default=200, help='Items committed per batch.')
+@click.option('--force', is_flag=True, help='Regenerate variants that already exist.')
+def backfill_variants(workers, batch_size, force):
+    """Generate WebP thumbnails and mid-size variants for existing uploads."""
+    from app.services.image_service import ImageService
+
+    processed, updated = ImageService.backfill_variants(workers, batch_size, force)
+    click.echo(f"Generated variants for {updated} of {processed} items")
+
+
+@images_cli.command('backfill-descriptors')
+@click.option('--workers', type=int, default=None, help='Process pool size (default: CPU count).')
+@click.option('--batch-size', type=int, default=200, help='Items committed per batch.')
+@click.option('--force', is_flag=True, help='Recompute descriptors that already exist.')
+def backfill_descriptors(workers, batch_size, force):
+    """Compute visual similarity descriptors for existing uploads."""
+    from app.services.similarity_service import SimilarityService
+
+    processed, updated = SimilarityService.backfill_descriptors(workers, batch_size, force)
+    click.echo(f"Computed descriptors for {updated} of {processed} items")
+
+
+@images_cli.command('migrate-colors')
+@click.option('--batch-size', type=int, default=500, help='Items committed per batch.')
+def migrate_colors(batch_size):
+    """Convert JSON dominant colours to the packed colour columns."""
+    from app.services.wardrobe_service import WardrobeService
+
+    converted, unreadable = WardrobeService.migrate_packed_colors(batch_size)
+    click.echo(f"Packed dominant colours for {converted} items ({unreadable} unreadable)")
+
+
+@images_cli.command('gc')
+@click.option('--dry-run', is_flag=True, help='Report what would be deleted without deleting it.')
+@click.option('--min-age', type=int, default=None,
+              help='Only collect files older than this many seconds (default: STORAGE_GC_MIN_AGE).')
+@click.option('--batch-size', type=int, default=None, help='Files deleted per batch.')
+def collect_garbage(dry_run, min_age, batch_size):
+    """Delete upload files no wardrobe item references."""
+    from flask import current_app
+    from app.services.storage_service import StorageService
+
+    report = StorageService.collect_garbage(
+        dry_run=dry_run,
+        min_age=current_app.config['STORAGE_GC_MIN_AGE'] if min_age is None else min_age,
+        batch_size=batch_size or current_app.config['STORAGE_GC_BATCH_SIZE'],
+    )
+    verb = 'Would delete' if dry_run else 'Deleted'
+    click.echo(f"Scanned {report['scanned']} files")
+    click.echo(f"{verb} {report['deleted']} files ({report['orphans']} orphaned, "
+               f"{report['derived']} preprocessing leftovers, {report['temp']} temp)")
+    click.echo(f"Reclaimed {report['bytes_reclaimed'] / (1024 * 1024):.1f} MB "
+               f"({report['bytes_reclaimed']} bytes)")
+    click.echo(f"Reconciled {report['blobs_reconciled']} blob reference counts")
+
+
+@jobs_cli.command('worker')
+@click.option('--concurrency', default=None,
+              help='Per-type limits, e.g. "vaa.analyze=2,outfit.explain=4" (default: JOB_CONCURRENCY).')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+@click.option('--metrics-port', type=int, default=None, help='Serve worker metrics on this port.')
+def run_worker(concurrency, burst, metrics_port):
+    """Run queued jobs in a process pool until interrupted."""
+    import signal
+    from flask import current_app
+    from app.jobs import JobWorker, parse_concurrency, serve_metrics
+
+    config = current_app.config
+    try:
+        limits = parse_concurrency(concurrency or config['JOB_CONCURRENCY'])
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--concurrency')
+
+    worker = JobWorker(
+        limits,
+        poll_interval=config['JOB_POLL_INTERVAL'],
+        visibility_timeout=config['JOB_VISIBILITY_TIMEOUT'],
+    )
+    if metrics_port:
+        serve_metrics(current_app._get_current_object(), metrics_port)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+
+    processed = worker.run(burst=burst)
+    click.echo(f"Processed {processed} jobs")
+
+
+@jobs_cli.command('stats')
+def job_stats():
+    """Show queue depth per job type."""
+    from app.services.job_service import JobService
+
+    stats = JobService.get_stats()
+    if not stats:
+        click.echo("No jobs")
+    for job_type, counts in sorted(stats.items()):
+        summary = ', '.join(f"{status}={count}" for status, count in sorted(counts.items())
+                            if status != 'oldest_queued_seconds')
+        oldest = counts.get('oldest_queued_seconds')
+        age = f" (oldest due {oldest:.0f}s ago)" if oldest is not None else ''
+        click.echo(f"{job_type}: {summary}{age}")
+
+
+@jobs_cli.command('purge')
+@click.option('--days', type=int, default=7, help='Delete finished jobs older than this.')
+def purge_jobs(days):
+    """Delete old succeeded and failed jobs."""
+    from app.services.job_service import JobService
+
+    click.echo(f"Deleted {JobService.purge_finished(days)} finished jobs")
+
+
+@preferences_cli.command('train')
+@click.option('--workers', type=int, default=None, help='Process pool size for per-user fits.')
+@click.option('--epochs', type=int, default=20, help='Passes over the feedback for the shared weights.')
+def train_preferences(workers, epochs):
+    """Train a new preference model version from all feedback (run off-peak)."""
+    from app.services.preference_service import PreferenceService
+
+    meta, error = PreferenceService.train_model(workers, epochs)
+    if error:
+        raise click.ClickException(error)
+    click.echo(f"Trained preference model {meta['version']} on {meta['examples']} signals "
+               f"({meta['users']} users with personal weights)")
+    if 'holdout_log_loss' in meta:
+        click.echo(f"Held-out log loss {meta['holdout_log_loss']:.4f}, accuracy {meta['holdout_accuracy']:.1%}")
+
+
+@preferences_cli.command('status')
+def preference_status():
+    """Show the preference model version this process would serve."""
+    from app.services.preference_service import PreferenceService
+
+    model = PreferenceService.get_model()
+    if model is None:
+        click.echo("No preference model trained; using rule-based scoring")
+        return
+    click.echo(f"Preference model {model.version}: {model.meta.get('examples')} signals, "
+               f"{len(model.user_index)} personalised users, trained {model.meta.get('trained_at')}")
+
+
+@preferences_cli.command('rollup')
+@click.option('--retention-days', type=int, default=None,
+              help='Delete rolled-up signals older than this (default: PREFERENCE_RETENTION_DAYS; 0 keeps all).')
+def rollup_preferences(retention_days):
+    """Fold new feedback into the time-decayed preference rollups and apply retention."""
+    from app.services.preference_service import PreferenceService
+
+    stats = PreferenceService.rollup_preferences(retention_days=retention_days)
+    click.echo(f"Rolled up {stats['signals']} signals for {stats['users']} users; "
+               f"deleted {stats['deleted']} signals and {stats['files']} files past retention")
+
+
+@preferences_cli.command('export')
+@click.argument('directory', type=click.Path(file_okay=False))
+@click.option('--chunk-size', type=int, default=10000, help='Signals per part file (bounds memory use).')
+@click.option('--format', 'fmt', type=click.Choice(['npz', 'parquet']), default=None,
+              help='Part file format (default: parquet when pyarrow is installed, else npz).')
+@click.option('--full', is_flag=True, help='Discard the existing export and start from the beginning.')
+def export_signals(directory, chunk_size, fmt, full):
+    """Export training signals past the directory's watermark as columnar part files."""
+    from app.services.export_service import ExportService
+
+    result, error = ExportService.export_training_signals(directory, chunk_size, fmt, full)
+    if error:
+        raise click.ClickException(error)
+    click.echo(f"Exported {result['rows']} signals in {result['parts']} {result['format']} parts "
+               f"({result['total_rows']} in total)")
+
+
+def register_cli(app):
+    """Attach all CLI command groups to the app."""
+    app.cli.add_command(suggestions_cli)
+    app.cli.add_command(images_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(preferences_cli)
@@ -0,0 +1,45 @@
+"""Packed colour values.
+
+Dominant colours are ``#rrggbb`` strings at the API; for storage, export
+and scoring they pack into a single 24-bit integer (``0xRRGGBB``), with
+``NO_COLOR`` (-1) marking a colour that is missing or does not parse.
+"""
+
+from functools import lru_cache
+
+NO_COLOR = -1
+
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+
+
+def pack_color(hex_color):
+    """The 24-bit integer for a ``#rrggbb`` colour, or NO_COLOR if it does not parse."""
+    try:
+        value = hex_color.lstrip('#')
+    except AttributeError:
+        return NO_COLOR
+    if len(value) != 6 or not all(c in _HEX_DIGITS for c in value):
+        return NO_COLOR
+    return int(value, 16)
+
+
+@lru_cache(maxsize=4096)
+def unpack_color(value):
+    """The ``#rrggbb`` string for a packed colour, or None for NO_COLOR."""
+    if value is None or value < 0:
+        return None
+    return f'#{value:06x}'
+
+
+def pack_colors(colors, size):
+    """Pack a palette into a list of exactly `size` integers, padded with NO_COLOR."""
+    packed = [value for value in (pack_color(color) for color in colors or []) if value != NO_COLOR]
+    return (packed + [NO_COLOR] * size)[:size]
+
+
+def channel_bounds(value, tolerance):
+    """Per-channel (low, high) ranges of the colours within `tolerance` of a packed colour."""
+    return [
+        (max(channel - tolerance, 0), min(channel + tolerance, 255))
+        for channel in ((value >> 16) & 255, (value >> 8) & 255, value & 255)
+    ]
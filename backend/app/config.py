@@ -10,17 +10,93 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
 
+    # Upload names are an HMAC of the content under this secret; changing it stops new uploads
+    # deduplicating against older ones but keeps serving them
+    UPLOAD_KEY_SECRET = os.environ.get('UPLOAD_KEY_SECRET', SECRET_KEY)
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads'))
+    # local: sharded files under UPLOAD_FOLDER; memory: process-local (tests and benchmarks)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+    # Periodic deletion of unreferenced upload files (0 disables; `flask images gc` runs it by hand)
+    STORAGE_GC_INTERVAL = int(os.environ.get('STORAGE_GC_INTERVAL', 0))  # seconds
+    STORAGE_GC_MIN_AGE = int(os.environ.get('STORAGE_GC_MIN_AGE', 3600))  # seconds
+    STORAGE_GC_BATCH_SIZE = int(os.environ.get('STORAGE_GC_BATCH_SIZE', 500))
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    # Uploads are rejected from their header, before decoding, beyond these limits
+    MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 40_000_000))
+    MAX_IMAGE_EDGE = int(os.environ.get('MAX_IMAGE_EDGE', 12_000))
+    # Resized WebP variants generated at upload: name -> longest edge in pixels
+    IMAGE_VARIANTS = {'thumb': 256, 'medium': 768}
+    IMAGE_VARIANT_QUALITY = int(os.environ.get('IMAGE_VARIANT_QUALITY', 80))
+    UPLOAD_CACHE_MAX_AGE = int(os.environ.get('UPLOAD_CACHE_MAX_AGE', 365 * 24 * 3600))  # seconds
+    # flask: stream from Python; x-accel-redirect (nginx) / x-sendfile (Apache, lighttpd): proxy sends the file
+    UPLOAD_SERVE_MODE = os.environ.get('UPLOAD_SERVE_MODE', 'flask')
+    UPLOAD_ACCEL_PREFIX = os.environ.get('UPLOAD_ACCEL_PREFIX', '/protected-uploads/')
 
     OPENWEATHER_API_KEY = os.environ.get('OPENWEATHER_API_KEY', '')
     OPENWEATHER_CITY = os.environ.get('OPENWEATHER_CITY', 'Sofia')
+    OPENWEATHER_BASE_URL = os.environ.get('OPENWEATHER_BASE_URL', 'https://api.openweathermap.org/data/2.5')
+    OPENWEATHER_TIMEOUT = float(os.environ.get('OPENWEATHER_TIMEOUT', 10))
+    WEATHER_CACHE_TTL = int(os.environ.get('WEATHER_CACHE_TTL', 600))  # seconds
+    WEATHER_CACHE_STALE_TTL = int(os.environ.get('WEATHER_CACHE_STALE_TTL', 3600))  # seconds
+    WEATHER_CACHE_MAX_ENTRIES = int(os.environ.get('WEATHER_CACHE_MAX_ENTRIES', 1000))  # locations per process
+    WEATHER_HTTP_POOL_SIZE = int(os.environ.get('WEATHER_HTTP_POOL_SIZE', 10))
 
     OLLAMA_BASE_URL = os.environ.get('OLLAMA_BASE_URL', 'http://localhost:11434')
     OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3.2')
 
+    YOLO_MODEL_PATH = os.environ.get('YOLO_MODEL_PATH', 'yolov8n.pt')
+    PRELOAD_VISION_MODEL = os.environ.get('PRELOAD_VISION_MODEL', 'true').lower() == 'true'
+
+    GENERATION_REUSE_WINDOW = int(os.environ.get('GENERATION_REUSE_WINDOW', 30))  # seconds an Idempotency-Key returns its outfit
+    SUGGESTIONS_PER_SLOT = int(os.environ.get('SUGGESTIONS_PER_SLOT', 3))
+
+    # Move VAA analysis, LLM explanations and feedback files to `flask jobs worker`
+    BACKGROUND_JOBS = os.environ.get('BACKGROUND_JOBS', 'false').lower() == 'true'
+    JOB_CONCURRENCY = os.environ.get('JOB_CONCURRENCY', 'vaa.analyze=1,outfit.explain=2,outfit.explain_plan=1,feedback.process=2')
+    JOB_VISIBILITY_TIMEOUT = int(os.environ.get('JOB_VISIBILITY_TIMEOUT', 300))  # seconds
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))  # seconds
+
+    # Learned preference model (`flask preferences train`); served memory-mapped, hot reloaded
+    PREFERENCE_MODEL_DIR = os.environ.get('PREFERENCE_MODEL_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'preference_models'))
+    PREFERENCE_MODEL_RELOAD_INTERVAL = int(os.environ.get('PREFERENCE_MODEL_RELOAD_INTERVAL', 30))  # seconds
+    PREFERENCE_MODEL_KEEP = int(os.environ.get('PREFERENCE_MODEL_KEEP', 3))  # versions kept on disk
+    PREFERENCE_MIN_EXAMPLES = int(os.environ.get('PREFERENCE_MIN_EXAMPLES', 20))
+    PREFERENCE_MIN_USER_SIGNALS = int(os.environ.get('PREFERENCE_MIN_USER_SIGNALS', 10))
+
+    # Rule-based preferences: feedback weight halves every half-life; the SRA gets at most
+    # PREFERENCE_MAX_COMBINATIONS per reaction. Feedback is folded into per-user totals as it is
+    # written; the periodic rollup (`flask preferences rollup`, or every PREFERENCE_ROLLUP_INTERVAL
+    # seconds under gunicorn; 0 disables) catches up and deletes rolled-up signals older than
+    # PREFERENCE_RETENTION_DAYS (0 keeps them). Rollups and exports leave out signals younger than
+    # SIGNAL_SETTLE_SECONDS, which may still commit out of timestamp order
+    PREFERENCE_HALF_LIFE_DAYS = float(os.environ.get('PREFERENCE_HALF_LIFE_DAYS', 90))
+    PREFERENCE_MAX_COMBINATIONS = int(os.environ.get('PREFERENCE_MAX_COMBINATIONS', 50))
+    PREFERENCE_ROLLUP_INTERVAL = int(os.environ.get('PREFERENCE_ROLLUP_INTERVAL', 0))  # seconds
+    PREFERENCE_RETENTION_DAYS = int(os.environ.get('PREFERENCE_RETENTION_DAYS', 365))
+    SIGNAL_SETTLE_SECONDS = int(os.environ.get('SIGNAL_SETTLE_SECONDS', 60))
+
+    # Per-process cache of top x bottom colour harmony matrices (0 disables)
+    PAIR_CACHE_MAX_USERS = int(os.environ.get('PAIR_CACHE_MAX_USERS', 128))
+
+    # Multi-slot outfit search: candidates kept per slot, and the time budget per search
+    OUTFIT_SLOT_CANDIDATES = int(os.environ.get('OUTFIT_SLOT_CANDIDATES', 12))
+    OUTFIT_SEARCH_BUDGET_MS = int(os.environ.get('OUTFIT_SEARCH_BUDGET_MS', 50))
+    OUTFIT_PLAN_MAX_DAYS = int(os.environ.get('OUTFIT_PLAN_MAX_DAYS', 14))  # days per plan request
+
+    # Visual similarity search; uploads at least this similar to an existing item are flagged
+    DUPLICATE_SIMILARITY = float(os.environ.get('DUPLICATE_SIMILARITY', 0.98))
+    VISUAL_INDEX_MAX_USERS = int(os.environ.get('VISUAL_INDEX_MAX_USERS', 128))
+
     FEEDBACK_DATA_DIR = os.environ.get('FEEDBACK_DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'feedback_data'))
+    FEEDBACK_BATCH_MAX = int(os.environ.get('FEEDBACK_BATCH_MAX', 100))  # reactions per batch request
+
+    # Per-request profiling is disabled unless a token is set
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'profiles'))
+    PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sampling')  # sampling, cprofile
+    PROFILE_MIN_INTERVAL = int(os.environ.get('PROFILE_MIN_INTERVAL', 10))  # seconds between profiles
+    PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 50))
 
 
 class DevelopmentConfig(Config):
@@ -0,0 +1,245 @@
+"""Background job types and the worker that runs them.
+
+Jobs are stored in the app database (see JobService) and executed by
+
+    flask --app run jobs worker
+
+which claims due jobs and runs them in a process pool, so CPU-bound vision
+analysis and slow LLM calls never hold a request thread. Each job type has
+its own concurrency limit (JOB_CONCURRENCY), so a backlog of one kind cannot
+starve the others. Enqueueing is enabled for the request path with
+BACKGROUND_JOBS.
+
+Pool processes build their own app with create_app(), so the worker needs
+the same environment (DATABASE_URL, UPLOAD_FOLDER, ...) as the API and a
+storage backend shared between processes.
+"""
+
+import os
+import time
+import signal
+import socket
+import logging
+import threading
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from app.extensions import db
+from app.metrics import REGISTRY, JOB_DURATION, JOB_LATENCY
+from app.services.job_service import JobService
+
+logger = logging.getLogger(__name__)
+
+
+def _analyze_item(payload):
+    from app.services.wardrobe_service import WardrobeService
+    return WardrobeService.analyze_item(
+        payload['item_id'], payload.get('user_metadata') or {}, payload.get('outfit_part')
+    )
+
+
+def _explain_outfit(payload):
+    from app.services.outfit_service import OutfitService
+    return OutfitService.explain_outfit(payload['outfit_id'])
+
+
+def _explain_plan(payload):
+    from app.services.outfit_service import OutfitService
+    return OutfitService.explain_plan(payload['outfit_ids'])
+
+
+def _process_feedback(payload):
+    from app.services.feedback_service import FeedbackService
+    if 'reactions' in payload:
+        return FeedbackService.process_feedback_batch_signal(payload['user_id'], payload['reactions'])
+    return FeedbackService.process_feedback_signal(
+        payload['user_id'], payload['outfit_id'], payload['reaction']
+    )
+
+
+# Job type -> handler returning (result, error). An error return means the
+# target is gone and the job is finished; exceptions are retried.
+JOB_HANDLERS = {
+    'vaa.analyze': _analyze_item,
+    'outfit.explain': _explain_outfit,
+    'outfit.explain_plan': _explain_plan,
+    'feedback.process': _process_feedback,
+}
+
+
+def parse_concurrency(spec):
+    """Parse 'vaa.analyze=2,outfit.explain=4' into {job_type: limit}."""
+    limits = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        job_type, _, value = part.partition('=')
+        job_type = job_type.strip()
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+        limits[job_type] = int(value)
+    return limits
+
+
+# --- Pool process side ------------------------------------------------------
+
+_process_app = None
+
+
+def _init_process(config_name):
+    global _process_app
+    # Ctrl+C reaches the whole process group; let the parent shut the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from app import create_app
+    _process_app = create_app(config_name)
+
+
+def _execute(job_type, payload):
+    with _process_app.app_context():
+        try:
+            result, error = JOB_HANDLERS[job_type](payload)
+            if error:
+                return {'skipped': error}
+            return {'id': result.get('id')} if isinstance(result, dict) and 'id' in result else None
+        finally:
+            db.session.remove()
+
+
+# --- Dispatcher -------------------------------------------------------------
+
+class JobWorker:
+    """Claims jobs from the queue and runs them in a process pool."""
+
+    def __init__(self, concurrency, config_name=None, poll_interval=1.0,
+                 visibility_timeout=300, worker_id=None):
+        self.concurrency = {job_type: n for job_type, n in concurrency.items() if n > 0}
+        self.config_name = config_name or os.environ.get('FLASK_ENV', 'development')
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._running = {}  # future -> (job id, job type, created_at, started monotonic)
+        self._stop = threading.Event()
+        self._pool = None
+        self.processed = 0
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, burst=False):
+        """
+        Process jobs until stop() is called (or, with burst, until the
+        queue is empty). Must run inside an app context.
+
+        Returns:
+            int - jobs processed
+        """
+        if not self.concurrency:
+            raise ValueError("No job types enabled")
+        self._pool = self._make_pool()
+        last_heartbeat = time.monotonic()
+        logger.info(f"Job worker {self.worker_id} started: {self.concurrency}")
+        try:
+            while not self._stop.is_set():
+                claimed = self._dispatch()
+                if burst and not claimed and not self._running:
+                    break
+
+                if time.monotonic() - last_heartbeat >= self.visibility_timeout / 3:
+                    JobService.heartbeat(self._running_ids(), self.worker_id, self.visibility_timeout)
+                    JobService.fail_expired()
+                    last_heartbeat = time.monotonic()
+
+                if claimed:
+                    self._reap(timeout=0)
+                else:
+                    self._reap(timeout=self.poll_interval)
+        finally:
+            # Let in-flight jobs finish so they are not retried elsewhere
+            while self._running:
+                self._reap(timeout=self.poll_interval)
+            self._pool.shutdown(wait=True)
+            db.session.remove()
+        return self.processed
+
+    def _make_pool(self):
+        # spawn: pool processes must not share the parent's DB connections
+        return ProcessPoolExecutor(
+            max_workers=sum(self.concurrency.values()),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_process,
+            initargs=(self.config_name,),
+        )
+
+    def _running_ids(self):
+        return [job_id for job_id, _, _, _ in self._running.values()]
+
+    def _dispatch(self):
+        busy = {}
+        for _, job_type, _, _ in self._running.values():
+            busy[job_type] = busy.get(job_type, 0) + 1
+
+        claimed = 0
+        for job_type, limit in self.concurrency.items():
+            free = limit - busy.get(job_type, 0)
+            if free <= 0:
+                continue
+            for job in JobService.claim(job_type, self.worker_id, free, self.visibility_timeout):
+                future = self._pool.submit(_execute, job.job_type, job.get_payload())
+                self._running[future] = (job.id, job.job_type, job.created_at, time.monotonic())
+                claimed += 1
+        db.session.remove()
+        return claimed
+
+    def _reap(self, timeout):
+        if not self._running:
+            if timeout:
+                self._stop.wait(timeout)
+            return
+        done, _ = wait(list(self._running), timeout=timeout, return_when=FIRST_COMPLETED)
+        broken = False
+        for future in done:
+            job_id, job_type, created_at, started = self._running.pop(future)
+            duration = time.monotonic() - started
+            try:
+                result = future.result()
+            except BrokenProcessPool as e:
+                broken = True
+                outcome = JobService.fail(job_id, self.worker_id, f"Worker process died: {e}")
+            except Exception as e:
+                logger.error(f"Job {job_type} {job_id} failed: {e!r}")
+                outcome = JobService.fail(job_id, self.worker_id, repr(e))
+            else:
+                JobService.complete(job_id, self.worker_id, result)
+                outcome = 'succeeded'
+                JOB_LATENCY.observe((datetime.utcnow() - created_at).total_seconds(), job_type=job_type)
+            JOB_DURATION.observe(duration, job_type=job_type, outcome=outcome or 'lost')
+            self.processed += 1
+        db.session.remove()
+        if broken:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._make_pool()
+
+
+def serve_metrics(app, port):
+    """Expose the worker's metrics (job timings and queue depth) on a port."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            with app.app_context():
+                body = REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,125 @@
+"""Periodic maintenance tasks run inside the serving processes.
+
+Each gunicorn worker starts the enabled tasks after forking (see
+gunicorn.conf.py). A task takes an advisory file lock before each pass, so
+however many workers run on a host only one of them does the work.
+
+- Storage GC (STORAGE_GC_INTERVAL seconds, 0 disables): deletes upload
+  files no wardrobe item references. Also available as ``flask images gc``.
+- Preference rollup (PREFERENCE_ROLLUP_INTERVAL seconds, 0 disables): folds
+  new feedback into the decayed preference totals and applies signal
+  retention. Also available as ``flask preferences rollup``.
+"""
+
+import os
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_LOCK_NAME = '.preference-rollup.lock'
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+
+class PeriodicTask:
+    """Runs a function every interval seconds on a daemon thread."""
+
+    def __init__(self, name, interval, fn, lock_path=None):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.lock_path = lock_path
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # Spread the first pass so workers forked together don't all wake at once
+        while not self._stop.wait(self.interval * random.uniform(0.5, 1.0)):
+            self.run_once()
+
+    def run_once(self):
+        """Run one pass unless another process holds the lock. Returns True if it ran."""
+        with self._exclusive() as acquired:
+            if not acquired:
+                return False
+            try:
+                self.fn()
+            except Exception as e:
+                logger.error(f"Periodic task {self.name} failed: {e}")
+            return True
+
+    @contextmanager
+    def _exclusive(self):
+        if not self.lock_path or not FCNTL_AVAILABLE:
+            yield True
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def start_periodic_tasks(app):
+    """Start the maintenance tasks enabled in the app config."""
+    from app.services.storage_service import GC_LOCK_NAME
+
+    interval = app.config.get('STORAGE_GC_INTERVAL', 0)
+    if interval > 0 and app.config.get('STORAGE_BACKEND', 'local') == 'local':
+        task = PeriodicTask(
+            'storage-gc', interval, lambda: _collect_storage_garbage(app),
+            lock_path=os.path.join(app.config['UPLOAD_FOLDER'], GC_LOCK_NAME),
+        )
+        app.extensions['storage_gc'] = task
+        task.start()
+
+    interval = app.config.get('PREFERENCE_ROLLUP_INTERVAL', 0)
+    if interval > 0:
+        task = PeriodicTask(
+            'preference-rollup', interval, lambda: _rollup_preferences(app),
+            lock_path=os.path.join(app.config['FEEDBACK_DATA_DIR'], ROLLUP_LOCK_NAME),
+        )
+        app.extensions['preference_rollup'] = task
+        task.start()
+
+
+def _collect_storage_garbage(app):
+    from app.services.storage_service import StorageService
+
+    with app.app_context():
+        try:
+            StorageService.collect_garbage(
+                min_age=app.config.get('STORAGE_GC_MIN_AGE', 3600),
+                batch_size=app.config.get('STORAGE_GC_BATCH_SIZE', 500),
+            )
+        finally:
+            db.session.remove()
+
+
+def _rollup_preferences(app):
+    from app.services.preference_service import PreferenceService
+
+    with app.app_context():
+        try:
+            PreferenceService.rollup_preferences()
+        finally:
+            db.session.remove()
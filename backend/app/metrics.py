@@ -0,0 +1,245 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Stages are timed with the ``timed`` context manager or the ``instrument``
+decorator; HTTP requests are timed per endpoint by hooks installed in
+``init_app``. Recording an observation is a bisect and a locked increment,
+cheap enough to leave on in production.
+
+Metrics are kept per process: under gunicorn each worker reports its own
+series, so scrape every worker or aggregate at the proxy.
+"""
+
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+from flask import g, request, Response, current_app, has_app_context
+
+# Seconds; spans fast DB commits up to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket latency histogram keyed by label values."""
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, label_names=()):
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """Register a callable returning extra exposition lines at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'stylesync_stage_duration_seconds',
+    'Time spent in each agent and service pipeline stage.',
+    ['stage'],
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'stylesync_stage_errors_total',
+    'Pipeline stages that raised an exception.',
+    ['stage'],
+)
+REQUEST_DURATION = REGISTRY.histogram(
+    'stylesync_http_request_duration_seconds',
+    'HTTP request latency by endpoint.',
+    ['method', 'endpoint', 'status'],
+)
+
+JOB_DURATION = REGISTRY.histogram(
+    'stylesync_job_duration_seconds',
+    'Background job run time by type and outcome (recorded by the job worker).',
+    ['job_type', 'outcome'],
+)
+JOB_LATENCY = REGISTRY.histogram(
+    'stylesync_job_latency_seconds',
+    'Time from enqueue to successful completion of background jobs.',
+    ['job_type'],
+    buckets=DEFAULT_BUCKETS + (120.0, 300.0, 900.0, 3600.0),
+)
+
+
+def _weather_cache_collector():
+    cache = current_app.extensions.get('weather_cache')
+    if cache is None:
+        return []
+    stats = cache.stats()
+    lines = []
+    for key in ('hits', 'stale_hits', 'misses', 'coalesced', 'refreshes', 'errors', 'upstream_requests'):
+        name = f"stylesync_weather_cache_{key}_total"
+        lines += [f"# TYPE {name} counter", f"{name} {stats[key]}"]
+    lines += [
+        "# TYPE stylesync_weather_upstream_latency_seconds_sum counter",
+        f"stylesync_weather_upstream_latency_seconds_sum {stats['upstream_latency_ms_total'] / 1000}",
+        "# TYPE stylesync_weather_cache_entries gauge",
+        f"stylesync_weather_cache_entries {stats['entries']}",
+    ]
+    return lines
+
+
+def _job_queue_collector():
+    if not has_app_context():
+        return []
+    from app.services.job_service import JobService
+    try:
+        stats = JobService.get_stats()
+    except Exception:
+        return []
+    lines = ["# TYPE stylesync_job_queue_depth gauge"]
+    for job_type, counts in sorted(stats.items()):
+        for status in ('queued', 'running', 'failed'):
+            lines.append(f'stylesync_job_queue_depth{{job_type="{_escape(job_type)}",status="{status}"}} '
+                         f'{counts.get(status, 0)}')
+    lines.append("# TYPE stylesync_job_oldest_queued_seconds gauge")
+    for job_type, counts in sorted(stats.items()):
+        lines.append(f'stylesync_job_oldest_queued_seconds{{job_type="{_escape(job_type)}"}} '
+                     f'{counts.get("oldest_queued_seconds", 0)}')
+    return lines
+
+
+REGISTRY.register_collector(_weather_cache_collector)
+REGISTRY.register_collector(_job_queue_collector)
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the enclosed block under the given stage name."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage)
+
+
+def instrument(stage):
+    """Decorator form of ``timed``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    """Install per-request timing hooks and the /metrics endpoint."""
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request_duration(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=request.method, endpoint=endpoint, status=response.status_code,
+            )
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
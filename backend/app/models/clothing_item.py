@@ -1,7 +1,12 @@
 import uuid
 import json
 from datetime import datetime
+from sqlalchemy import or_, and_
 from app.extensions import db
+from app.colors import NO_COLOR, pack_colors, unpack_color, channel_bounds
+
+# Dominant colours stored per item (color_1..color_3)
+PACKED_COLORS = 3
 
 
 class ClothingItem(db.Model):
@@ -9,7 +14,7 @@ class ClothingItem(db.Model):
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    filename = db.Column(db.String(255), nullable=True)
+    filename = db.Column(db.String(255), nullable=True)  # storage key, e.g. ab/cd/<hmac-sha256>.jpg
     image_url = db.Column(db.String(500), nullable=True)
 
     # Classification attributes
@@ -18,28 +23,91 @@ class ClothingItem(db.Model):
     weather_suitability = db.Column(db.String(20), nullable=False)  # cold, warm
     outfit_part = db.Column(db.String(10), nullable=True)  # top, bottom
 
-    # AI-extracted metadata
-    dominant_colors = db.Column(db.Text, nullable=True)  # JSON array of hex colors
+    # AI-extracted metadata: dominant colours packed as 0xRRGGBB, most dominant first
+    color_1 = db.Column(db.Integer, nullable=True)
+    color_2 = db.Column(db.Integer, nullable=True)
+    color_3 = db.Column(db.Integer, nullable=True)
+    dominant_colors = db.Column(db.Text, nullable=True)  # legacy JSON array of hex colors, see `flask images migrate-colors`
     detected_by_ai = db.Column(db.Boolean, default=False)
 
+    # Resized WebP copies of the upload, JSON object of variant name -> storage key
+    image_variants = db.Column(db.Text, nullable=True)
+
+    # float16 visual descriptor for similarity search (ImageService.compute_descriptor)
+    visual_descriptor = db.Column(db.LargeBinary, nullable=True)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    def get_packed_colors(self):
+        """Dominant colours as packed integers, most dominant first."""
+        packed = [color for color in (self.color_1, self.color_2, self.color_3) if color is not None]
+        if not packed and self.dominant_colors:
+            packed = self._legacy_packed_colors()
+        return packed
+
     def get_dominant_colors(self):
-        if self.dominant_colors:
+        """Dominant colours as hex strings, unpacked on demand."""
+        return [unpack_color(color) for color in self.get_packed_colors()]
+
+    def set_dominant_colors(self, colors):
+        self.color_1, self.color_2, self.color_3 = (
+            None if color == NO_COLOR else color for color in pack_colors(colors, PACKED_COLORS)
+        )
+        self.dominant_colors = None
+
+    def _legacy_packed_colors(self):
+        """Colours of a row not yet converted by the packed colour migration."""
+        try:
+            colors = json.loads(self.dominant_colors)
+        except (json.JSONDecodeError, TypeError):
+            return []
+        return [color for color in pack_colors(colors, PACKED_COLORS) if color != NO_COLOR]
+
+    @classmethod
+    def color_filter(cls, packed, tolerance=0):
+        """
+        SQL condition: any dominant colour within `tolerance` of a packed
+        colour on each of the R, G and B channels (0 matches exactly).
+        """
+        columns = (cls.color_1, cls.color_2, cls.color_3)
+        if tolerance <= 0:
+            return or_(*(column == packed for column in columns))
+        bounds = channel_bounds(packed, tolerance)
+        return or_(*(
+            and_(*(
+                column.op('>>')(shift).op('&')(255).between(low, high)
+                for shift, (low, high) in zip((16, 8, 0), bounds)
+            ))
+            for column in columns
+        ))
+
+    def get_image_variants(self):
+        if self.image_variants:
             try:
-                return json.loads(self.dominant_colors)
+                return json.loads(self.image_variants)
             except (json.JSONDecodeError, TypeError):
-                return []
-        return []
+                return {}
+        return {}
 
-    def set_dominant_colors(self, colors):
-        self.dominant_colors = json.dumps(colors)
+    def set_image_variants(self, variants):
+        self.image_variants = json.dumps(variants) if variants else None
+
+    def get_variant_urls(self):
+        """Build variant URLs from image_url (variant keys share its URL prefix)."""
+        if not self.image_url:
+            return {}
+        if self.filename and self.image_url.endswith(self.filename):
+            base_url = self.image_url[:-len(self.filename)]
+        else:
+            base_url = self.image_url.rsplit('/', 1)[0] + '/'
+        return {name: f"{base_url}{key}" for name, key in self.get_image_variants().items()}
 
     def to_dict(self):
         return {
             'id': self.id,
             'user_id': self.user_id,
             'image_url': self.image_url,
+            'image_variants': self.get_variant_urls(),
             'category': self.category,
             'style': self.style,
             'weather': self.weather_suitability,
@@ -48,3 +116,26 @@ class ClothingItem(db.Model):
             'detected_by_ai': self.detected_by_ai,
             'created_at': self.created_at.isoformat(),
         }
+
+
+class WardrobeChange(db.Model):
+    """Append-only log of wardrobe additions and deletions used for delta sync.
+
+    The autoincrementing id doubles as the sync cursor, so clients only ever
+    receive the changes recorded after the last cursor they saw.
+    """
+    __tablename__ = 'wardrobe_changes'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False, index=True)
+    item_id = db.Column(db.String(36), nullable=False)  # no FK: tombstones outlive the item
+    change_type = db.Column(db.String(10), nullable=False)  # 'added' or 'deleted'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'cursor': self.id,
+            'item_id': self.item_id,
+            'change_type': self.change_type,
+            'created_at': self.created_at.isoformat(),
+        }
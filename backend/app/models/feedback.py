@@ -28,6 +28,10 @@ class Feedback(db.Model):
 class TrainingSignal(db.Model):
     """Stores reinforcement learning training signals from user feedback."""
     __tablename__ = 'training_signals'
+    __table_args__ = (
+        db.Index('ix_training_signals_created', 'created_at', 'id'),  # export watermark order
+        db.Index('ix_training_signals_user_created', 'user_id', 'created_at', 'id'),  # rollup cursor order
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
@@ -57,3 +61,47 @@ class TrainingSignal(db.Model):
             'occasion': self.occasion,
             'created_at': self.created_at.isoformat(),
         }
+
+
+class PreferenceRollup(db.Model):
+    """
+    Time-decayed feedback total for one user and outfit combination.
+
+    ``weight`` is the sum of 0.5 ** (age / half-life) over the signals folded
+    in, with ages taken at the user's ``PreferenceRollupCursor.as_of``. All of
+    a user's rollups share that time, so folding a signal in only touches its
+    own combination, and decaying a weight to a later time is one multiplication.
+    """
+    __tablename__ = 'preference_rollups'
+    __table_args__ = (
+        db.Index('ix_preference_rollups_weight', 'user_id', 'reaction', 'weight'),
+    )
+
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    combination_key = db.Column(db.String(40), primary_key=True)  # sha1 of reaction + combination
+    reaction = db.Column(db.String(10), nullable=False)
+    combination = db.Column(db.Text, nullable=False)  # JSON of styles, colors and occasion
+    weight = db.Column(db.Float, nullable=False, default=0.0)
+
+    def get_combination(self):
+        try:
+            return json.loads(self.combination)
+        except (json.JSONDecodeError, TypeError):
+            return {}
+
+
+class PreferenceRollupCursor(db.Model):
+    """
+    The last training signal folded into a user's rollups, in (created_at, id)
+    order, and the time the rollup weights are expressed at.
+
+    The row is also the lock that serializes rollups of one user; it may
+    exist before anything is folded, with created_at, signal_id and as_of unset.
+    """
+    __tablename__ = 'preference_rollup_cursors'
+
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=True)
+    signal_id = db.Column(db.String(36), nullable=True)
+    as_of = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,62 @@
+import uuid
+import json
+from datetime import datetime
+from app.extensions import db
+
+
+class Job(db.Model):
+    """A unit of background work, claimed and run by `flask jobs worker`."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_ready', 'job_type', 'status', 'run_after'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_type = db.Column(db.String(50), nullable=False)  # vaa.analyze, outfit.explain, outfit.explain_plan, feedback.process
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON object of handler arguments
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # not claimed before this
+    locked_by = db.Column(db.String(100), nullable=True)  # worker id holding the job
+    locked_until = db.Column(db.DateTime, nullable=True)  # visibility timeout; reclaimable after
+
+    last_error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def get_payload(self):
+        try:
+            return json.loads(self.payload) if self.payload else {}
+        except (json.JSONDecodeError, TypeError):
+            return {}
+
+    def set_payload(self, payload):
+        self.payload = json.dumps(payload or {})
+
+    def get_result(self):
+        if self.result:
+            try:
+                return json.loads(self.result)
+            except (json.JSONDecodeError, TypeError):
+                return None
+        return None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'payload': self.get_payload(),
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'last_error': self.last_error,
+            'result': self.get_result(),
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -15,11 +15,13 @@ class Outfit(db.Model):
     occasion = db.Column(db.String(50), nullable=True)
     weather_data = db.Column(db.Text, nullable=True)  # JSON snapshot of weather at generation time
     explanation = db.Column(db.Text, nullable=True)   # LLaMA-generated explanation
+    planned_for = db.Column(db.Date, nullable=True)   # day it was planned for, for outfit plans
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     top_item = db.relationship('ClothingItem', foreign_keys=[top_item_id])
     bottom_item = db.relationship('ClothingItem', foreign_keys=[bottom_item_id])
+    extra_items = db.relationship('OutfitItem', lazy=True, cascade='all, delete-orphan')
     saved_records = db.relationship('SavedOutfit', backref='outfit', lazy=True, cascade='all, delete-orphan')
 
     def get_weather_data(self):
@@ -30,6 +32,27 @@ class Outfit(db.Model):
                 return {}
         return {}
 
+    def set_extra_item_ids(self, item_ids_by_slot):
+        """Fill the slots beyond top and bottom (outerwear, shoes, accessory)."""
+        self.extra_items = [
+            OutfitItem(slot=slot, item_id=item_id)
+            for slot, item_id in (item_ids_by_slot or {}).items() if item_id
+        ]
+
+    def get_extra_items(self):
+        """Slot -> ClothingItem for the filled slots beyond top and bottom."""
+        return {extra.slot: extra.item for extra in self.extra_items if extra.item}
+
+    def get_items(self):
+        """Slot -> ClothingItem for every filled slot."""
+        items = {}
+        if self.top_item:
+            items['top'] = self.top_item
+        if self.bottom_item:
+            items['bottom'] = self.bottom_item
+        items.update(self.get_extra_items())
+        return items
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -37,13 +60,26 @@ class Outfit(db.Model):
             'user_id': self.user_id,
             'top': self.top_item.to_dict() if self.top_item else None,
             'bottom': self.bottom_item.to_dict() if self.bottom_item else None,
+            'items': {slot: item.to_dict() for slot, item in self.get_items().items()},
             'occasion': self.occasion,
             'weather': self.get_weather_data(),
             'explanation': self.explanation,
+            'planned_for': self.planned_for.isoformat() if self.planned_for else None,
             'created_at': self.created_at.isoformat(),
         }
 
 
+class OutfitItem(db.Model):
+    """An item filling one of an outfit's extra slots; top and bottom live on Outfit itself."""
+    __tablename__ = 'outfit_items'
+
+    outfit_id = db.Column(db.String(36), db.ForeignKey('outfits.id'), primary_key=True)
+    slot = db.Column(db.String(20), primary_key=True)  # outerwear, shoes, accessory
+    item_id = db.Column(db.String(36), db.ForeignKey('clothing_items.id'), nullable=False)
+
+    item = db.relationship('ClothingItem')
+
+
 class SavedOutfit(db.Model):
     __tablename__ = 'saved_outfits'
 
@@ -56,3 +92,57 @@ class SavedOutfit(db.Model):
         outfit_data = self.outfit.to_dict() if self.outfit else {}
         outfit_data['saved_at'] = self.saved_at.isoformat()
         return outfit_data
+
+
+class OutfitSuggestion(db.Model):
+    """Outfit precomputed off-peak for a (user, occasion, weather bucket) slot."""
+    __tablename__ = 'outfit_suggestions'
+    __table_args__ = (
+        db.Index('ix_outfit_suggestions_slot', 'user_id', 'occasion', 'weather_bucket'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    occasion = db.Column(db.String(50), nullable=False)
+    weather_bucket = db.Column(db.String(10), nullable=False)  # warm, cold
+    rank = db.Column(db.Integer, nullable=False, default=0)    # 0 = best
+    top_item_id = db.Column(db.String(36), db.ForeignKey('clothing_items.id'), nullable=True)
+    bottom_item_id = db.Column(db.String(36), db.ForeignKey('clothing_items.id'), nullable=True)
+    extra_item_ids = db.Column(db.Text, nullable=True)  # JSON object of extra slot -> item id
+    explanation = db.Column(db.Text, nullable=True)
+    wardrobe_version = db.Column(db.Integer, nullable=False, default=0)  # wardrobe cursor at compute time
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def get_extra_item_ids(self):
+        if self.extra_item_ids:
+            try:
+                return json.loads(self.extra_item_ids)
+            except (json.JSONDecodeError, TypeError):
+                return {}
+        return {}
+
+    def set_extra_item_ids(self, item_ids_by_slot):
+        self.extra_item_ids = json.dumps(item_ids_by_slot) if item_ids_by_slot else None
+
+
+class IdempotencyKey(db.Model):
+    """
+    Client idempotency key for outfit generation, shared by all workers.
+
+    The row is claimed before generating (outfit_id still empty) and points
+    at the persisted outfit afterwards, so a retry that lands on any worker
+    gets the original outfit back until expires_at.
+    """
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    outfit_id = db.Column(db.String(36), db.ForeignKey('outfits.id'), nullable=True)  # None while generating
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,20 @@
+from datetime import datetime
+from app.extensions import db
+
+
+class StoredBlob(db.Model):
+    """Reference count for a content-addressed upload shared by identical images."""
+    __tablename__ = 'stored_blobs'
+
+    key = db.Column(db.String(255), primary_key=True)  # storage key, e.g. ab/cd/<hmac-sha256>.jpg
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    size = db.Column(db.Integer, nullable=True)  # bytes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'ref_count': self.ref_count,
+            'size': self.size,
+            'created_at': self.created_at.isoformat(),
+        }
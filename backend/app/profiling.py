@@ -0,0 +1,190 @@
+"""Opt-in per-request profiling.
+
+A request carrying the configured PROFILE_TOKEN in the ``X-Profile-Token``
+header (or a ``profile_token`` query parameter) runs under a profiler; every
+other request is untouched. Two modes are supported:
+
+- ``sampling``: a background thread samples the request thread's stack and
+  writes collapsed stacks (``frame;frame;frame count``) ready for
+  flamegraph.pl or speedscope.
+- ``cprofile``: deterministic cProfile, written as a pstats ``.prof`` file.
+
+Profiles are rate limited per process and only the newest PROFILE_MAX_FILES
+are kept. The response carries an ``X-Profile-Id`` header naming the file.
+"""
+
+import os
+import re
+import sys
+import time
+import hmac
+import uuid
+import cProfile
+import logging
+import threading
+from collections import Counter
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_EXTENSIONS = ('.collapsed', '.prof')
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """Decides which requests to profile and manages the output directory."""
+
+    def __init__(self, token, output_dir, mode='sampling', min_interval=10, max_files=50,
+                 sample_interval=0.005):
+        self.token = token
+        self.output_dir = output_dir
+        self.mode = mode
+        self.min_interval = min_interval
+        self.max_files = max_files
+        self.sample_interval = sample_interval
+        self._last_started = 0.0
+        self._active = threading.Lock()  # one profile at a time per process
+
+    def wants_profile(self, supplied_token):
+        return bool(self.token and supplied_token and
+                    hmac.compare_digest(self.token, supplied_token))
+
+    def try_acquire(self):
+        """Reserve the profiler, honouring the per-process rate limit."""
+        if not self._active.acquire(blocking=False):
+            return False
+        now = time.monotonic()
+        if now - self._last_started < self.min_interval:
+            self._active.release()
+            return False
+        self._last_started = now
+        return True
+
+    def start(self):
+        if self.mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident(), self.sample_interval)
+            profiler.start()
+        return profiler
+
+    def finish(self, profiler, label):
+        """Stop the profiler, write its output and release the slot."""
+        try:
+            if isinstance(profiler, StackSampler):
+                profiler.stop()
+                extension = '.collapsed'
+            else:
+                profiler.disable()
+                extension = '.prof'
+
+            os.makedirs(self.output_dir, exist_ok=True)
+            safe_label = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')[:80]
+            profile_id = f"{time.strftime('%Y%m%d%H%M%S')}_{safe_label}_{uuid.uuid4().hex[:8]}{extension}"
+            path = os.path.join(self.output_dir, profile_id)
+
+            if isinstance(profiler, StackSampler):
+                profiler.write(path)
+            else:
+                profiler.dump_stats(path)
+            logger.info(f"Request profile written to {path}")
+
+            self._prune()
+            return profile_id
+        except Exception as e:
+            logger.error(f"Failed to write request profile: {e}")
+            return None
+        finally:
+            self._active.release()
+
+    def _prune(self):
+        profiles = [
+            os.path.join(self.output_dir, name)
+            for name in os.listdir(self.output_dir)
+            if name.endswith(PROFILE_EXTENSIONS)
+        ]
+        if len(profiles) <= self.max_files:
+            return
+        profiles.sort(key=os.path.getmtime)
+        for path in profiles[:len(profiles) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove old profile {path}: {e}")
+
+
+def init_app(app):
+    """Install the profiling hooks if PROFILE_TOKEN is configured."""
+    token = app.config.get('PROFILE_TOKEN', '')
+    if not token:
+        return
+
+    profiler = RequestProfiler(
+        token,
+        app.config['PROFILE_DIR'],
+        mode=app.config.get('PROFILE_MODE', 'sampling'),
+        min_interval=app.config.get('PROFILE_MIN_INTERVAL', 10),
+        max_files=app.config.get('PROFILE_MAX_FILES', 50),
+    )
+    app.extensions['request_profiler'] = profiler
+
+    def _label():
+        rule = request.url_rule.rule if request.url_rule else request.path
+        return f"{request.method} {rule}"
+
+    @app.before_request
+    def _start_profile():
+        supplied = request.headers.get('X-Profile-Token') or request.args.get('profile_token')
+        if profiler.wants_profile(supplied) and profiler.try_acquire():
+            g._profiler = profiler.start()
+
+    @app.after_request
+    def _finish_profile(response):
+        active = g.pop('_profiler', None)
+        if active is not None:
+            profile_id = profiler.finish(active, _label())
+            if profile_id:
+                response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def _abort_profile(exc):
+        # after_request is skipped when the view raises; still write the profile
+        active = g.pop('_profiler', None)
+        if active is not None:
+            profiler.finish(active, _label())
@@ -0,0 +1,55 @@
+"""Additive schema upgrades for databases created by ``db.create_all()``.
+
+``create_all`` creates missing tables but never alters existing ones, so new
+nullable columns and indexes added to a model would be absent from older
+databases. This adds them in place at startup. Anything beyond adding a
+nullable column (or one with a server default) or an index still needs a
+hand-written data migration.
+"""
+
+import logging
+from sqlalchemy import inspect, text
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns():
+    """ALTER existing tables to add columns declared on models but missing in the DB."""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            if not column.nullable and column.server_default is None:
+                logger.warning(f"Cannot add NOT NULL column {table.name}.{column.name} automatically")
+                continue
+
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+            if column.server_default is not None:
+                ddl += f' DEFAULT {column.server_default.arg}'
+            with db.engine.begin() as conn:
+                conn.execute(text(ddl))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+
+def add_missing_indexes():
+    """Create indexes declared on models but missing from existing tables."""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in present:
+                continue
+            index.create(bind=db.engine)
+            logger.info(f"Added index {table.name}.{index.name}")
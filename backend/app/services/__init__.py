@@ -2,5 +2,14 @@ from .auth_service import AuthService
 from .wardrobe_service import WardrobeService
 from .outfit_service import OutfitService
 from .feedback_service import FeedbackService
+from .weather_service import WeatherService
+from .suggestion_service import SuggestionService
+from .image_service import ImageService
+from .storage_service import StorageService
+from .job_service import JobService
+from .preference_service import PreferenceService
+from .similarity_service import SimilarityService
 
-__all__ = ['AuthService', 'WardrobeService', 'OutfitService', 'FeedbackService']
+__all__ = ['AuthService', 'WardrobeService', 'OutfitService', 'FeedbackService', 'WeatherService',
+           'SuggestionService', 'ImageService', 'StorageService', 'JobService',
+           'PreferenceService', 'SimilarityService']
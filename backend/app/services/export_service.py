@@ -0,0 +1,289 @@
+"""Export service - streams training signals to columnar files for offline training.
+
+An export is a directory of part files plus ``manifest.json``:
+
+- each part holds one chunk of ``TrainingSignal`` rows as columns: small
+  integer codes for user, occasion, styles and categories (decoded with the
+  manifest's dictionaries), ``liked``, ``created_at`` in microseconds since
+  the epoch, and ``top_colors``/``bottom_colors`` as (rows, MAX_COLORS)
+  packed 24-bit integers padded with -1 (see app.colors);
+- the manifest lists the parts, the dictionaries and the watermark, the
+  (created_at, id) of the last exported row.
+
+Rows are read in keyset order a chunk at a time, so memory stays bounded
+by the chunk size however long the history is. Exporting again into the
+same directory appends parts for rows past the watermark; dictionaries are
+append-only so earlier codes keep their meaning.
+
+``created_at`` is set by the writing process before its transaction
+commits, so rows do not become visible in watermark order: a signal can
+commit after a later-stamped one was exported, and the watermark would
+then skip it for good. Each export therefore stops SIGNAL_SETTLE_SECONDS
+short of the present. A writer that takes longer than that to commit, or
+whose clock runs further behind, can still be missed.
+
+Parts are NumPy ``.npz`` files, or Parquet when pyarrow is installed.
+"""
+
+import os
+import json
+import logging
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, and_
+from app.extensions import db
+from app.colors import pack_colors
+from app.models.feedback import TrainingSignal
+from app.agents.color_harmony import MAX_COLORS
+from app.services.preference_service import PreferenceService
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+EXPORT_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+FORMATS = ('npz', 'parquet')
+
+# Encoded column -> dictionary it is coded against
+DICTIONARY_COLUMNS = {
+    'user': 'user',
+    'occasion': 'occasion',
+    'top_style': 'style',
+    'bottom_style': 'style',
+    'top_category': 'category',
+    'bottom_category': 'category',
+}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class _Dictionary:
+    """Append-only value -> code mapping; None encodes as -1."""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value):
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def read_manifest(directory):
+    """The manifest of an export directory, or None if there is no export there."""
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(directory, manifest):
+    """Replace the manifest atomically, so an interrupted export resumes from the last part."""
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def _encode_chunk(rows, dictionaries):
+    """Columns for a chunk of (TrainingSignal, top category, bottom category) rows."""
+    n = len(rows)
+    # Only users can outgrow 16-bit codes
+    columns = {
+        name: np.empty(n, dtype=np.int32 if dictionary == 'user' else np.int16)
+        for name, dictionary in DICTIONARY_COLUMNS.items()
+    }
+    columns['liked'] = np.empty(n, dtype=bool)
+    columns['created_at'] = np.empty(n, dtype=np.int64)
+    columns['top_colors'] = np.empty((n, MAX_COLORS), dtype=np.int32)
+    columns['bottom_colors'] = np.empty((n, MAX_COLORS), dtype=np.int32)
+
+    for i, (signal, top_category, bottom_category) in enumerate(rows):
+        top_style, _, bottom_style = (signal.style_combination or '').partition('+')
+        colors = signal.get_color_combination()
+        values = {
+            'user': signal.user_id,
+            'occasion': signal.occasion,
+            'top_style': top_style or None,
+            'bottom_style': bottom_style or None,
+            'top_category': top_category,
+            'bottom_category': bottom_category,
+        }
+        for name, dictionary in DICTIONARY_COLUMNS.items():
+            columns[name][i] = dictionaries[dictionary].encode(values[name])
+        columns['liked'][i] = signal.reaction == 'liked'
+        columns['created_at'][i] = (signal.created_at - _EPOCH) // timedelta(microseconds=1)
+        columns['top_colors'][i] = pack_colors(colors.get('top_colors'), MAX_COLORS)
+        columns['bottom_colors'][i] = pack_colors(colors.get('bottom_colors'), MAX_COLORS)
+    return columns
+
+
+def _write_npz(path, columns, dictionaries):
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, **columns)
+
+
+def _write_parquet(path, columns, dictionaries):
+    arrays, names = [], []
+    for name, values in columns.items():
+        if name in DICTIONARY_COLUMNS:
+            array = pa.DictionaryArray.from_arrays(
+                pa.array(values, mask=values < 0),
+                pa.array(dictionaries[DICTIONARY_COLUMNS[name]].values, type=pa.string()),
+            )
+        elif values.ndim == 2:
+            array = pa.FixedSizeListArray.from_arrays(pa.array(values.ravel()), values.shape[1])
+        else:
+            array = pa.array(values)
+        arrays.append(array)
+        names.append(name)
+    pq.write_table(pa.Table.from_arrays(arrays, names=names), path, compression='zstd')
+
+
+def read_export(directory):
+    """
+    Iterate over an export one part at a time.
+
+    Yields:
+        dict of column name -> NumPy array, with dictionary columns as codes;
+        decode them with read_manifest(directory)['dictionaries']
+    """
+    manifest = read_manifest(directory)
+    for part in (manifest or {}).get('parts', []):
+        path = os.path.join(directory, part['file'])
+        if part['file'].endswith('.npz'):
+            with np.load(path) as data:
+                yield {name: data[name] for name in data.files}
+        else:
+            table = pq.read_table(path)
+            columns = {}
+            for name in table.column_names:
+                column = table.column(name).combine_chunks()
+                if name in DICTIONARY_COLUMNS:
+                    columns[name] = column.indices.fill_null(-1).to_numpy()
+                elif pa.types.is_fixed_size_list(column.type):
+                    columns[name] = column.flatten().to_numpy().reshape(len(column), column.type.list_size)
+                else:
+                    columns[name] = column.to_numpy(zero_copy_only=False)
+            yield columns
+
+
+class ExportService:
+
+    @staticmethod
+    def export_training_signals(directory, chunk_size=10000, fmt=None, full=False, now=None):
+        """
+        Export training signals recorded since the directory's watermark,
+        up to SIGNAL_SETTLE_SECONDS before now.
+
+        Args:
+            directory: export directory (created if missing)
+            chunk_size: rows per part file; bounds memory use
+            fmt: 'npz' or 'parquet' (default: parquet when pyarrow is
+                 installed, else npz); must match an existing export
+            full: discard the existing export and start from the beginning
+            now: export time (default: now)
+
+        Returns:
+            tuple of (dict with rows, parts, total_rows, watermark, format; error)
+        """
+        if not NUMPY_AVAILABLE:
+            return None, "NumPy is not installed"
+        if fmt == 'parquet' and not PYARROW_AVAILABLE:
+            return None, "Parquet export needs pyarrow"
+
+        os.makedirs(directory, exist_ok=True)
+        manifest = read_manifest(directory)
+        if manifest and manifest.get('version') != EXPORT_FORMAT_VERSION and not full:
+            return None, f"Export in {directory} has format version {manifest.get('version')}; re-run with --full"
+        if manifest and fmt and manifest['format'] != fmt and not full:
+            return None, f"Export in {directory} is {manifest['format']}; re-run with --full to switch"
+        if manifest and manifest['format'] == 'parquet' and not PYARROW_AVAILABLE and not full:
+            return None, "This export is Parquet, which needs pyarrow"
+
+        if manifest is None or full:
+            old_parts = manifest.get('parts', []) if manifest else []
+            manifest = {
+                'version': EXPORT_FORMAT_VERSION,
+                'format': fmt or ('parquet' if PYARROW_AVAILABLE else 'npz'),
+                'max_colors': MAX_COLORS,
+                'dictionaries': {},
+                'parts': [],
+                'rows': 0,
+                'watermark': None,
+            }
+            # Replace the manifest before removing parts, so it never lists a missing file
+            _write_manifest(directory, manifest)
+            for part in old_parts:
+                path = os.path.join(directory, part['file'])
+                if os.path.exists(path):
+                    os.remove(path)
+
+        dictionaries = {
+            name: _Dictionary(manifest['dictionaries'].get(name, []))
+            for name in set(DICTIONARY_COLUMNS.values())
+        }
+        write = _write_parquet if manifest['format'] == 'parquet' else _write_npz
+        watermark = manifest['watermark']
+        settled = (now or datetime.utcnow()) - timedelta(seconds=current_app.config.get('SIGNAL_SETTLE_SECONDS', 60))
+
+        exported = 0
+        parts = 0
+        while True:
+            query = PreferenceService.signal_query().filter(TrainingSignal.created_at <= settled)
+            if watermark:
+                created_at = datetime.fromisoformat(watermark['created_at'])
+                query = query.filter(or_(
+                    TrainingSignal.created_at > created_at,
+                    and_(TrainingSignal.created_at == created_at, TrainingSignal.id > watermark['id']),
+                ))
+            rows = query.order_by(TrainingSignal.created_at, TrainingSignal.id).limit(chunk_size).all()
+            if not rows:
+                break
+
+            columns = _encode_chunk(rows, dictionaries)
+            filename = f"part-{len(manifest['parts']):06d}.{manifest['format']}"
+            write(os.path.join(directory, filename), columns, dictionaries)
+
+            last = rows[-1][0]
+            watermark = {'created_at': last.created_at.isoformat(), 'id': last.id}
+            manifest['parts'].append({'file': filename, 'rows': len(rows), 'watermark': watermark})
+            manifest['rows'] += len(rows)
+            manifest['watermark'] = watermark
+            manifest['dictionaries'] = {name: d.values for name, d in dictionaries.items()}
+            manifest['exported_at'] = datetime.utcnow().isoformat()
+            _write_manifest(directory, manifest)
+
+            exported += len(rows)
+            parts += 1
+            # Drop the chunk's ORM objects before reading the next one
+            db.session.expunge_all()
+            if len(rows) < chunk_size:
+                break
+
+        logger.info(f"Exported {exported} training signals in {parts} parts to {directory}")
+        return {
+            'rows': exported,
+            'parts': parts,
+            'total_rows': manifest['rows'],
+            'watermark': manifest['watermark'],
+            'format': manifest['format'],
+        }, None
@@ -3,10 +3,13 @@
 import json
 import logging
 from flask import current_app
+from sqlalchemy.orm import selectinload
 from app.extensions import db
 from app.models.feedback import Feedback, TrainingSignal
 from app.models.outfit import Outfit
 from app.agents.feedback_agent import FeedbackAgent
+from app.services.suggestion_service import SuggestionService
+from app.services.job_service import JobService
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +25,7 @@ class FeedbackService:
         1. Creates a Feedback record
         2. Extracts training signal
         3. Writes JSON training file for SRA incremental training
+        4. Folds the user's settled training signals into their preference rollups
         """
         outfit = Outfit.query.filter_by(id=outfit_id, user_id=user_id).first()
         if not outfit:
@@ -36,15 +40,89 @@ class FeedbackService:
         db.session.add(feedback)
 
         # Delegate to Feedback Agent for training signal creation
-        fa = FeedbackAgent(current_app.config)
-        training_signal = fa.process_feedback(user_id, outfit, reaction)
+        if current_app.config.get('BACKGROUND_JOBS', False):
+            JobService.enqueue('feedback.process', {
+                'user_id': user_id, 'outfit_id': outfit_id, 'reaction': reaction,
+            })
+        else:
+            fa = FeedbackAgent(current_app.config)
+            fa.process_feedback(user_id, outfit, reaction)
 
         # Store training signal in database
+        db.session.add(FeedbackService._training_signal(user_id, outfit, reaction))
+
+        # Roll up earlier, settled signals in the same transaction, so generating
+        # outfits only folds in the most recent ones
+        FeedbackAgent(current_app.config).rollup_user(user_id)
+
+        # New feedback shifts preferences, so precomputed rankings are stale
+        SuggestionService.invalidate_user(user_id)
+        db.session.commit()
+
+        logger.info(f"Feedback processed: {reaction} for outfit {outfit_id}")
+        return feedback.to_dict(), None
+
+    @staticmethod
+    def submit_feedback_batch(user_id, reactions):
+        """
+        Submit feedback for many outfits at once, e.g. a swipe session.
+
+        Ownership of every outfit is checked with one query, all Feedback
+        and TrainingSignal rows are written in one transaction, together
+        with the user's preference rollup, and the Feedback Agent writes a
+        single training file. The batch is all or nothing: an unknown outfit rejects all of it.
+
+        Args:
+            reactions: list of (outfit_id, 'liked' or 'disliked')
+
+        Returns:
+            tuple of (list of feedback dicts in the order given, error)
+        """
+        outfit_ids = {outfit_id for outfit_id, _ in reactions}
+        outfits = {
+            outfit.id: outfit
+            for outfit in Outfit.query.options(
+                selectinload(Outfit.top_item), selectinload(Outfit.bottom_item)
+            ).filter(Outfit.user_id == user_id, Outfit.id.in_(outfit_ids)).all()
+        }
+        missing = outfit_ids - outfits.keys()
+        if missing:
+            return None, f"Outfit not found: {', '.join(sorted(missing))}"
+
+        feedback = [
+            Feedback(user_id=user_id, outfit_id=outfit_id, reaction=reaction)
+            for outfit_id, reaction in reactions
+        ]
+        db.session.add_all(feedback)
+        db.session.add_all([
+            FeedbackService._training_signal(user_id, outfits[outfit_id], reaction)
+            for outfit_id, reaction in reactions
+        ])
+
+        if current_app.config.get('BACKGROUND_JOBS', False):
+            JobService.enqueue('feedback.process', {
+                'user_id': user_id,
+                'reactions': [{'outfit_id': outfit_id, 'reaction': reaction} for outfit_id, reaction in reactions],
+            })
+        else:
+            fa = FeedbackAgent(current_app.config)
+            fa.process_feedback_batch(user_id, [(outfits[outfit_id], reaction) for outfit_id, reaction in reactions])
+
+        FeedbackAgent(current_app.config).rollup_user(user_id)
+        SuggestionService.invalidate_user(user_id)
+        db.session.commit()
+
+        logger.info(f"Feedback batch processed: {len(reactions)} reactions from user {user_id}")
+        return [f.to_dict() for f in feedback], None
+
+    @staticmethod
+    def _training_signal(user_id, outfit, reaction):
+        """TrainingSignal row for feedback on an outfit; the caller adds and commits it."""
         top = outfit.top_item
         bottom = outfit.bottom_item
-        ts = TrainingSignal(
+        return TrainingSignal(
             user_id=user_id,
-            outfit_id=outfit_id,
+            outfit_id=outfit.id,
             reaction=reaction,
             color_combination=json.dumps({
                 'top_colors': top.get_dominant_colors() if top else [],
@@ -53,8 +131,45 @@ class FeedbackService:
             style_combination=f"{top.style if top else 'unknown'}+{bottom.style if bottom else 'unknown'}",
             occasion=outfit.occasion,
         )
-        db.session.add(ts)
-        db.session.commit()
 
-        logger.info(f"Feedback processed: {reaction} for outfit {outfit_id}")
-        return feedback.to_dict(), None
+    @staticmethod
+    def process_feedback_batch_signal(user_id, reactions):
+        """
+        Have the Feedback Agent write the training file for a feedback batch.
+
+        Used by the background `feedback.process` job for batches; outfits
+        deleted since the batch was submitted are skipped.
+
+        Returns:
+            tuple of (list of training signal dicts, error)
+        """
+        outfit_ids = {entry['outfit_id'] for entry in reactions}
+        outfits = {
+            outfit.id: outfit
+            for outfit in Outfit.query.filter(Outfit.user_id == user_id, Outfit.id.in_(outfit_ids)).all()
+        }
+        if not outfits:
+            return None, "Outfit not found"
+
+        fa = FeedbackAgent(current_app.config)
+        return fa.process_feedback_batch(user_id, [
+            (outfits[entry['outfit_id']], entry['reaction'])
+            for entry in reactions if entry['outfit_id'] in outfits
+        ]), None
+
+    @staticmethod
+    def process_feedback_signal(user_id, outfit_id, reaction):
+        """
+        Have the Feedback Agent write the training signal file for feedback.
+
+        Used by the background `feedback.process` job.
+
+        Returns:
+            tuple of (training signal dict, error)
+        """
+        outfit = Outfit.query.filter_by(id=outfit_id, user_id=user_id).first()
+        if not outfit:
+            return None, "Outfit not found"
+
+        fa = FeedbackAgent(current_app.config)
+        return fa.process_feedback(user_id, outfit, reaction), None
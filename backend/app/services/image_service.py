@@ -0,0 +1,280 @@
+"""Image service - generates resized WebP variants of wardrobe uploads."""
+
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from app.extensions import db
+from app.models.clothing_item import ClothingItem
+from app.storage import get_storage, derived_key
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# Pillow format name -> storage extension for accepted uploads. Phones save
+# multi-picture JPEGs (MPO): a normal JPEG followed by extra frames, which
+# browsers display as the first frame and Pillow decodes frame 0 of by default.
+UPLOAD_FORMATS = {'JPEG': 'jpg', 'MPO': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+def variant_key(key, name):
+    """Storage key of a variant, stored beside the original upload."""
+    return derived_key(key, name, 'webp')
+
+
+def render_variants(image_path, specs, quality=80):
+    """
+    Render WebP variants of an image.
+
+    Decodes the original once and derives each smaller variant from the
+    previous one. Images are never upscaled. Runs without an app context so
+    it can be used from a process pool.
+
+    Args:
+        image_path: local path of the original upload
+        specs: dict of variant name -> longest edge in pixels
+        quality: WebP quality
+
+    Returns:
+        dict of variant name -> encoded WebP bytes
+    """
+    if not PIL_AVAILABLE or not specs:
+        return {}
+
+    ordered = sorted(specs.items(), key=lambda spec: spec[1], reverse=True)
+    variants = {}
+
+    with Image.open(image_path) as img:
+        # JPEG can decode at a reduced scale, which is much cheaper than a full decode
+        img.draft('RGB', (ordered[0][1], ordered[0][1]))
+        current = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+    for name, max_edge in ordered:
+        current.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        current.save(buf, 'WEBP', quality=quality, method=4)
+        variants[name] = buf.getvalue()
+    return variants
+
+
+# Visual descriptor layout: HSV histogram bins, then an 8x8 grayscale thumbnail
+DESCRIPTOR_HSV_BINS = (8, 4, 4)
+DESCRIPTOR_LAYOUT_EDGE = 8
+DESCRIPTOR_DIM = 8 * 4 * 4 + DESCRIPTOR_LAYOUT_EDGE ** 2
+# Share of the similarity carried by colour (the rest is layout)
+DESCRIPTOR_COLOR_WEIGHT = 0.6
+
+
+def _soft_histogram(hsv, weights):
+    """HSV histogram with each pixel spread linearly over neighbouring bins."""
+    bins = np.array(DESCRIPTOR_HSV_BINS)
+    # Hue wraps around; saturation and value are clamped at the ends
+    position = hsv / 256.0 * bins - 0.5
+    low = np.floor(position).astype(np.int64)
+    frac = position - low
+    histogram = np.zeros(int(np.prod(bins)), dtype=np.float64)
+    for corner in range(8):
+        offset = np.array([(corner >> axis) & 1 for axis in range(3)])
+        index = low + offset
+        index[:, 0] %= bins[0]
+        index[:, 1:] = np.clip(index[:, 1:], 0, bins[1:] - 1)
+        weight = weights * np.prod(np.where(offset, frac, 1 - frac), axis=1)
+        flat = (index[:, 0] * bins[1] + index[:, 1]) * bins[2] + index[:, 2]
+        histogram += np.bincount(flat, weights=weight, minlength=histogram.size)
+    return histogram
+
+
+def compute_descriptor(image_path):
+    """
+    Compact visual descriptor of an image for similarity search.
+
+    A centre-weighted HSV colour histogram (square-rooted, so the dot
+    product of two is the Bhattacharyya coefficient) followed by a
+    mean-centred 8x8 grayscale thumbnail that captures rough shape. The
+    vector has unit length, so the dot product of two descriptors is their
+    cosine similarity. Decodes at a reduced scale and runs without an app
+    context (for the process pool).
+
+    Returns:
+        float32 array of length DESCRIPTOR_DIM, or None without Pillow/NumPy
+    """
+    if not PIL_AVAILABLE or not NUMPY_AVAILABLE:
+        return None
+
+    with Image.open(image_path) as img:
+        img.draft('RGB', (128, 128))
+        small = img.convert('RGB')
+    small.thumbnail((128, 128), Image.Resampling.BILINEAR)
+
+    # Garments are usually centred; weight pixels down towards the edges
+    width, height = small.size
+    ys = (np.arange(height) + 0.5) / height - 0.5
+    xs = (np.arange(width) + 0.5) / width - 0.5
+    weights = np.exp(-(ys[:, None] ** 2 + xs[None, :] ** 2) / (2 * 0.3 ** 2)).ravel()
+
+    hsv = np.asarray(small.convert('HSV'), dtype=np.float64).reshape(-1, 3)
+    histogram = _soft_histogram(hsv, weights)
+    histogram = np.sqrt(histogram / histogram.sum())
+
+    edge = DESCRIPTOR_LAYOUT_EDGE
+    layout = np.asarray(small.convert('L').resize((edge, edge), Image.Resampling.BOX), dtype=np.float64).ravel()
+    layout -= layout.mean()
+    norm = np.linalg.norm(layout)
+    if norm > 1e-3:
+        layout /= norm
+    else:
+        layout[:] = 0  # flat image: compare on colour alone
+
+    descriptor = np.concatenate([
+        np.sqrt(DESCRIPTOR_COLOR_WEIGHT) * histogram,
+        np.sqrt(1 - DESCRIPTOR_COLOR_WEIGHT) * layout,
+    ])
+    return (descriptor / np.linalg.norm(descriptor)).astype(np.float32)
+
+
+def _backfill_one(args):
+    item_id, image_path, specs, quality = args
+    try:
+        return item_id, render_variants(image_path, specs, quality)
+    except Exception as e:
+        logger.error(f"Variant generation failed for {image_path}: {e}")
+        return item_id, {}
+
+
+class ImageService:
+
+    @staticmethod
+    def inspect_upload(fileobj):
+        """
+        Validate an upload from its image header, without decoding pixels.
+
+        Pillow only parses the header on open, so oversized images and
+        decompression bombs are rejected before any pixel data is decoded.
+
+        Returns:
+            tuple of (storage extension, error)
+        """
+        if not PIL_AVAILABLE:
+            return None, 'Image processing is unavailable'
+
+        max_pixels = current_app.config.get('MAX_IMAGE_PIXELS', 40_000_000)
+        max_edge = current_app.config.get('MAX_IMAGE_EDGE', 12_000)
+        position = fileobj.tell()
+        try:
+            with Image.open(fileobj) as img:
+                image_format = img.format
+                width, height = img.size
+        except Image.DecompressionBombError:
+            return None, 'Image dimensions are too large'
+        except Exception:
+            return None, 'File is not a supported image'
+        finally:
+            fileobj.seek(position)
+
+        ext = UPLOAD_FORMATS.get(image_format)
+        if ext is None:
+            return None, f"Unsupported image format: {image_format}"
+        if width > max_edge or height > max_edge or width * height > max_pixels:
+            return None, f"Image dimensions are too large ({width}x{height})"
+        return ext, None
+
+    @staticmethod
+    def generate_variants(key, image_path, reuse_existing=False):
+        """
+        Generate the configured variants for an upload.
+
+        Args:
+            key: storage key of the original
+            image_path: local path of the original
+            reuse_existing: skip rendering when every variant is already
+                stored (a deduplicated upload)
+
+        Returns:
+            dict of variant name -> storage key
+        """
+        specs = current_app.config.get('IMAGE_VARIANTS', {})
+        storage = get_storage()
+        keys = {name: variant_key(key, name) for name in specs}
+        if reuse_existing and keys and all(storage.exists(k) for k in keys.values()):
+            return keys
+
+        try:
+            rendered = render_variants(image_path, specs, current_app.config.get('IMAGE_VARIANT_QUALITY', 80))
+        except Exception as e:
+            logger.error(f"Variant generation failed for {key}: {e}")
+            return {}
+        return ImageService._save_variants(key, rendered)
+
+    @staticmethod
+    def backfill_variants(workers=None, batch_size=200, force=False):
+        """
+        Generate variants for existing uploads using a process pool.
+
+        Requires a storage backend with files on local disk.
+
+        Args:
+            workers: pool size (defaults to the CPU count)
+            batch_size: items committed per batch
+            force: regenerate even for items that already have variants
+
+        Returns:
+            tuple of (items processed, items updated)
+        """
+        storage = get_storage()
+        if storage.root is None:
+            raise RuntimeError("Backfill needs a storage backend with local files")
+        specs = current_app.config.get('IMAGE_VARIANTS', {})
+        quality = current_app.config.get('IMAGE_VARIANT_QUALITY', 80)
+
+        query = db.session.query(ClothingItem.id, ClothingItem.filename).filter(
+            ClothingItem.filename.isnot(None)
+        )
+        if not force:
+            query = query.filter(ClothingItem.image_variants.is_(None))
+        rows = [(item_id, key) for item_id, key in query.all() if storage.exists(key)]
+        keys_by_id = dict(rows)
+        jobs = [(item_id, storage.path(key), specs, quality) for item_id, key in rows]
+
+        updated = 0
+        pending = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for item_id, rendered in pool.map(_backfill_one, jobs, chunksize=8):
+                if rendered:
+                    pending[item_id] = ImageService._save_variants(keys_by_id[item_id], rendered)
+                if len(pending) >= batch_size:
+                    updated += ImageService._store_variant_keys(pending)
+                    pending = {}
+        updated += ImageService._store_variant_keys(pending)
+        return len(jobs), updated
+
+    @staticmethod
+    def _save_variants(key, rendered):
+        storage = get_storage()
+        keys = {}
+        for name, data in rendered.items():
+            k = variant_key(key, name)
+            storage.save(k, io.BytesIO(data))
+            keys[name] = k
+        return keys
+
+    @staticmethod
+    def _store_variant_keys(keys_by_id):
+        if not keys_by_id:
+            return 0
+        items = ClothingItem.query.filter(ClothingItem.id.in_(list(keys_by_id))).all()
+        for item in items:
+            item.set_image_variants(keys_by_id[item.id])
+        db.session.commit()
+        return len(items)
@@ -0,0 +1,183 @@
+"""Job service - durable background job queue stored in the app database.
+
+Workers claim jobs with a compare-and-set UPDATE, so any number of worker
+processes can share one queue without an external broker. A claimed job is
+invisible to other workers until its visibility timeout passes; live
+workers extend it with heartbeats, so a job is only retried elsewhere when
+its worker has died.
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+# Seconds before retry n is attempted: RETRY_BACKOFF * 2 ** (n - 1), capped
+RETRY_BACKOFF = 5
+RETRY_BACKOFF_MAX = 600
+
+
+def _claimable(job_type, now):
+    """Queued and due, or running with an expired lock and attempts left."""
+    return db.and_(
+        Job.job_type == job_type,
+        db.or_(
+            db.and_(Job.status == 'queued', Job.run_after <= now),
+            db.and_(Job.status == 'running', Job.locked_until < now, Job.attempts < Job.max_attempts),
+        ),
+    )
+
+
+class JobService:
+
+    @staticmethod
+    def enqueue(job_type, payload=None, max_attempts=3, delay=0):
+        """
+        Add a job to the current session; it becomes visible to workers when
+        the caller commits, so it is enqueued atomically with the caller's
+        other writes.
+
+        Returns:
+            Job
+        """
+        job = Job(
+            job_type=job_type,
+            max_attempts=max_attempts,
+            run_after=datetime.utcnow() + timedelta(seconds=delay),
+        )
+        job.set_payload(payload)
+        db.session.add(job)
+        return job
+
+    @staticmethod
+    def claim(job_type, worker_id, limit, visibility_timeout):
+        """
+        Claim up to limit due jobs of one type for a worker.
+
+        Returns:
+            list of Job (status running, locked to worker_id)
+        """
+        now = datetime.utcnow()
+        candidates = [row[0] for row in db.session.query(Job.id).filter(
+            _claimable(job_type, now)
+        ).order_by(Job.run_after).limit(limit).all()]
+
+        claimed_ids = []
+        for job_id in candidates:
+            updated = Job.query.filter(Job.id == job_id, _claimable(job_type, now)).update({
+                Job.status: 'running',
+                Job.locked_by: worker_id,
+                Job.locked_until: now + timedelta(seconds=visibility_timeout),
+                Job.attempts: Job.attempts + 1,
+                Job.started_at: now,
+            }, synchronize_session=False)
+            if updated:
+                claimed_ids.append(job_id)
+        db.session.commit()
+
+        if not claimed_ids:
+            return []
+        return Job.query.filter(Job.id.in_(claimed_ids)).all()
+
+    @staticmethod
+    def heartbeat(job_ids, worker_id, visibility_timeout):
+        """Extend the visibility timeout of jobs this worker is still running."""
+        if not job_ids:
+            return 0
+        updated = Job.query.filter(
+            Job.id.in_(list(job_ids)), Job.locked_by == worker_id, Job.status == 'running'
+        ).update({
+            Job.locked_until: datetime.utcnow() + timedelta(seconds=visibility_timeout),
+        }, synchronize_session=False)
+        db.session.commit()
+        return updated
+
+    @staticmethod
+    def complete(job_id, worker_id, result=None):
+        """Mark a job succeeded; ignored if another worker has since reclaimed it."""
+        updated = Job.query.filter(Job.id == job_id, Job.locked_by == worker_id).update({
+            Job.status: 'succeeded',
+            Job.result: json.dumps(result) if result is not None else None,
+            Job.locked_until: None,
+            Job.finished_at: datetime.utcnow(),
+        }, synchronize_session=False)
+        db.session.commit()
+        return bool(updated)
+
+    @staticmethod
+    def fail(job_id, worker_id, error):
+        """
+        Record a failed attempt: requeue with exponential backoff, or mark
+        the job failed once it has used all its attempts.
+
+        Returns:
+            str - the job's new status, or None if it was reclaimed elsewhere
+        """
+        job = Job.query.filter_by(id=job_id, locked_by=worker_id).first()
+        if not job:
+            db.session.rollback()
+            return None
+
+        now = datetime.utcnow()
+        job.last_error = str(error)[:2000]
+        job.locked_until = None
+        if job.attempts < job.max_attempts:
+            delay = min(RETRY_BACKOFF * 2 ** (job.attempts - 1), RETRY_BACKOFF_MAX)
+            job.status = 'queued'
+            job.run_after = now + timedelta(seconds=delay)
+        else:
+            job.status = 'failed'
+            job.finished_at = now
+        db.session.commit()
+        return job.status
+
+    @staticmethod
+    def fail_expired():
+        """Fail running jobs whose worker died on their last attempt."""
+        now = datetime.utcnow()
+        updated = Job.query.filter(
+            Job.status == 'running', Job.locked_until < now, Job.attempts >= Job.max_attempts
+        ).update({
+            Job.status: 'failed',
+            Job.last_error: 'Visibility timeout expired on final attempt',
+            Job.locked_until: None,
+            Job.finished_at: now,
+        }, synchronize_session=False)
+        db.session.commit()
+        return updated
+
+    @staticmethod
+    def get_stats():
+        """
+        Queue depth per job type and status, and the age of the oldest due job.
+
+        Returns:
+            dict of job_type -> {status counts..., 'oldest_queued_seconds'}
+        """
+        now = datetime.utcnow()
+        stats = {}
+        rows = db.session.query(Job.job_type, Job.status, db.func.count(Job.id)).group_by(
+            Job.job_type, Job.status
+        ).all()
+        for job_type, status, count in rows:
+            stats.setdefault(job_type, {})[status] = count
+
+        oldest = db.session.query(Job.job_type, db.func.min(Job.run_after)).filter(
+            Job.status == 'queued', Job.run_after <= now
+        ).group_by(Job.job_type).all()
+        for job_type, run_after in oldest:
+            stats.setdefault(job_type, {})['oldest_queued_seconds'] = (now - run_after).total_seconds()
+        return stats
+
+    @staticmethod
+    def purge_finished(older_than_days=7):
+        """Delete succeeded and failed jobs finished before the cutoff."""
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        deleted = Job.query.filter(
+            Job.status.in_(('succeeded', 'failed')), Job.finished_at < cutoff
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
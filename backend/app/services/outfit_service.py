@@ -1,32 +1,220 @@
 """Outfit service - coordinates the SRA agent for outfit generation and management."""
 
 import json
+import time
 import logging
+import threading
+from datetime import datetime, timedelta
 from flask import current_app
+from sqlalchemy.exc import IntegrityError
 from app.extensions import db
 from app.models.clothing_item import ClothingItem
-from app.models.outfit import Outfit, SavedOutfit
-from app.agents.styling_recommendation_agent import StylingRecommendationAgent
+from app.models.outfit import Outfit, SavedOutfit, IdempotencyKey
+from app.agents.styling_recommendation_agent import StylingRecommendationAgent, get_weather_bucket
 from app.agents.feedback_agent import FeedbackAgent
+from app.services.wardrobe_service import WardrobeService
+from app.services.suggestion_service import SuggestionService
+from app.services.job_service import JobService
+from app.metrics import timed
+from app.services.weather_service import WeatherService
 
 logger = logging.getLogger(__name__)
 
+# Seconds between checks while another request holds an idempotency key
+IDEMPOTENCY_POLL_INTERVAL = 0.25
+
+
+class GenerationCoalescer:
+    """
+    Per-process singleflight for outfit generation.
+
+    Concurrent calls with the same key wait for the first caller's result
+    instead of running their own pipeline. Idempotency keys are kept in the
+    database instead (see IdempotencyKey), so retries are recognised by
+    every worker.
+    """
+
+    def __init__(self, wait_timeout=120):
+        self.wait_timeout = wait_timeout
+        self._inflight = {}  # key -> _Call
+        self._lock = threading.Lock()
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.exception = None
+
+    def run(self, key, fn):
+        """Run fn once per key among concurrent callers and return its result."""
+        with self._lock:
+            call = self._inflight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._Call()
+                self._inflight[key] = call
+
+        if not is_leader:
+            if not call.event.wait(self.wait_timeout):
+                return None, "Outfit generation timed out. Please try again."
+            if call.exception is not None:
+                raise call.exception
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+        return call.result
+
 
 class OutfitService:
 
     @staticmethod
-    def generate_outfit(user_id, occasion, weather_data):
+    def generate_outfit(user_id, occasion, weather_data=None, location=None, idempotency_key=None):
         """
         Generate an AI-powered outfit recommendation.
 
+        Identical concurrent requests (same user, occasion, weather bucket
+        and wardrobe version) in one process share a single generation, and
+        a request that repeats a recent idempotency key gets the original
+        outfit back from whichever worker handles it.
+
+        Args:
+            weather_data: optional dict - client-supplied weather snapshot
+            location: optional dict with city or lat/lon for weather resolution
+            idempotency_key: optional str - client key identifying retries
+        """
+        if not weather_data:
+            weather_data = WeatherService.get_current_weather(**(location or {}))
+
+        coalescer = OutfitService.get_coalescer()
+        if idempotency_key:
+            outfit, error = OutfitService._claim_idempotency_key(user_id, idempotency_key, coalescer.wait_timeout)
+            if outfit or error:
+                return outfit, error
+
+        weather_bucket = get_weather_bucket(weather_data)
+        wardrobe_version = WardrobeService.get_wardrobe_version(user_id)
+        key = (user_id, occasion, weather_bucket, wardrobe_version)
+
+        try:
+            outfit, error = coalescer.run(
+                key,
+                lambda: OutfitService._generate_outfit(
+                    user_id, occasion, weather_data, weather_bucket, wardrobe_version
+                ),
+            )
+        except Exception:
+            if idempotency_key:
+                OutfitService._release_idempotency_key(user_id, idempotency_key)
+            raise
+        if idempotency_key:
+            if error:
+                OutfitService._release_idempotency_key(user_id, idempotency_key)
+            else:
+                OutfitService._store_idempotency_key(user_id, idempotency_key, outfit['id'])
+        return outfit, error
+
+    @staticmethod
+    def _claim_idempotency_key(user_id, key, wait_timeout):
+        """
+        Claim an idempotency key for this request, or wait for the request
+        that holds it.
+
+        Returns:
+            tuple of (outfit dict, error) - both None once the key is claimed
+            and the caller should generate; the original outfit for a
+            repeated key; an error if its holder does not finish in time
+        """
+        deadline = time.monotonic() + wait_timeout
+        while True:
+            now = datetime.utcnow()
+            IdempotencyKey.query.filter(
+                IdempotencyKey.user_id == user_id, IdempotencyKey.expires_at <= now
+            ).delete(synchronize_session=False)
+            # The pending claim outlives a generation that is still running
+            db.session.add(IdempotencyKey(
+                user_id=user_id, key=key, expires_at=now + timedelta(seconds=wait_timeout),
+            ))
+            try:
+                db.session.commit()
+                return None, None
+            except IntegrityError:
+                db.session.rollback()
+
+            record = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+            if record is not None and record.outfit_id:
+                outfit = db.session.get(Outfit, record.outfit_id)
+                if outfit:
+                    return outfit.to_dict(), None
+                # The outfit was deleted since; let this request generate again
+                db.session.delete(record)
+                db.session.commit()
+                continue
+            if time.monotonic() > deadline:
+                return None, "Outfit generation timed out. Please try again."
+            time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+    @staticmethod
+    def _store_idempotency_key(user_id, key, outfit_id):
+        """Point a claimed key at the generated outfit for the reuse window."""
+        window = current_app.config.get('GENERATION_REUSE_WINDOW', 30)
+        IdempotencyKey.query.filter_by(user_id=user_id, key=key).update({
+            'outfit_id': outfit_id,
+            'expires_at': datetime.utcnow() + timedelta(seconds=window),
+        }, synchronize_session=False)
+        db.session.commit()
+
+    @staticmethod
+    def _release_idempotency_key(user_id, key):
+        """Drop a claim whose generation failed, so a retry can run."""
+        db.session.rollback()
+        IdempotencyKey.query.filter_by(user_id=user_id, key=key, outfit_id=None).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    @staticmethod
+    def _generate_outfit(user_id, occasion, weather_data, weather_bucket, wardrobe_version):
+        """
+        Run the generation pipeline.
+
         Coordinates:
-        1. Fetch wardrobe items from database
-        2. Retrieve user preferences from Feedback Agent
-        3. Invoke SRA to generate recommendation
-        4. Persist the generated outfit
+        1. Serve a precomputed suggestion for the slot if one is available
+        2. Otherwise fetch wardrobe items from database
+        3. Retrieve user preferences from Feedback Agent
+        4. Invoke SRA to generate recommendation
+        5. Persist the generated outfit
         """
+        with timed('outfit.suggestion_lookup'):
+            suggestion = SuggestionService.take_suggestion(
+                user_id, occasion, weather_bucket, wardrobe_version
+            )
+        if suggestion:
+            outfit = Outfit(
+                user_id=user_id,
+                top_item_id=suggestion['top_item_id'],
+                bottom_item_id=suggestion['bottom_item_id'],
+                occasion=occasion,
+                weather_data=json.dumps(weather_data),
+                explanation=suggestion['explanation'],
+            )
+            outfit.set_extra_item_ids(suggestion['extra_item_ids'])
+            db.session.add(outfit)
+            with timed('outfit.persist'):
+                db.session.commit()
+            return outfit.to_dict(), None
+
         # Fetch user's wardrobe
-        wardrobe_items = ClothingItem.query.filter_by(user_id=user_id).all()
+        with timed('outfit.load_wardrobe'):
+            wardrobe_items = ClothingItem.query.filter_by(user_id=user_id).all()
         if not wardrobe_items:
             return None, "Your wardrobe is empty. Add some clothing items first!"
 
@@ -34,10 +222,11 @@ class OutfitService:
         fa = FeedbackAgent(current_app.config)
         user_preferences = fa.get_user_preferences(user_id)
 
-        # Invoke SRA
+        # Invoke SRA; with background jobs the LLM explanation is written later
+        explain_later = current_app.config.get('BACKGROUND_JOBS', False)
         sra = StylingRecommendationAgent(current_app.config)
         recommendation = sra.generate_outfit(
-            wardrobe_items, occasion, weather_data, user_preferences
+            wardrobe_items, occasion, weather_data, user_preferences, explain=not explain_later
         )
 
         if not recommendation:
@@ -55,11 +244,144 @@ class OutfitService:
             weather_data=json.dumps(weather_data),
             explanation=recommendation.get('explanation', ''),
         )
+        outfit.set_extra_item_ids({
+            slot: item.id for slot, item in recommendation.get('items', {}).items()
+            if slot not in ('top', 'bottom')
+        })
         db.session.add(outfit)
-        db.session.commit()
+        if explain_later:
+            db.session.flush()  # assigns outfit.id for the job payload
+            JobService.enqueue('outfit.explain', {'outfit_id': outfit.id})
+        with timed('outfit.persist'):
+            db.session.commit()
 
         return outfit.to_dict(), None
 
+    @staticmethod
+    def explain_outfit(outfit_id):
+        """
+        Replace an outfit's rule-based explanation with one from LLaMA.
+
+        Used by the background `outfit.explain` job.
+
+        Returns:
+            tuple of (outfit dict, error)
+        """
+        outfit = db.session.get(Outfit, outfit_id)
+        if not outfit:
+            return None, "Outfit not found"
+
+        sra = StylingRecommendationAgent(current_app.config)
+        outfit.explanation = sra.explain_outfit(
+            outfit.top_item, outfit.bottom_item, outfit.occasion, outfit.get_weather_data(),
+            outfit.get_extra_items(),
+        )
+        db.session.commit()
+        return outfit.to_dict(), None
+
+    @staticmethod
+    def plan_outfits(user_id, days, no_repeat_days=0, location=None):
+        """
+        Plan one outfit per day for a week or a trip.
+
+        The wardrobe and preferences are loaded once and the SRA scores all
+        days together (see StylingRecommendationAgent.plan_outfits); the
+        explanations come from a single LLM call, made here or, with
+        background jobs, by one `outfit.explain_plan` job.
+
+        Args:
+            days: list of dicts with date (datetime.date), occasion and an
+                  optional weather forecast; days without one use the
+                  current weather for location
+            no_repeat_days: do not plan an item again within this many days
+            location: optional dict with city or lat/lon for weather resolution
+
+        Returns:
+            tuple of (list of outfit dicts in the order of days, error)
+        """
+        if any(not day.get('weather') for day in days):
+            current_weather = WeatherService.get_current_weather(**(location or {}))
+            days = [dict(day, weather=day.get('weather') or current_weather) for day in days]
+
+        with timed('outfit.load_wardrobe'):
+            wardrobe_items = ClothingItem.query.filter_by(user_id=user_id).all()
+        if not wardrobe_items:
+            return None, "Your wardrobe is empty. Add some clothing items first!"
+
+        fa = FeedbackAgent(current_app.config)
+        user_preferences = fa.get_user_preferences(user_id)
+
+        explain_later = current_app.config.get('BACKGROUND_JOBS', False)
+        sra = StylingRecommendationAgent(current_app.config)
+        plan = sra.plan_outfits(
+            wardrobe_items, days, user_preferences, no_repeat_days, explain=not explain_later
+        )
+        if not plan:
+            return None, "Could not plan outfits. Please add more items to your wardrobe."
+
+        outfits = []
+        for day, recommendation in zip(days, plan):
+            top = recommendation.get('top')
+            bottom = recommendation.get('bottom')
+            outfit = Outfit(
+                user_id=user_id,
+                top_item_id=top.id if top else None,
+                bottom_item_id=bottom.id if bottom else None,
+                occasion=day['occasion'],
+                weather_data=json.dumps(day['weather']),
+                explanation=recommendation.get('explanation', ''),
+                planned_for=day['date'],
+            )
+            outfit.set_extra_item_ids({
+                slot: item.id for slot, item in recommendation.get('items', {}).items()
+                if slot not in ('top', 'bottom')
+            })
+            db.session.add(outfit)
+            outfits.append(outfit)
+        if explain_later:
+            db.session.flush()  # assigns the outfit ids for the job payload
+            JobService.enqueue('outfit.explain_plan', {'outfit_ids': [outfit.id for outfit in outfits]})
+        with timed('outfit.persist'):
+            db.session.commit()
+
+        return [outfit.to_dict() for outfit in outfits], None
+
+    @staticmethod
+    def explain_plan(outfit_ids):
+        """
+        Replace the rule-based explanations of a planned set of outfits
+        with LLaMA ones, from a single prompt.
+
+        Used by the background `outfit.explain_plan` job.
+
+        Returns:
+            tuple of (list of outfit dicts, error)
+        """
+        by_id = {outfit.id: outfit for outfit in Outfit.query.filter(Outfit.id.in_(outfit_ids)).all()}
+        outfits = [by_id[outfit_id] for outfit_id in outfit_ids if outfit_id in by_id]
+        if not outfits:
+            return None, "Outfits not found"
+
+        sra = StylingRecommendationAgent(current_app.config)
+        explanations = sra.explain_plan([
+            (outfit.planned_for or outfit.created_at.date(), outfit.get_items(),
+             outfit.occasion, outfit.get_weather_data())
+            for outfit in outfits
+        ])
+        for outfit, explanation in zip(outfits, explanations):
+            outfit.explanation = explanation
+        db.session.commit()
+        return [outfit.to_dict() for outfit in outfits], None
+
+    @staticmethod
+    def get_coalescer():
+        """Get the per-app generation coalescer, creating it on first use."""
+        coalescer = current_app.extensions.get('generation_coalescer')
+        if coalescer is None:
+            coalescer = GenerationCoalescer()
+            coalescer = current_app.extensions.setdefault('generation_coalescer', coalescer)
+        return coalescer
+
     @staticmethod
     def get_saved_outfits(user_id):
         """Get all saved outfits for a user."""
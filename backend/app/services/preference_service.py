@@ -0,0 +1,153 @@
+"""Preference service - trains and serves the SRA's learned preference model."""
+
+import logging
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import aliased
+from app.extensions import db
+from app.models.feedback import TrainingSignal, PreferenceRollupCursor
+from app.agents.feedback_agent import FeedbackAgent
+from app.models.outfit import Outfit
+from app.models.clothing_item import ClothingItem
+from app.agents import preference_model
+
+logger = logging.getLogger(__name__)
+
+
+class PreferenceService:
+
+    @staticmethod
+    def signal_query():
+        """Query for (TrainingSignal, top category, bottom category); categories are None once the items are gone."""
+        top_item = aliased(ClothingItem)
+        bottom_item = aliased(ClothingItem)
+        return db.session.query(
+            TrainingSignal, top_item.category, bottom_item.category,
+        ).outerjoin(Outfit, Outfit.id == TrainingSignal.outfit_id).outerjoin(
+            top_item, top_item.id == Outfit.top_item_id
+        ).outerjoin(
+            bottom_item, bottom_item.id == Outfit.bottom_item_id
+        )
+
+    @staticmethod
+    def load_examples():
+        """
+        Build training examples from every TrainingSignal row.
+
+        Styles and colours come from the signal itself (they are captured
+        at feedback time); categories from the outfit's items when those
+        still exist.
+
+        Returns:
+            list of example dicts for preference_model.train
+        """
+        examples = []
+        for signal, top_category, bottom_category in PreferenceService.signal_query().yield_per(5000):
+            top_style, _, bottom_style = (signal.style_combination or '').partition('+')
+            colors = signal.get_color_combination()
+            examples.append({
+                'user_id': signal.user_id,
+                'occasion': signal.occasion,
+                'liked': signal.reaction == 'liked',
+                'top': (top_style, top_category, colors.get('top_colors', [])),
+                'bottom': (bottom_style, bottom_category, colors.get('bottom_colors', [])),
+            })
+        return examples
+
+    @staticmethod
+    def train_model(workers=None, epochs=20):
+        """
+        Train a new model version from all feedback and make it current.
+
+        Returns:
+            tuple of (model meta dict, error)
+        """
+        if not preference_model.NUMPY_AVAILABLE:
+            return None, "NumPy is not installed"
+
+        examples = PreferenceService.load_examples()
+        if len(examples) < current_app.config.get('PREFERENCE_MIN_EXAMPLES', 20):
+            return None, f"Not enough feedback to train ({len(examples)} signals)"
+
+        model = preference_model.train(
+            examples,
+            workers=workers,
+            epochs=epochs,
+            min_user_examples=current_app.config.get('PREFERENCE_MIN_USER_SIGNALS', 10),
+        )
+        path = model.save(
+            current_app.config['PREFERENCE_MODEL_DIR'],
+            keep=current_app.config.get('PREFERENCE_MODEL_KEEP', 3),
+        )
+        logger.info(f"Preference model {model.version} saved to {path}")
+        return dict(model.meta, version=model.version), None
+
+    @staticmethod
+    def rollup_preferences(now=None, retention_days=None):
+        """
+        Fold new training signals into each user's decayed preference rollups,
+        then compact: delete rolled-up signals (rows and files) older than the
+        retention window.
+
+        Retention only removes signals the rollups already include, so the
+        preferences served do not change; the learned preference model does
+        train on fewer raw signals afterwards.
+
+        Args:
+            now: rollup time (default: now)
+            retention_days: override PREFERENCE_RETENTION_DAYS (0 keeps all signals)
+
+        Returns:
+            dict with users, signals (folded in), deleted (signal rows), files
+        """
+        now = now or datetime.utcnow()
+        if retention_days is None:
+            retention_days = current_app.config.get('PREFERENCE_RETENTION_DAYS', 365)
+        fa = FeedbackAgent(current_app.config)
+
+        # Users with settled signals past their cursor (or with nothing rolled up yet)
+        pending = db.session.query(TrainingSignal.user_id).outerjoin(
+            PreferenceRollupCursor, PreferenceRollupCursor.user_id == TrainingSignal.user_id
+        ).filter(
+            TrainingSignal.created_at <= now - fa.settle,
+            or_(
+                PreferenceRollupCursor.created_at.is_(None),
+                TrainingSignal.created_at > PreferenceRollupCursor.created_at,
+                and_(
+                    TrainingSignal.created_at == PreferenceRollupCursor.created_at,
+                    TrainingSignal.id > PreferenceRollupCursor.signal_id,
+                ),
+            ),
+        ).distinct()
+        user_ids = [user_id for user_id, in pending]
+
+        folded = 0
+        for user_id in user_ids:
+            folded += fa.rollup_user(user_id, now)
+            db.session.commit()
+
+        deleted = files = 0
+        if retention_days > 0:
+            cutoff = now - timedelta(days=retention_days)
+            rolled_up_to = db.session.query(PreferenceRollupCursor.created_at).filter(
+                PreferenceRollupCursor.user_id == TrainingSignal.user_id
+            ).scalar_subquery()
+            deleted = TrainingSignal.query.filter(
+                TrainingSignal.created_at < cutoff,
+                TrainingSignal.created_at < rolled_up_to,
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            files = fa.prune_signal_files(cutoff)
+
+        logger.info(f"Preference rollup: {folded} signals from {len(user_ids)} users, "
+                    f"{deleted} signals and {files} files past retention deleted")
+        return {'users': len(user_ids), 'signals': folded, 'deleted': deleted, 'files': files}
+
+    @staticmethod
+    def get_model():
+        """The current model version for this process, or None if none is trained."""
+        return preference_model.get_preference_model(
+            current_app.config.get('PREFERENCE_MODEL_DIR'),
+            current_app.config.get('PREFERENCE_MODEL_RELOAD_INTERVAL', 30),
+        )
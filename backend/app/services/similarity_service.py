@@ -0,0 +1,230 @@
+"""Similarity service - visual nearest-neighbour search over a user's wardrobe."""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from app.extensions import db
+from app.models.clothing_item import ClothingItem
+from app.services.image_service import compute_descriptor, DESCRIPTOR_DIM, NUMPY_AVAILABLE
+from app.storage import get_storage
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def encode_descriptor(descriptor):
+    """Pack a descriptor for the visual_descriptor column (float16, 2 bytes per value)."""
+    return np.asarray(descriptor, dtype=np.float16).tobytes()
+
+
+def decode_descriptor(data):
+    """Unpack a stored descriptor, or None if absent or from an older layout."""
+    if not data or len(data) != DESCRIPTOR_DIM * 2:
+        return None
+    return np.frombuffer(data, dtype=np.float16).astype(np.float32)
+
+
+def _descriptor_one(args):
+    item_id, image_path = args
+    try:
+        return item_id, compute_descriptor(image_path)
+    except Exception as e:
+        logger.error(f"Descriptor computation failed for {image_path}: {e}")
+        return item_id, None
+
+
+class VisualIndex:
+    """One user's item descriptors as a float32 matrix, for the wardrobe version it was built at."""
+
+    def __init__(self, version, item_ids, outfit_parts, matrix):
+        self.version = version
+        self.item_ids = item_ids
+        self.outfit_parts = np.array(outfit_parts, dtype=object)
+        self.matrix = matrix
+        self.positions = {item_id: i for i, item_id in enumerate(item_ids)}
+
+    @classmethod
+    def build(cls, user_id, version):
+        """Load stored descriptors (no image decoding)."""
+        rows = db.session.query(
+            ClothingItem.id, ClothingItem.outfit_part, ClothingItem.visual_descriptor
+        ).filter(
+            ClothingItem.user_id == user_id,
+            ClothingItem.visual_descriptor.isnot(None),
+        ).all()
+        rows = [row for row in rows if row[2] and len(row[2]) == DESCRIPTOR_DIM * 2]
+        matrix = np.frombuffer(b''.join(row[2] for row in rows), dtype=np.float16)
+        matrix = matrix.reshape(len(rows), DESCRIPTOR_DIM).astype(np.float32)
+        return cls(version, [row[0] for row in rows], [row[1] for row in rows], matrix)
+
+    def get(self, item_id):
+        position = self.positions.get(item_id)
+        return None if position is None else self.matrix[position]
+
+    def search(self, query, limit=10, exclude=None, outfit_part=None, min_similarity=None):
+        """
+        Nearest items to a descriptor by cosine similarity.
+
+        Returns:
+            list of (item_id, similarity), most similar first
+        """
+        if not self.item_ids:
+            return []
+        scores = self.matrix @ query
+        if exclude in self.positions:
+            scores[self.positions[exclude]] = -np.inf
+        if outfit_part:
+            scores[self.outfit_parts != outfit_part] = -np.inf
+        if min_similarity is not None:
+            scores[scores < min_similarity] = -np.inf
+
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(self.item_ids[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+class VisualIndexCache:
+    """Per-process LRU of VisualIndex instances, rebuilt when the wardrobe version moves."""
+
+    def __init__(self, max_users=128):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version):
+        with self._lock:
+            index = self._entries.get(user_id)
+            if index is not None and index.version == version:
+                self._entries.move_to_end(user_id)
+                return index
+        index = VisualIndex.build(user_id, version)
+        if self.max_users > 0:
+            with self._lock:
+                self._entries[user_id] = index
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SimilarityService:
+
+    @staticmethod
+    def get_index(user_id):
+        """
+        The user's visual index, current as of the latest wardrobe change.
+
+        The descriptor count is part of the version so indexes cached by
+        other processes also notice a bulk backfill.
+        """
+        from app.services.wardrobe_service import WardrobeService
+
+        cache = current_app.extensions.get('visual_index')
+        if cache is None:
+            cache = VisualIndexCache(current_app.config.get('VISUAL_INDEX_MAX_USERS', 128))
+            cache = current_app.extensions.setdefault('visual_index', cache)
+        described = db.session.query(db.func.count(ClothingItem.visual_descriptor)).filter(
+            ClothingItem.user_id == user_id
+        ).scalar()
+        return cache.get(user_id, (WardrobeService.get_wardrobe_version(user_id), described))
+
+    @staticmethod
+    def find_similar(user_id, item_id, limit=10, outfit_part=None):
+        """
+        Find the wardrobe items that look most like the given one.
+
+        Returns:
+            tuple of (list of item dicts with a `similarity` score, error)
+        """
+        if not NUMPY_AVAILABLE:
+            return None, "Similarity search is unavailable"
+        item = ClothingItem.query.filter_by(id=item_id, user_id=user_id).first()
+        if not item:
+            return None, "Item not found"
+
+        index = SimilarityService.get_index(user_id)
+        query = index.get(item_id)
+        if query is None:
+            query = decode_descriptor(item.visual_descriptor)
+        if query is None:
+            return None, "Item has no visual descriptor yet"
+
+        matches = index.search(query, limit, exclude=item_id, outfit_part=outfit_part)
+        items = {i.id: i for i in ClothingItem.query.filter(
+            ClothingItem.id.in_([match_id for match_id, _ in matches])
+        ).all()} if matches else {}
+        results = []
+        for match_id, similarity in matches:
+            if match_id in items:
+                result = items[match_id].to_dict()
+                result['similarity'] = round(similarity, 4)
+                results.append(result)
+        return results, None
+
+    @staticmethod
+    def find_duplicates(user_id, descriptor):
+        """Existing items that look like near-copies of a new upload's descriptor."""
+        if descriptor is None:
+            return []
+        threshold = current_app.config.get('DUPLICATE_SIMILARITY', 0.98)
+        matches = SimilarityService.get_index(user_id).search(descriptor, limit=5, min_similarity=threshold)
+        return [{'id': item_id, 'similarity': round(similarity, 4)} for item_id, similarity in matches]
+
+    @staticmethod
+    def backfill_descriptors(workers=None, batch_size=200, force=False):
+        """
+        Compute visual descriptors for existing uploads using a process pool.
+
+        Requires a storage backend with files on local disk.
+
+        Args:
+            workers: pool size (defaults to the CPU count)
+            batch_size: items committed per batch
+            force: recompute descriptors that already exist
+
+        Returns:
+            tuple of (items processed, items updated)
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("Descriptor backfill needs NumPy")
+        storage = get_storage()
+        if storage.root is None:
+            raise RuntimeError("Backfill needs a storage backend with local files")
+
+        query = db.session.query(ClothingItem.id, ClothingItem.filename).filter(
+            ClothingItem.filename.isnot(None)
+        )
+        if not force:
+            query = query.filter(ClothingItem.visual_descriptor.is_(None))
+        jobs = [(item_id, storage.path(key)) for item_id, key in query.all() if storage.exists(key)]
+
+        updated = 0
+        pending = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for item_id, descriptor in pool.map(_descriptor_one, jobs, chunksize=16):
+                if descriptor is not None:
+                    pending[item_id] = encode_descriptor(descriptor)
+                if len(pending) >= batch_size:
+                    updated += SimilarityService._store_descriptors(pending)
+                    pending = {}
+        updated += SimilarityService._store_descriptors(pending)
+        return len(jobs), updated
+
+    @staticmethod
+    def _store_descriptors(descriptors_by_id):
+        if not descriptors_by_id:
+            return 0
+        items = ClothingItem.query.filter(ClothingItem.id.in_(list(descriptors_by_id))).all()
+        for item in items:
+            item.visual_descriptor = descriptors_by_id[item.id]
+        db.session.commit()
+        return len(items)
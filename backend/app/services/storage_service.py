@@ -0,0 +1,323 @@
+"""Storage service - content-addressed, reference-counted upload storage."""
+
+import os
+import hmac
+import json
+import time
+import hashlib
+import logging
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.models.clothing_item import ClothingItem
+from app.models.stored_blob import StoredBlob
+from app.storage import get_storage, content_key, CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Spool small uploads in memory while hashing; larger ones go to a temp file
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# Files written by image preprocessing that are never referenced after analysis
+DERIVED_SUFFIXES = ('_preprocessed.jpg',)
+# Leftovers of interrupted atomic writes (see LocalFileStorage.save)
+TEMP_PREFIX = '.tmp-'
+GC_LOCK_NAME = '.gc.lock'
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def _blob_stem(key):
+    """Key without extension or derived-file suffix; shared by a blob and its variants."""
+    directory, _, name = key.rpartition('/')
+    stem = name.split('.', 1)[0].split('_', 1)[0]
+    return f"{directory}/{stem}" if directory else stem
+
+
+class StorageService:
+
+    @staticmethod
+    def store_upload(fileobj, validate=None):
+        """
+        Stream an upload into storage under a keyed hash of its content,
+        deduplicating identical images.
+
+        The upload is copied in chunks into a spooled temporary file while
+        it is hashed, so memory stays bounded whatever its size. The
+        blob's reference count is incremented in the current session; the
+        caller commits it together with the row that references the blob.
+
+        Args:
+            fileobj: readable binary stream
+            validate: callable taking the spooled file and returning
+                (extension, error); runs before anything is stored
+
+        Returns:
+            tuple of ((storage key, is_new), error) - is_new is False for a duplicate
+        """
+        # Keyed, so a key cannot be computed (or probed for) from the image alone
+        hasher = hmac.new(current_app.config['UPLOAD_KEY_SECRET'].encode(), digestmod=hashlib.sha256)
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                spool.write(chunk)
+                size += len(chunk)
+            if not size:
+                return None, 'Uploaded file is empty'
+
+            spool.seek(0)
+            ext, error = validate(spool) if validate else ('bin', None)
+            if error:
+                return None, error
+
+            key = content_key(hasher.hexdigest(), ext)
+            # Reference the blob before looking for its file: a concurrent
+            # delete_files() of the same blob either finished first, and the
+            # file is written again, or sees this reference and keeps the file
+            StorageService.acquire(key, size)
+            storage = get_storage()
+            is_new = not storage.exists(key)
+            if is_new:
+                spool.seek(0)
+                storage.save(key, spool)
+
+        return (key, is_new), None
+
+    @staticmethod
+    def acquire(key, size=None):
+        """
+        Add a reference to a stored blob; the caller commits.
+
+        An upsert, so concurrent first uploads of the same image both count
+        instead of racing to insert the row.
+        """
+        dialect = db.session.get_bind().dialect.name
+        if dialect in UPSERT_DIALECTS:
+            statement = UPSERT_DIALECTS[dialect](StoredBlob).values(key=key, ref_count=1, size=size)
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[StoredBlob.key],
+                set_={'ref_count': StoredBlob.ref_count + 1},
+            ))
+            return
+        updated = StoredBlob.query.filter_by(key=key).update(
+            {StoredBlob.ref_count: StoredBlob.ref_count + 1}, synchronize_session=False
+        )
+        if not updated:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(StoredBlob(key=key, ref_count=1, size=size))
+            except IntegrityError:
+                StoredBlob.query.filter_by(key=key).update(
+                    {StoredBlob.ref_count: StoredBlob.ref_count + 1}, synchronize_session=False
+                )
+
+    @staticmethod
+    def release(key, derived_keys=()):
+        """
+        Drop a reference to a blob; the caller commits. Blobs without a
+        reference row (uploads made before content addressing) have a
+        single implicit reference.
+
+        Files are not touched here: when no references remain, the blob's
+        keys are returned for the caller to pass to delete_files() once
+        its commit has succeeded, so a rolled-back release never loses
+        a file that is still referenced.
+
+        Returns:
+            list of storage keys to delete after commit (empty while the
+            blob is still referenced)
+        """
+        StoredBlob.query.filter_by(key=key).update(
+            {StoredBlob.ref_count: StoredBlob.ref_count - 1}, synchronize_session=False
+        )
+        blob = db.session.get(StoredBlob, key, populate_existing=True)
+        if blob is not None and blob.ref_count > 0:
+            return []
+        if blob is not None:
+            db.session.delete(blob)
+        return [key, *derived_keys]
+
+    @staticmethod
+    def delete_files(keys):
+        """
+        Delete the files of a released blob after the release was committed.
+
+        The blob's row is claimed (inserted with no references) while its
+        files are deleted, and the claim is committed away afterwards. An
+        upload of the same image meanwhile waits in acquire() until then and
+        writes the file again; a blob referenced again before the claim is
+        left alone. Anything left behind is collected by collect_garbage().
+        """
+        if not keys:
+            return
+        if not StorageService._claim(keys[0]):
+            db.session.rollback()
+            return
+        storage = get_storage()
+        for k in keys:
+            try:
+                storage.delete(k)
+            except Exception as e:
+                logger.warning(f"Could not delete stored file {k}: {e}")
+        StoredBlob.query.filter_by(key=keys[0], ref_count=0).delete(synchronize_session=False)
+        db.session.commit()
+
+    @staticmethod
+    def _claim(key):
+        """Insert an unreferenced row for key; False if the blob has a row (it is referenced again)."""
+        dialect = db.session.get_bind().dialect.name
+        if dialect in UPSERT_DIALECTS:
+            statement = UPSERT_DIALECTS[dialect](StoredBlob).values(key=key, ref_count=0)
+            return db.session.execute(statement.on_conflict_do_nothing(index_elements=[StoredBlob.key])).rowcount == 1
+        try:
+            with db.session.begin_nested():
+                db.session.add(StoredBlob(key=key, ref_count=0))
+            return True
+        except IntegrityError:
+            return False
+
+    @staticmethod
+    def collect_garbage(dry_run=False, min_age=3600, batch_size=500):
+        """
+        Delete stored files no wardrobe item references.
+
+        Walks the upload folder and removes, in batches: blobs and variants
+        whose item is gone, preprocessing leftovers, and temp files from
+        interrupted writes. Files younger than min_age are skipped so
+        uploads still in flight are never touched. Reference counts are
+        reconciled against the items table at the end.
+
+        Args:
+            dry_run: report what would be deleted without deleting it
+            min_age: seconds a file must have existed to be collected
+            batch_size: files deleted per batch
+
+        Returns:
+            dict report with counts and bytes reclaimed
+        """
+        storage = get_storage()
+        if storage.root is None:
+            raise RuntimeError("Garbage collection needs a storage backend with local files")
+
+        scan_started = datetime.utcnow()
+        cutoff = time.time() - min_age
+        referenced_keys, referenced_stems = StorageService._referenced_keys()
+
+        report = {'scanned': 0, 'orphans': 0, 'derived': 0, 'temp': 0,
+                  'deleted': 0, 'bytes_reclaimed': 0, 'blobs_reconciled': 0, 'dry_run': dry_run}
+        batch = []
+        for key, size, mtime in StorageService._walk(storage.root):
+            report['scanned'] += 1
+            if mtime > cutoff:
+                continue
+            name = key.rsplit('/', 1)[-1]
+            if name.startswith(TEMP_PREFIX):
+                kind = 'temp'
+            elif name.endswith(DERIVED_SUFFIXES):
+                kind = 'derived'
+            elif key in referenced_keys or _blob_stem(key) in referenced_stems:
+                continue
+            else:
+                kind = 'orphans'
+            report[kind] += 1
+            batch.append((key, size, kind))
+            if len(batch) >= batch_size:
+                StorageService._delete_batch(storage, batch, scan_started, dry_run, report)
+                batch = []
+        StorageService._delete_batch(storage, batch, scan_started, dry_run, report)
+
+        report['blobs_reconciled'] = StorageService._reconcile_blobs(scan_started - timedelta(seconds=min_age), dry_run)
+        logger.info(f"Storage GC {'(dry run) ' if dry_run else ''}reclaimed {report['bytes_reclaimed']} bytes "
+                    f"from {report['deleted']} files")
+        return report
+
+    @staticmethod
+    def _referenced_keys(since=None):
+        query = db.session.query(ClothingItem.filename, ClothingItem.image_variants).filter(
+            ClothingItem.filename.isnot(None)
+        )
+        if since is not None:
+            query = query.filter(ClothingItem.created_at >= since)
+        keys, stems = set(), set()
+        for filename, variants in query.yield_per(5000):
+            keys.add(filename)
+            stems.add(_blob_stem(filename))
+            if variants:
+                try:
+                    keys.update(json.loads(variants).values())
+                except (json.JSONDecodeError, AttributeError):
+                    pass
+        return keys, stems
+
+    @staticmethod
+    def _walk(root):
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name == GC_LOCK_NAME:
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                key = os.path.relpath(path, root).replace(os.sep, '/')
+                yield key, stat.st_size, stat.st_mtime
+
+    @staticmethod
+    def _delete_batch(storage, batch, scan_started, dry_run, report):
+        if not batch:
+            return
+        # Items added while the scan ran may have deduplicated onto an old blob
+        recent_keys, recent_stems = StorageService._referenced_keys(since=scan_started)
+        for key, size, kind in batch:
+            if kind == 'orphans' and (key in recent_keys or _blob_stem(key) in recent_stems):
+                continue
+            if dry_run:
+                deleted = True
+            else:
+                try:
+                    os.remove(storage.path(key))
+                    deleted = True
+                except FileNotFoundError:
+                    deleted = False
+                except OSError as e:
+                    logger.warning(f"Could not delete stored file {key}: {e}")
+                    deleted = False
+            if deleted:
+                report['deleted'] += 1
+                report['bytes_reclaimed'] += size
+
+    @staticmethod
+    def _reconcile_blobs(created_before, dry_run):
+        """Match stored_blobs reference counts to the items that use each blob."""
+        counts = Counter(
+            filename for (filename,) in db.session.query(ClothingItem.filename).filter(
+                ClothingItem.filename.isnot(None)
+            ).yield_per(5000)
+        )
+        changed = 0
+        for blob in StoredBlob.query.filter(StoredBlob.created_at < created_before).all():
+            actual = counts.get(blob.key, 0)
+            if blob.ref_count == actual:
+                continue
+            changed += 1
+            if dry_run:
+                continue
+            if actual:
+                blob.ref_count = actual
+            else:
+                db.session.delete(blob)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        return changed
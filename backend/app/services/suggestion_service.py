@@ -0,0 +1,148 @@
+"""Suggestion service - precomputes outfit suggestions off-peak and serves them."""
+
+import logging
+from flask import current_app
+from app.extensions import db
+from app.models.user import User
+from app.models.clothing_item import ClothingItem
+from app.models.outfit import OutfitSuggestion
+from app.agents.styling_recommendation_agent import (
+    StylingRecommendationAgent, OCCASION_STYLE_MAP, get_weather_bucket,
+)
+from app.agents.feedback_agent import FeedbackAgent
+from app.services.wardrobe_service import WardrobeService
+
+logger = logging.getLogger(__name__)
+
+WEATHER_BUCKETS = ('warm', 'cold')
+
+# Representative weather used for explanations when no forecast covers a bucket
+BUCKET_WEATHER = {
+    'warm': {'temperature': 22, 'condition': 'Clear', 'description': 'clear sky'},
+    'cold': {'temperature': 8, 'condition': 'Clouds', 'description': 'overcast clouds'},
+}
+
+
+class SuggestionService:
+
+    @staticmethod
+    def precompute_for_user(user_id, buckets=WEATHER_BUCKETS, forecast=None):
+        """
+        Precompute the top outfits for every occasion and weather bucket.
+
+        Replaces any existing suggestions for the user.
+
+        Args:
+            buckets: iterable of weather buckets to compute
+            forecast: optional weather dict used for its own bucket's explanations
+
+        Returns:
+            int - number of suggestions stored
+        """
+        wardrobe_items = ClothingItem.query.filter_by(user_id=user_id).all()
+        if not wardrobe_items:
+            OutfitSuggestion.query.filter_by(user_id=user_id).delete()
+            db.session.commit()
+            return 0
+
+        # Read before replacing anything: a user's first read may commit their preference rollup
+        user_preferences = FeedbackAgent(current_app.config).get_user_preferences(user_id)
+        OutfitSuggestion.query.filter_by(user_id=user_id).delete()
+        wardrobe_version = WardrobeService.get_wardrobe_version(user_id)
+        sra = StylingRecommendationAgent(current_app.config)
+        limit = current_app.config.get('SUGGESTIONS_PER_SLOT', 3)
+
+        count = 0
+        for bucket in buckets:
+            if forecast and get_weather_bucket(forecast) == bucket:
+                weather_data = forecast
+            else:
+                weather_data = BUCKET_WEATHER[bucket]
+
+            for occasion in OCCASION_STYLE_MAP:
+                recommendations = sra.recommend_outfits(
+                    wardrobe_items, occasion, weather_data, user_preferences, limit=limit
+                )
+                for rank, recommendation in enumerate(recommendations):
+                    top = recommendation.get('top')
+                    bottom = recommendation.get('bottom')
+                    suggestion = OutfitSuggestion(
+                        user_id=user_id,
+                        occasion=occasion,
+                        weather_bucket=bucket,
+                        rank=rank,
+                        top_item_id=top.id if top else None,
+                        bottom_item_id=bottom.id if bottom else None,
+                        explanation=recommendation.get('explanation', ''),
+                        wardrobe_version=wardrobe_version,
+                    )
+                    suggestion.set_extra_item_ids({
+                        slot: item.id for slot, item in recommendation.get('items', {}).items()
+                        if slot not in ('top', 'bottom')
+                    })
+                    db.session.add(suggestion)
+                    count += 1
+
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def precompute_all(buckets=WEATHER_BUCKETS, forecast=None):
+        """
+        Walk all users and precompute their suggestions.
+
+        Returns:
+            tuple of (users processed, suggestions stored)
+        """
+        user_ids = [row[0] for row in db.session.query(User.id).all()]
+        total = 0
+        for user_id in user_ids:
+            try:
+                total += SuggestionService.precompute_for_user(user_id, buckets, forecast)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Suggestion precompute failed for user {user_id}: {e}")
+            # Keep the identity map from growing across the whole user base
+            db.session.expunge_all()
+        return len(user_ids), total
+
+    @staticmethod
+    def take_suggestion(user_id, occasion, weather_bucket, wardrobe_version):
+        """
+        Pop the best remaining suggestion for a slot.
+
+        Suggestions computed against an older wardrobe version are discarded.
+        Each suggestion is served once, so repeated requests walk down the
+        ranking before falling back to live generation. The removal is
+        committed together with the caller's outfit.
+
+        Returns:
+            dict with: top_item_id, bottom_item_id, extra_item_ids, explanation - or None
+        """
+        suggestion = OutfitSuggestion.query.filter_by(
+            user_id=user_id, occasion=occasion, weather_bucket=weather_bucket,
+        ).order_by(OutfitSuggestion.rank).first()
+        if not suggestion:
+            return None
+
+        if suggestion.wardrobe_version != wardrobe_version:
+            OutfitSuggestion.query.filter(
+                OutfitSuggestion.user_id == user_id,
+                OutfitSuggestion.wardrobe_version != wardrobe_version,
+            ).delete()
+            db.session.commit()
+            return None
+
+        result = {
+            'top_item_id': suggestion.top_item_id,
+            'bottom_item_id': suggestion.bottom_item_id,
+            'extra_item_ids': suggestion.get_extra_item_ids(),
+            'explanation': suggestion.explanation,
+        }
+        db.session.delete(suggestion)
+        return result
+
+    @staticmethod
+    def invalidate_user(user_id):
+        """Drop all precomputed suggestions for a user; the caller commits."""
+        OutfitSuggestion.query.filter_by(user_id=user_id).delete()
@@ -1,13 +1,19 @@
 """Wardrobe service - manages clothing items CRUD and delegates to VAA."""
 
-import os
-import uuid
+import json
 import logging
-from werkzeug.utils import secure_filename
 from flask import current_app
 from app.extensions import db
-from app.models.clothing_item import ClothingItem
+from app.models.clothing_item import ClothingItem, WardrobeChange
+from app.models.outfit import OutfitSuggestion
 from app.agents.vision_analysis_agent import VisionAnalysisAgent
+from app.agents.color_harmony import get_pair_cache
+from app.services.image_service import ImageService, compute_descriptor
+from app.services.similarity_service import SimilarityService, encode_descriptor
+from app.services.storage_service import StorageService
+from app.services.job_service import JobService
+from app.storage import get_storage
+from app.metrics import timed
 
 logger = logging.getLogger(__name__)
 
@@ -21,11 +27,20 @@ def allowed_file(filename):
 class WardrobeService:
 
     @staticmethod
-    def get_wardrobe(user_id):
-        """Get all clothing items for a user."""
-        items = ClothingItem.query.filter_by(user_id=user_id).order_by(
-            ClothingItem.created_at.desc()
-        ).all()
+    def get_wardrobe(user_id, color=None, tolerance=0):
+        """
+        Get all clothing items for a user.
+
+        Args:
+            user_id: str
+            color: optional packed 0xRRGGBB colour; only items with a dominant
+                   colour within `tolerance` of it per channel are returned
+            tolerance: int 0-255
+        """
+        query = ClothingItem.query.filter_by(user_id=user_id)
+        if color is not None:
+            query = query.filter(ClothingItem.color_filter(color, tolerance))
+        items = query.order_by(ClothingItem.created_at.desc()).all()
         return [item.to_dict() for item in items]
 
     @staticmethod
@@ -37,21 +52,21 @@ class WardrobeService:
             user_id: str
             file: uploaded file object
             form_data: dict with category, style, weather_suitability
-        """
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        os.makedirs(upload_folder, exist_ok=True)
 
-        # Save uploaded image
+        Returns:
+            tuple of (item dict, error) - error is set when the image is rejected
+        """
+        # Store the uploaded image under its keyed content hash
         filename = None
         image_url = None
-        image_path = None
+        variants = {}
 
         if file and allowed_file(file.filename):
-            ext = file.filename.rsplit('.', 1)[1].lower()
-            unique_name = f"{uuid.uuid4()}.{ext}"
-            filename = secure_filename(unique_name)
-            image_path = os.path.join(upload_folder, filename)
-            file.save(image_path)
+            with timed('wardrobe.save_upload'):
+                stored, error = StorageService.store_upload(file.stream, ImageService.inspect_upload)
+            if error:
+                return None, error
+            filename, is_new = stored
             # Generate full URL for frontend to access
             from flask import request
             scheme = request.scheme
@@ -65,19 +80,21 @@ class WardrobeService:
             'weather_suitability': form_data.get('weather') or form_data.get('weather_suitability'),
         }
 
-        if image_path:
-            try:
-                vaa = VisionAnalysisAgent(current_app.config)
-                analysis = vaa.analyze_image(image_path, user_metadata)
-            except Exception as e:
-                logger.error(f"VAA analysis failed: {e}")
-                analysis = user_metadata
-                analysis['dominant_colors'] = []
-                analysis['detected_by_ai'] = False
+        analyze_later = bool(filename) and current_app.config.get('BACKGROUND_JOBS', False)
+        descriptor = None
+
+        if filename:
+            with get_storage().local_path(filename) as image_path:
+                with timed('wardrobe.image_variants'):
+                    variants = ImageService.generate_variants(filename, image_path, reuse_existing=not is_new)
+                with timed('wardrobe.visual_descriptor'):
+                    descriptor = WardrobeService._compute_descriptor(image_path)
+                if analyze_later:
+                    analysis = WardrobeService._default_analysis(user_metadata)
+                else:
+                    analysis = WardrobeService._run_analysis(image_path, user_metadata)
         else:
-            analysis = user_metadata
-            analysis['dominant_colors'] = []
-            analysis['detected_by_ai'] = False
+            analysis = WardrobeService._default_analysis(user_metadata)
 
         # Ensure required fields
         category = analysis.get('category') or 'shirt'
@@ -96,11 +113,87 @@ class WardrobeService:
             detected_by_ai=analysis.get('detected_by_ai', False),
         )
         item.set_dominant_colors(analysis.get('dominant_colors', []))
+        item.set_image_variants(variants)
+
+        # Flag near-copies of items already in the wardrobe (checked before this one is added)
+        duplicates = SimilarityService.find_duplicates(user_id, descriptor)
+        if descriptor is not None:
+            item.visual_descriptor = encode_descriptor(descriptor)
 
         db.session.add(item)
+        db.session.flush()  # assigns item.id for the change log entry
+        db.session.add(WardrobeChange(user_id=user_id, item_id=item.id, change_type='added'))
+        if analyze_later:
+            # The item is saved with the user's metadata; a worker fills in the rest
+            JobService.enqueue('vaa.analyze', {
+                'item_id': item.id,
+                'user_metadata': user_metadata,
+                'outfit_part': form_data.get('outfit_part'),
+            })
+        with timed('wardrobe.db_commit'):
+            db.session.commit()
+
+        result = item.to_dict()
+        result['possible_duplicates'] = duplicates
+        return result, None
+
+    @staticmethod
+    def analyze_item(item_id, user_metadata, outfit_part=None):
+        """
+        Run VAA on a stored item and update it with the results.
+
+        Used by the background `vaa.analyze` job. The item is logged as
+        changed again so syncing clients pick up the new attributes.
+
+        Returns:
+            tuple of (item dict, error)
+        """
+        item = db.session.get(ClothingItem, item_id)
+        if not item:
+            return None, "Item not found"
+        if not item.filename:
+            return item.to_dict(), None
+
+        with get_storage().local_path(item.filename) as image_path:
+            analysis = WardrobeService._run_analysis(image_path, dict(user_metadata))
+
+        item.category = analysis.get('category') or item.category
+        item.style = analysis.get('style') or item.style
+        item.weather_suitability = analysis.get('weather_suitability') or item.weather_suitability
+        item.outfit_part = analysis.get('outfit_part') or outfit_part or item.outfit_part
+        item.detected_by_ai = analysis.get('detected_by_ai', False)
+        item.set_dominant_colors(analysis.get('dominant_colors', []))
+
+        from app.services.suggestion_service import SuggestionService
+        db.session.add(WardrobeChange(user_id=item.user_id, item_id=item.id, change_type='added'))
+        SuggestionService.invalidate_user(item.user_id)
         db.session.commit()
+        return item.to_dict(), None
+
+    @staticmethod
+    def _run_analysis(image_path, user_metadata):
+        try:
+            vaa = VisionAnalysisAgent(current_app.config)
+            with timed('wardrobe.vaa_analysis'):
+                return vaa.analyze_image(image_path, user_metadata)
+        except Exception as e:
+            logger.error(f"VAA analysis failed: {e}")
+            return WardrobeService._default_analysis(user_metadata)
+
+    @staticmethod
+    def _compute_descriptor(image_path):
+        try:
+            return compute_descriptor(image_path)
+        except Exception as e:
+            logger.error(f"Visual descriptor failed: {e}")
+            return None
 
-        return item.to_dict()
+    @staticmethod
+    def _default_analysis(user_metadata):
+        analysis = dict(user_metadata)
+        analysis['dominant_colors'] = []
+        analysis['detected_by_ai'] = False
+        return analysis
 
     @staticmethod
     def get_item(user_id, item_id):
@@ -110,21 +203,124 @@ class WardrobeService:
 
     @staticmethod
     def delete_item(user_id, item_id):
-        """Delete a clothing item and its image file."""
+        """Delete a clothing item and release its image."""
         item = ClothingItem.query.filter_by(id=item_id, user_id=user_id).first()
         if not item:
             return False, "Item not found"
 
-        # Remove image file
+        # Release the image; identical uploads by other items keep it alive
+        released = []
         if item.filename:
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            image_path = os.path.join(upload_folder, item.filename)
-            if os.path.exists(image_path):
-                try:
-                    os.remove(image_path)
-                except Exception as e:
-                    logger.warning(f"Could not delete image file: {e}")
+            released = StorageService.release(item.filename, item.get_image_variants().values())
 
+        # Precomputed suggestions built on this item can no longer be served
+        OutfitSuggestion.query.filter(
+            db.or_(OutfitSuggestion.top_item_id == item.id,
+                   OutfitSuggestion.bottom_item_id == item.id)
+        ).delete(synchronize_session=False)
+
+        # Leave a tombstone so syncing clients learn about the deletion
+        db.session.add(WardrobeChange(user_id=user_id, item_id=item.id, change_type='deleted'))
         db.session.delete(item)
         db.session.commit()
+        StorageService.delete_files(released)
+
+        # Drop the item's row/column from this process's pair matrix
+        pair_cache = get_pair_cache(current_app.config.get('PAIR_CACHE_MAX_USERS', 128))
+        if pair_cache is not None:
+            pair_cache.remove_item(user_id, item_id)
         return True, None
+
+    @staticmethod
+    def migrate_packed_colors(batch_size=500):
+        """
+        Convert items whose dominant colours are still a JSON array of hex
+        strings to the packed color_1..color_3 columns.
+
+        Rows are read in id order a batch at a time and committed per batch,
+        so the migration can be interrupted and re-run.
+
+        Returns:
+            tuple of (items converted, items whose JSON did not parse)
+        """
+        converted = 0
+        unreadable = 0
+        last_id = ''
+        while True:
+            items = ClothingItem.query.filter(
+                ClothingItem.dominant_colors.isnot(None),
+                ClothingItem.id > last_id,
+            ).order_by(ClothingItem.id).limit(batch_size).all()
+            if not items:
+                break
+            for item in items:
+                try:
+                    colors = json.loads(item.dominant_colors)
+                except (json.JSONDecodeError, TypeError):
+                    colors = []
+                    unreadable += 1
+                item.set_dominant_colors(colors if isinstance(colors, list) else [])
+            last_id = items[-1].id
+            db.session.commit()
+            converted += len(items)
+            db.session.expunge_all()
+        logger.info(f"Packed dominant colours of {converted} items ({unreadable} unreadable)")
+        return converted, unreadable
+
+    @staticmethod
+    def get_wardrobe_version(user_id):
+        """Get the latest change cursor, which changes whenever the wardrobe does."""
+        return db.session.query(db.func.max(WardrobeChange.id)).filter(
+            WardrobeChange.user_id == user_id
+        ).scalar() or 0
+
+    @staticmethod
+    def get_changes(user_id, since=0):
+        """
+        Get wardrobe changes recorded after the given sync cursor.
+
+        A cursor of 0 returns the full wardrobe, which lets a fresh client
+        bootstrap and receive its first cursor in the same call.
+
+        Returns:
+            dict with: added (item dicts), deleted (item ids), cursor
+        """
+        latest = WardrobeService.get_wardrobe_version(user_id)
+
+        if since <= 0:
+            return {
+                'added': WardrobeService.get_wardrobe(user_id),
+                'deleted': [],
+                'cursor': latest,
+            }
+
+        changes = WardrobeChange.query.filter(
+            WardrobeChange.user_id == user_id,
+            WardrobeChange.id > since,
+            WardrobeChange.id <= latest,
+        ).order_by(WardrobeChange.id).all()
+
+        # Replay in order so an item added then deleted since the cursor
+        # is only reported as a deletion
+        added_ids = set()
+        deleted_ids = []
+        for change in changes:
+            if change.change_type == 'added':
+                added_ids.add(change.item_id)
+            else:
+                added_ids.discard(change.item_id)
+                deleted_ids.append(change.item_id)
+
+        added = []
+        if added_ids:
+            items = ClothingItem.query.filter(
+                ClothingItem.user_id == user_id,
+                ClothingItem.id.in_(list(added_ids)),
+            ).order_by(ClothingItem.created_at.desc()).all()
+            added = [item.to_dict() for item in items]
+
+        return {
+            'added': added,
+            'deleted': deleted_ids,
+            'cursor': latest,
+        }
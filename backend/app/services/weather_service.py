@@ -0,0 +1,274 @@
+"""Weather service - cached OpenWeatherMap lookups shared across requests."""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+CITY_MAX_LENGTH = 100
+# Besides letters: separators in names such as "Saint-Étienne", "L'Aquila" or "London,GB"
+CITY_PUNCTUATION = " -'.,"
+
+
+class OpenWeatherClient:
+    """Thin OpenWeatherMap client that reuses one pooled HTTP session."""
+
+    def __init__(self, api_key, base_url, timeout=10, pool_size=10):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, location):
+        """Fetch current weather for a location dict (city or lat/lon)."""
+        params = {'appid': self.api_key, 'units': 'metric'}
+        if location.get('city'):
+            params['q'] = location['city']
+        else:
+            params['lat'] = location['lat']
+            params['lon'] = location['lon']
+
+        response = self.session.get(f"{self.base_url}/weather", params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+
+        return {
+            'temperature': data['main']['temp'],
+            'condition': data['weather'][0]['main'],
+            'description': data['weather'][0]['description'],
+            'city': data['name'],
+            'humidity': data['main']['humidity'],
+            'wind_speed': data['wind']['speed'],
+        }
+
+
+class WeatherCache:
+    """
+    Per-location weather cache with stale-while-revalidate.
+
+    - Fresh entries (younger than ttl) are served directly.
+    - Stale entries (within stale_ttl past expiry) are served immediately
+      while a single background thread refreshes them.
+    - Concurrent misses for the same location wait on one upstream call.
+    - At most max_entries locations are kept, least recently used evicted
+      first; entries past the stale window are dropped when next seen.
+    """
+
+    def __init__(self, fetcher, ttl=600, stale_ttl=3600, wait_timeout=15, max_entries=1000):
+        self._fetcher = fetcher
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.wait_timeout = wait_timeout
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (data, fetched_at), least recently used first
+        self._inflight = {}     # key -> threading.Event for the leading miss
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'evictions': 0,
+            'errors': 0,
+            'upstream_requests': 0,
+            'upstream_latency_ms_total': 0.0,
+            'upstream_latency_ms_max': 0.0,
+        }
+
+    def get(self, key, location):
+        """Return cached weather for key, fetching upstream when needed."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                age = now - entry[1]
+                if age < self.ttl:
+                    self._stats['hits'] += 1
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                if age < self.ttl + self.stale_ttl:
+                    self._stats['stale_hits'] += 1
+                    self._entries.move_to_end(key)
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(
+                            target=self._refresh, args=(key, location), daemon=True
+                        ).start()
+                    return entry[0]
+                # Expired; kept below only as a fallback if the upstream fails
+                del self._entries[key]
+
+            self._stats['misses'] += 1
+            event = self._inflight.get(key)
+            is_leader = event is None
+            if is_leader:
+                event = threading.Event()
+                self._inflight[key] = event
+            else:
+                self._stats['coalesced'] += 1
+
+        if not is_leader:
+            event.wait(self.wait_timeout)
+            with self._lock:
+                entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+        try:
+            data = self._fetch(key, location)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+        if data is None and entry:
+            # Upstream failed: an expired entry beats no data at all
+            return entry[0]
+        return data
+
+    def stats(self):
+        """Return a snapshot of cache and upstream latency counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['entries'] = len(self._entries)
+        requests_made = snapshot['upstream_requests']
+        snapshot['upstream_latency_ms_avg'] = (
+            snapshot['upstream_latency_ms_total'] / requests_made if requests_made else 0.0
+        )
+        return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _refresh(self, key, location):
+        try:
+            with self._lock:
+                self._stats['refreshes'] += 1
+            self._fetch(key, location)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _fetch(self, key, location):
+        start = time.perf_counter()
+        try:
+            data = self._fetcher(location)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Weather API request failed: {e}")
+            data = None
+        except (KeyError, ValueError, IndexError) as e:
+            logger.error(f"Weather API response parsing failed: {e}")
+            data = None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._stats['upstream_requests'] += 1
+            self._stats['upstream_latency_ms_total'] += elapsed_ms
+            self._stats['upstream_latency_ms_max'] = max(
+                self._stats['upstream_latency_ms_max'], elapsed_ms
+            )
+            if data is None:
+                self._stats['errors'] += 1
+            else:
+                self._entries[key] = (data, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        return data
+
+
+class WeatherService:
+
+    @staticmethod
+    def validate_location(city=None, lat=None, lon=None):
+        """
+        Check a client-supplied location before it is looked up (and cached).
+
+        Returns:
+            tuple of (dict with city - whitespace collapsed - lat and lon, error)
+        """
+        if city is not None:
+            city = ' '.join(city.split())
+            if not city or len(city) > CITY_MAX_LENGTH:
+                return None, f'city must be 1 to {CITY_MAX_LENGTH} characters'
+            if not all(ch.isalpha() or ch in CITY_PUNCTUATION for ch in city):
+                return None, 'city may only contain letters, spaces, hyphens, apostrophes, periods and commas'
+        if lat is not None and not -90 <= lat <= 90:
+            return None, 'lat must be between -90 and 90'
+        if lon is not None and not -180 <= lon <= 180:
+            return None, 'lon must be between -180 and 180'
+        return {'city': city, 'lat': lat, 'lon': lon}, None
+
+    @staticmethod
+    def get_current_weather(city=None, lat=None, lon=None):
+        """
+        Get current weather for a city or coordinates, defaulting to the
+        configured city. Falls back to mock data if the API key is not
+        configured or the upstream is unavailable.
+        """
+        config = current_app.config
+        default_city = config.get('OPENWEATHER_CITY', 'Sofia')
+
+        if lat is not None and lon is not None:
+            # ~1 km resolution is plenty for current conditions
+            location = {'lat': round(lat, 2), 'lon': round(lon, 2)}
+            key = f"coord:{location['lat']},{location['lon']}"
+        else:
+            location = {'city': ' '.join((city or default_city).split())}
+            key = f"city:{location['city'].casefold()}"
+
+        if not config.get('OPENWEATHER_API_KEY'):
+            # Return mock weather data for development
+            return _mock_weather(location.get('city', default_city))
+
+        weather = WeatherService.get_cache().get(key, location)
+        return weather or _mock_weather(location.get('city', default_city))
+
+    @staticmethod
+    def get_stats():
+        """Get cache hit/miss and upstream latency counters."""
+        return WeatherService.get_cache().stats()
+
+    @staticmethod
+    def get_cache():
+        """Get the per-app weather cache, creating it on first use."""
+        cache = current_app.extensions.get('weather_cache')
+        if cache is None:
+            config = current_app.config
+            client = OpenWeatherClient(
+                config.get('OPENWEATHER_API_KEY', ''),
+                config.get('OPENWEATHER_BASE_URL', 'https://api.openweathermap.org/data/2.5'),
+                timeout=config.get('OPENWEATHER_TIMEOUT', 10),
+                pool_size=config.get('WEATHER_HTTP_POOL_SIZE', 10),
+            )
+            cache = WeatherCache(
+                client.fetch,
+                ttl=config.get('WEATHER_CACHE_TTL', 600),
+                stale_ttl=config.get('WEATHER_CACHE_STALE_TTL', 3600),
+                max_entries=config.get('WEATHER_CACHE_MAX_ENTRIES', 1000),
+            )
+            cache = current_app.extensions.setdefault('weather_cache', cache)
+        return cache
+
+
+def _mock_weather(city):
+    """Return mock weather data for development/fallback."""
+    return {
+        'temperature': 18,
+        'condition': 'Clear',
+        'description': 'clear sky',
+        'city': city,
+        'humidity': 60,
+        'wind_speed': 5.5,
+    }
@@ -0,0 +1,147 @@
+"""Blob storage backends for uploaded images.
+
+Blobs are addressed by keys such as ``3f/a2/3fa2...e9.jpg`` (see
+``content_key``): an HMAC-SHA256 of the content under UPLOAD_KEY_SECRET, so
+identical images share a key but nobody without the secret can derive the
+key of an image they hold. Keys are sharded by their first two byte pairs so
+no directory grows past a few hundred entries. Keys of uploads made
+before content addressing are bare ``<uuid>.<ext>`` names at the root.
+
+``STORAGE_BACKEND`` selects the implementation:
+
+- ``local`` (default): files under UPLOAD_FOLDER.
+- ``memory``: a process-local dict, for tests and benchmarks.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from flask import current_app
+
+CHUNK_SIZE = 64 * 1024
+
+
+def content_key(digest, ext):
+    """Sharded storage key for a keyed content digest (hex)."""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.{ext}"
+
+
+def derived_key(key, suffix, ext):
+    """Key of a file derived from a blob (e.g. a thumbnail), stored beside it."""
+    return f"{key.rsplit('.', 1)[0]}_{suffix}.{ext}"
+
+
+class LocalFileStorage:
+    """Stores blobs as files under a root directory."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def save(self, key, fileobj):
+        """Write a stream to key atomically (readers never see partial files)."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                shutil.copyfileobj(fileobj, out, CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    @contextmanager
+    def local_path(self, key):
+        """Yield a filesystem path for libraries that need one (Pillow, YOLO)."""
+        yield self.path(key)
+
+
+class MemoryStorage:
+    """Keeps blobs in a dict; nothing touches the filesystem except local_path."""
+
+    root = None
+
+    def __init__(self):
+        self._blobs = {}
+        self._lock = threading.Lock()
+
+    def save(self, key, fileobj):
+        data = fileobj.read()
+        with self._lock:
+            self._blobs[key] = data
+
+    def open(self, key):
+        with self._lock:
+            return io.BytesIO(self._blobs[key])
+
+    def exists(self, key):
+        with self._lock:
+            return key in self._blobs
+
+    def size(self, key):
+        with self._lock:
+            return len(self._blobs[key])
+
+    def delete(self, key):
+        with self._lock:
+            return self._blobs.pop(key, None) is not None
+
+    def keys(self):
+        with self._lock:
+            return list(self._blobs)
+
+    @contextmanager
+    def local_path(self, key):
+        """Materialise the blob in a temporary directory for the duration of the block."""
+        directory = tempfile.mkdtemp(prefix='stylesync-blob-')
+        path = os.path.join(directory, os.path.basename(key))
+        try:
+            with open(path, 'wb') as out:
+                out.write(self.open(key).read())
+            yield path
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def create_storage(config):
+    backend = config.get('STORAGE_BACKEND', 'local')
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend == 'local':
+        return LocalFileStorage(config['UPLOAD_FOLDER'])
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+def get_storage():
+    """Get the current app's storage backend, creating it on first use."""
+    storage = current_app.extensions.get('storage')
+    if storage is None:
+        storage = current_app.extensions.setdefault('storage', create_storage(current_app.config))
+    return storage
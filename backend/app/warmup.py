@@ -0,0 +1,64 @@
+"""Application warm-up and readiness checks.
+
+Production launchers call warm_up() once before serving traffic (in the
+gunicorn master when the app is preloaded), so heavy resources are loaded
+before workers fork. The /health endpoint reports readiness from here.
+"""
+
+import time
+import logging
+from sqlalchemy import text
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up(app):
+    """Load shared models and check dependencies before serving requests."""
+    from app.agents.vision_analysis_agent import warm_up_yolo_model
+
+    state = app.extensions['warmup']
+    state['status'] = 'running'
+    start = time.perf_counter()
+
+    with app.app_context():
+        if app.config.get('PRELOAD_VISION_MODEL', True):
+            loaded = warm_up_yolo_model(app.config.get('YOLO_MODEL_PATH', 'yolov8n.pt'))
+            state['vision_model'] = 'loaded' if loaded else 'unavailable'
+        _check_database()
+
+    state['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    state['status'] = 'complete'
+    logger.info(f"Warm-up complete in {state['duration_ms']} ms (vision model: {state['vision_model']})")
+
+
+def readiness(app):
+    """
+    Report whether this process can serve traffic.
+
+    Returns:
+        tuple of (is_ready, details dict)
+    """
+    state = app.extensions['warmup']
+    database_ok = _check_database()
+    # 'skipped' covers the dev server, which never runs a warm-up
+    is_ready = database_ok and state['status'] in ('skipped', 'complete')
+
+    return is_ready, {
+        'status': 'ok' if is_ready else 'unavailable',
+        'service': 'StyleSync API',
+        'warmup': state['status'],
+        'vision_model': state['vision_model'],
+        'database': 'ok' if database_ok else 'unreachable',
+    }
+
+
+def _check_database():
+    try:
+        db.session.execute(text('SELECT 1'))
+        return True
+    except Exception as e:
+        logger.error(f"Database readiness check failed: {e}")
+        return False
+    finally:
+        db.session.remove()
@@ -0,0 +1,6 @@
+"""Benchmark suite for the StyleSync agents, services and API.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --scale small
+"""
@@ -0,0 +1,243 @@
+"""Synthetic data generators for benchmarks.
+
+All generators are seeded so repeated runs produce the same data.
+"""
+
+import os
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models.user import User
+from app.models.clothing_item import ClothingItem, WardrobeChange
+from app.models.outfit import Outfit, SavedOutfit
+from app.models.feedback import Feedback, TrainingSignal
+
+# Named scales: how many wardrobe items, feedback signals and outfits to generate
+SCALES = {
+    'small': {'items': 10, 'signals': 10, 'outfits': 10},
+    'medium': {'items': 1_000, 'signals': 1_000, 'outfits': 1_000},
+    'large': {'items': 100_000, 'signals': 100_000, 'outfits': 100_000},
+}
+
+TOP_CATEGORIES = ['shirt', 'top', 'blouse', 'hoodie', 'dress']
+BOTTOM_CATEGORIES = ['pants', 'jeans', 'skirt', 'leggings']
+# Share of a multi-slot wardrobe per slot, and the categories generated for it
+SLOT_MIX = [
+    ('top', 0.3, TOP_CATEGORIES),
+    ('bottom', 0.25, BOTTOM_CATEGORIES),
+    ('outerwear', 0.15, ['jacket', 'coat']),
+    ('shoes', 0.15, ['sneakers', 'boots', 'heels']),
+    ('accessory', 0.15, ['bag', 'scarf', 'belt']),
+]
+STYLES = ['casual', 'formal', 'sporty']
+WEATHERS = ['warm', 'cold']
+OCCASIONS = ['gym', 'friends', 'formal', 'casual', 'work']
+
+# Palette reused across items so colour matches actually occur
+PALETTE = ['#{:02x}{:02x}{:02x}'.format(r, g, b)
+           for r in (0x11, 0x55, 0x99, 0xdd)
+           for g in (0x11, 0x66, 0xbb)
+           for b in (0x22, 0x88, 0xee)]
+
+BATCH_SIZE = 5_000
+
+
+def make_rng(seed=42):
+    return random.Random(seed)
+
+
+def make_items(rng, count, user_id=None):
+    """Build transient ClothingItem objects, alternating tops and bottoms."""
+    base_time = datetime(2024, 1, 1)
+    items = []
+    for i in range(count):
+        is_top = i % 2 == 0
+        item = ClothingItem(
+            id=str(uuid.UUID(int=rng.getrandbits(128))),
+            user_id=user_id,
+            filename=None,
+            image_url=None,
+            category=rng.choice(TOP_CATEGORIES if is_top else BOTTOM_CATEGORIES),
+            style=rng.choice(STYLES),
+            weather_suitability=rng.choice(WEATHERS),
+            outfit_part='top' if is_top else 'bottom',
+            detected_by_ai=False,
+            created_at=base_time + timedelta(minutes=i),
+        )
+        item.set_dominant_colors(rng.sample(PALETTE, 3))
+        items.append(item)
+    return items
+
+
+def make_outfit_items(rng, count, user_id=None):
+    """Build transient ClothingItem objects spread over all outfit slots (see SLOT_MIX)."""
+    base_time = datetime(2024, 1, 1)
+    slots = [slot for slot, share, _ in SLOT_MIX for _ in range(round(share * 20))]
+    categories = {slot: names for slot, _, names in SLOT_MIX}
+    items = []
+    for i in range(count):
+        slot = slots[i % len(slots)]
+        item = ClothingItem(
+            id=str(uuid.UUID(int=rng.getrandbits(128))),
+            user_id=user_id,
+            filename=None,
+            image_url=None,
+            category=rng.choice(categories[slot]),
+            style=rng.choice(STYLES),
+            weather_suitability=rng.choice(WEATHERS),
+            outfit_part=slot,
+            detected_by_ai=False,
+            created_at=base_time + timedelta(minutes=i),
+        )
+        item.set_dominant_colors(rng.sample(PALETTE, 3))
+        items.append(item)
+    return items
+
+
+def make_signal(rng, user_id, outfit_id=None):
+    """Build one training signal dict in the Feedback Agent's file format."""
+    top_style, bottom_style = rng.choice(STYLES), rng.choice(STYLES)
+    reaction = rng.choice(['liked', 'liked', 'disliked'])
+    return {
+        'user_id': user_id,
+        'outfit_id': outfit_id or str(uuid.UUID(int=rng.getrandbits(128))),
+        'reaction': reaction,
+        'timestamp': datetime(2024, 1, 1).isoformat(),
+        'occasion': rng.choice(OCCASIONS),
+        'color_combination': {
+            'top_colors': rng.sample(PALETTE, 3),
+            'bottom_colors': rng.sample(PALETTE, 3),
+        },
+        'style_combination': {'top_style': top_style, 'bottom_style': bottom_style},
+        'categories': {
+            'top_category': rng.choice(TOP_CATEGORIES),
+            'bottom_category': rng.choice(BOTTOM_CATEGORIES),
+        },
+        'reward': 1 if reaction == 'liked' else -1,
+    }
+
+
+def make_preferences(rng, count, user_id='bench-user'):
+    """Build the preference payload the SRA receives from the Feedback Agent."""
+    liked, disliked = [], []
+    for _ in range(count):
+        signal = make_signal(rng, user_id)
+        combo = {
+            'top_style': signal['style_combination']['top_style'],
+            'bottom_style': signal['style_combination']['bottom_style'],
+            'top_colors': signal['color_combination']['top_colors'],
+            'bottom_colors': signal['color_combination']['bottom_colors'],
+            'occasion': signal['occasion'],
+        }
+        (liked if signal['reaction'] == 'liked' else disliked).append(combo)
+    return {'liked_combinations': liked, 'disliked_combinations': disliked}
+
+
+def make_training_examples(rng, count, users=5):
+    """Build preference model training examples from synthetic signals."""
+    examples = []
+    for i in range(count):
+        signal = make_signal(rng, f"bench-user-{i % users}")
+        examples.append({
+            'user_id': signal['user_id'],
+            'occasion': signal['occasion'],
+            'liked': signal['reaction'] == 'liked',
+            'top': (signal['style_combination']['top_style'], signal['categories']['top_category'],
+                    signal['color_combination']['top_colors']),
+            'bottom': (signal['style_combination']['bottom_style'], signal['categories']['bottom_category'],
+                       signal['color_combination']['bottom_colors']),
+        })
+    return examples
+
+
+def make_images(rng, directory, count, size=(640, 640)):
+    """Write synthetic garment-like JPEGs (a few colour blocks on a background)."""
+    from PIL import Image, ImageDraw
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        background = tuple(rng.randrange(256) for _ in range(3))
+        img = Image.new('RGB', size, background)
+        draw = ImageDraw.Draw(img)
+        for _ in range(4):
+            x0, y0 = rng.randrange(size[0] // 2), rng.randrange(size[1] // 2)
+            x1, y1 = x0 + rng.randrange(50, size[0] // 2), y0 + rng.randrange(50, size[1] // 2)
+            draw.rectangle([x0, y0, x1, y1], fill=tuple(rng.randrange(256) for _ in range(3)))
+        path = os.path.join(directory, f"bench_{i}.jpg")
+        img.save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return paths
+
+
+def seed_user(rng, username, password_hash='x'):
+    """Insert a user row and return its id."""
+    user = User(username=username, password_hash=password_hash)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def seed_wardrobe(rng, user_id, count):
+    """Insert count wardrobe items (and their change log entries) in batches."""
+    ids = []
+    for start in range(0, count, BATCH_SIZE):
+        items = make_items(rng, min(BATCH_SIZE, count - start), user_id)
+        db.session.add_all(items)
+        db.session.add_all(
+            WardrobeChange(user_id=user_id, item_id=item.id, change_type='added') for item in items
+        )
+        db.session.commit()
+        ids.extend(item.id for item in items)
+        db.session.expunge_all()
+    return ids
+
+
+def seed_outfits(rng, user_id, item_ids, count, saved=True):
+    """Insert count outfits built from item_ids, optionally saving each one."""
+    tops, bottoms = item_ids[0::2], item_ids[1::2] or item_ids
+    outfit_ids = []
+    for start in range(0, count, BATCH_SIZE):
+        batch = []
+        for _ in range(min(BATCH_SIZE, count - start)):
+            batch.append(Outfit(
+                id=str(uuid.UUID(int=rng.getrandbits(128))),
+                user_id=user_id,
+                top_item_id=rng.choice(tops),
+                bottom_item_id=rng.choice(bottoms),
+                occasion=rng.choice(OCCASIONS),
+                weather_data=json.dumps({'temperature': rng.randrange(-5, 35), 'condition': 'Clear'}),
+                explanation='Synthetic benchmark outfit.',
+            ))
+        db.session.add_all(batch)
+        if saved:
+            db.session.add_all(SavedOutfit(user_id=user_id, outfit_id=o.id) for o in batch)
+        db.session.commit()
+        outfit_ids.extend(o.id for o in batch)
+        db.session.expunge_all()
+    return outfit_ids
+
+
+def seed_feedback(rng, user_id, outfit_ids, count, created_at=None):
+    """Insert count Feedback and TrainingSignal rows for the given outfits, created at created_at (default: now)."""
+    for start in range(0, count, BATCH_SIZE):
+        rows = []
+        for _ in range(min(BATCH_SIZE, count - start)):
+            outfit_id = rng.choice(outfit_ids)
+            signal = make_signal(rng, user_id, outfit_id)
+            rows.append(Feedback(user_id=user_id, outfit_id=outfit_id, reaction=signal['reaction']))
+            rows.append(TrainingSignal(
+                user_id=user_id,
+                outfit_id=outfit_id,
+                reaction=signal['reaction'],
+                color_combination=json.dumps(signal['color_combination']),
+                style_combination='+'.join(signal['style_combination'].values()),
+                occasion=signal['occasion'],
+                created_at=created_at,
+            ))
+        db.session.add_all(rows)
+        db.session.commit()
+        db.session.expunge_all()
@@ -0,0 +1,129 @@
+"""Benchmark runner with stored baselines and a regression threshold.
+
+    python -m benchmarks.run --scale small                  # compare against baseline
+    python -m benchmarks.run --scale medium --save-baseline # record a new baseline
+    python -m benchmarks.run --scale small --only sra       # run matching benchmarks
+
+Exits with status 1 when any benchmark's median is slower than its baseline
+by more than --threshold (a fraction, default 0.25).
+
+The LLM is not mocked: by default OLLAMA_BASE_URL points at a closed local
+port so explanation calls fail fast and fall back to the rule-based text.
+Point --ollama-url at a real or stand-in server to include LLM latency.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run StyleSync benchmarks.')
+    parser.add_argument('--scale', choices=['small', 'medium', 'large'], default='small')
+    parser.add_argument('--only', default=None, help='Only run benchmarks whose name contains this.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark.')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown vs. baseline before failing (0.25 = 25%%).')
+    parser.add_argument('--save-baseline', action='store_true', help='Store results as the new baseline.')
+    parser.add_argument('--ollama-url', default='http://127.0.0.1:9')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def configure_environment(workdir, ollama_url):
+    """Point the app at throwaway storage; must run before importing the app."""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    os.environ['FEEDBACK_DATA_DIR'] = os.path.join(workdir, 'feedback_data')
+    os.environ['PREFERENCE_MODEL_DIR'] = os.path.join(workdir, 'preference_models')
+    os.environ['OLLAMA_BASE_URL'] = ollama_url
+    os.environ['OPENWEATHER_API_KEY'] = ''
+    os.environ['PROFILE_TOKEN'] = ''
+
+
+def time_callable(fn, repeat):
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {'median': statistics.median(samples), 'min': min(samples), 'runs': repeat}
+
+
+def load_baseline(scale):
+    path = os.path.join(BASELINE_DIR, f'{scale}.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(scale, results, existing):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    merged = dict(existing)
+    merged.update({name: {'median': r['median']} for name, r in results.items()})
+    path = os.path.join(BASELINE_DIR, f'{scale}.json')
+    with open(path, 'w') as f:
+        json.dump(merged, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return path
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix='stylesync-bench-')
+    configure_environment(workdir, args.ollama_url)
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    from app import create_app
+    from benchmarks.suite import BENCHMARKS, BenchContext
+
+    app = create_app('production')
+    ctx = BenchContext(app, args.scale, workdir, seed=args.seed)
+    baseline = load_baseline(args.scale)
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<28} {'median ms':>11} {'min ms':>9} {'baseline':>10} {'change':>8}")
+    for name, setup in BENCHMARKS.items():
+        if args.only and args.only not in name:
+            continue
+        fn = setup(ctx)
+        result = time_callable(fn, args.repeat)
+        results[name] = result
+
+        base = baseline.get(name, {}).get('median')
+        if base:
+            change = result['median'] / base - 1
+            change_str = f"{change:+.0%}"
+            if change > args.threshold:
+                regressions.append(name)
+                change_str += ' !'
+            base_str = f"{base * 1000:.2f}"
+        else:
+            base_str, change_str = '-', '-'
+        print(f"{name:<28} {result['median'] * 1000:>11.2f} {result['min'] * 1000:>9.2f} "
+              f"{base_str:>10} {change_str:>8}")
+
+    if args.save_baseline:
+        path = save_baseline(args.scale, results, baseline)
+        print(f"Baseline saved to {path}")
+        return 0
+
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Benchmark definitions.
+
+Each benchmark is a setup function registered with ``@benchmark``. Setup runs
+untimed, receives the shared BenchContext and returns the zero-argument
+callable that the runner times.
+"""
+
+import os
+import uuid
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.agents.vision_analysis_agent import VisionAnalysisAgent
+from app.agents.styling_recommendation_agent import StylingRecommendationAgent
+from app.agents.feedback_agent import FeedbackAgent
+from app.agents import preference_model, color_harmony
+from app.agents.outfit_search import SLOTS
+from benchmarks import generators
+
+BENCHMARKS = {}
+
+# Exhaustive pair search is quadratic in wardrobe size, so the scoring
+# benchmarks cap the dimension that is not under test
+SRA_FIXED_ITEMS = 10
+SRA_FIXED_SIGNALS = 10
+SRA_MAX_ITEMS = 400
+OUTFIT_MAX_ITEMS = 2_000
+GENERATE_MAX_ITEMS = 50
+GENERATE_MAX_SIGNALS = 50
+WARM_WEATHER = {'temperature': 20}
+
+
+def benchmark(name):
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+class BenchContext:
+    """Shared state for one benchmark run: the app, scale and seeded users."""
+
+    def __init__(self, app, scale_name, workdir, seed=42):
+        self.app = app
+        self.scale_name = scale_name
+        self.scale = generators.SCALES[scale_name]
+        self.workdir = workdir
+        self.rng = generators.make_rng(seed)
+        self.client = app.test_client()
+        self._users = {}
+
+    def auth_headers(self, user_id):
+        with self.app.app_context():
+            token = create_access_token(identity=user_id)
+        return {'Authorization': f"Bearer {token}"}
+
+    def api_user(self):
+        """User with a wardrobe, saved outfits and feedback at the full scale."""
+        if 'api' not in self._users:
+            with self.app.app_context():
+                user_id = generators.seed_user(self.rng, 'bench-api')
+                item_ids = generators.seed_wardrobe(self.rng, user_id, self.scale['items'])
+                outfit_ids = generators.seed_outfits(self.rng, user_id, item_ids, self.scale['outfits'])
+                generators.seed_feedback(self.rng, user_id, outfit_ids, self.scale['signals'])
+            self._users['api'] = user_id
+        return self._users['api']
+
+
+def pair_slots(items):
+    """Alternate items into tops and bottoms with the optional slots empty."""
+    slots = {slot: [] for slot in SLOTS}
+    slots['top'], slots['bottom'] = items[0::2], items[1::2]
+    return slots
+
+
+@benchmark('vaa.extract_colors')
+def bench_vaa_extract_colors(ctx):
+    """ColorThief extraction over five 640x640 images (scale-independent)."""
+    paths = generators.make_images(ctx.rng, os.path.join(ctx.workdir, 'images'), 5)
+    vaa = VisionAnalysisAgent(ctx.app.config)
+    return lambda: [vaa._extract_colors(path) for path in paths]
+
+
+@benchmark('sra.score_preferences')
+def bench_sra_score_preferences(ctx):
+    """Top/bottom ranking on a small wardrobe against `signals` liked combinations."""
+    items = generators.make_items(ctx.rng, SRA_FIXED_ITEMS, user_id='bench-user')
+    preferences = generators.make_preferences(ctx.rng, ctx.scale['signals'])
+    sra = StylingRecommendationAgent(ctx.app.config)
+    slots = pair_slots(items)
+    return lambda: sra._rank_outfits(slots, 'casual', WARM_WEATHER, preferences, 1)
+
+
+@benchmark('sra.pair_search')
+def bench_sra_pair_search(ctx):
+    """Top/bottom ranking over `items` wardrobe items (capped) with few signals."""
+    items = generators.make_items(ctx.rng, min(ctx.scale['items'], SRA_MAX_ITEMS), user_id='bench-user')
+    preferences = generators.make_preferences(ctx.rng, SRA_FIXED_SIGNALS)
+    sra = StylingRecommendationAgent(ctx.app.config)
+    slots = pair_slots(items)
+    return lambda: sra._rank_outfits(slots, 'casual', WARM_WEATHER, preferences, 1)
+
+
+@benchmark('sra.pair_matrix_build')
+def bench_sra_pair_matrix_build(ctx):
+    """Colour harmony matrix for `items` wardrobe items (capped) built from scratch."""
+    items = generators.make_items(ctx.rng, min(ctx.scale['items'], SRA_MAX_ITEMS))
+    tops, bottoms = items[0::2], items[1::2]
+    return lambda: color_harmony.PairMatrix().lookup(tops, bottoms)
+
+
+@benchmark('sra.outfit_search')
+def bench_sra_outfit_search(ctx):
+    """Five-slot outfit search over `items` wardrobe items (capped) in cold weather."""
+    items = generators.make_outfit_items(ctx.rng, min(ctx.scale['items'], OUTFIT_MAX_ITEMS), user_id='bench-user')
+    preferences = generators.make_preferences(ctx.rng, SRA_FIXED_SIGNALS)
+    sra = StylingRecommendationAgent(ctx.app.config)
+    weather = {'temperature': 5}
+    slots = sra._slot_candidates(items, 'casual', weather)
+    return lambda: sra._search_outfits(slots, 'casual', weather, preferences, limit=3)
+
+
+@benchmark('sra.model_pair_search')
+def bench_sra_model_pair_search(ctx):
+    """Top/bottom ranking over `items` wardrobe items (capped) with a trained preference model."""
+    items = generators.make_items(ctx.rng, min(ctx.scale['items'], SRA_MAX_ITEMS))
+    model_dir = os.path.join(ctx.workdir, 'bench_preference_model')
+    examples = generators.make_training_examples(ctx.rng, 500)
+    preference_model.train(examples, workers=1, epochs=2).save(model_dir)
+    sra = StylingRecommendationAgent(dict(ctx.app.config, PREFERENCE_MODEL_DIR=model_dir))
+    slots = pair_slots(items)
+    preferences = {'user_id': 'bench-user-0'}
+    return lambda: sra._rank_outfits(slots, 'casual', WARM_WEATHER, preferences, 1)
+
+
+@benchmark('fa.get_user_preferences')
+def bench_fa_get_user_preferences(ctx):
+    """Preference aggregation over `signals` rolled-up training signals plus 10% not yet rolled up."""
+    fa = FeedbackAgent(ctx.app.config)
+    with ctx.app.app_context():
+        user_id = generators.seed_user(ctx.rng, 'bench-fa')
+        outfit_ids = [str(uuid.UUID(int=ctx.rng.getrandbits(128))) for _ in range(50)]
+        generators.seed_feedback(ctx.rng, user_id, outfit_ids, ctx.scale['signals'],
+                                 created_at=datetime.utcnow() - timedelta(days=1))
+        fa.rollup_user(user_id)
+        db.session.commit()
+        generators.seed_feedback(ctx.rng, user_id, outfit_ids, max(ctx.scale['signals'] // 10, 1))
+
+    def run():
+        with ctx.app.app_context():
+            return fa.get_user_preferences(user_id)
+    return run
+
+
+@benchmark('api.get_wardrobe')
+def bench_api_get_wardrobe(ctx):
+    """GET the full wardrobe of `items` items."""
+    user_id = ctx.api_user()
+    headers = ctx.auth_headers(user_id)
+    return lambda: ctx.client.get(f'/api/users/{user_id}/wardrobe', headers=headers)
+
+
+@benchmark('api.get_saved_outfits')
+def bench_api_get_saved_outfits(ctx):
+    """GET the saved-outfits listing of `outfits` outfits."""
+    user_id = ctx.api_user()
+    headers = ctx.auth_headers(user_id)
+    return lambda: ctx.client.get(f'/api/users/{user_id}/outfits/saved', headers=headers)
+
+
+@benchmark('api.wardrobe_changes')
+def bench_api_wardrobe_changes(ctx):
+    """GET the delta of the last 10 wardrobe changes."""
+    user_id = ctx.api_user()
+    headers = ctx.auth_headers(user_id)
+    since = max(ctx.scale['items'] - 10, 1)
+    return lambda: ctx.client.get(f'/api/users/{user_id}/wardrobe/changes?since={since}', headers=headers)
+
+
+@benchmark('api.generate_outfit')
+def bench_api_generate_outfit(ctx):
+    """POST generate with a capped wardrobe and feedback history (LLM call included)."""
+    with ctx.app.app_context():
+        user_id = generators.seed_user(ctx.rng, 'bench-generate')
+        item_ids = generators.seed_wardrobe(ctx.rng, user_id, min(ctx.scale['items'], GENERATE_MAX_ITEMS))
+        outfit_ids = generators.seed_outfits(ctx.rng, user_id, item_ids, 10, saved=False)
+        generators.seed_feedback(ctx.rng, user_id, outfit_ids, min(ctx.scale['signals'], GENERATE_MAX_SIGNALS),
+                                 created_at=datetime.utcnow() - timedelta(days=1))
+    headers = ctx.auth_headers(user_id)
+    body = {'occasion': 'casual', 'weather': {'temperature': 20, 'condition': 'Clear'}}
+    return lambda: ctx.client.post(f'/api/users/{user_id}/outfit/generate', json=body, headers=headers)
@@ -0,0 +1,61 @@
+"""Gunicorn configuration for running StyleSync in production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+All settings can be overridden with the environment variables below.
+"""
+
+import gc
+import os
+import multiprocessing
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Each worker holds its own torch runtime state, so keep the default modest;
+# threads cover the I/O-bound time spent waiting on Ollama and the weather API.
+workers = int(os.environ.get('GUNICORN_WORKERS', min(multiprocessing.cpu_count(), 4)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+# LLM calls can take up to a minute
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Load the app and the vision model once in the master before forking
+preload_app = True
+
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', '-')
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the GC's reach, so collections in
+    # the workers don't touch (and copy) the preloaded pages.
+    gc.freeze()
+    server.log.info(f"StyleSync ready: {workers} workers x {threads} threads")
+
+
+def post_fork(server, worker):
+    import sys
+    from wsgi import app
+    from app.extensions import db
+
+    # Connections opened in the master must not be shared across processes
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+    # Stop every worker's torch from claiming all cores
+    torch_threads = os.environ.get('TORCH_NUM_THREADS')
+    if torch_threads and 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(int(torch_threads))
+
+    # Opt-in maintenance (storage GC); a file lock keeps it to one worker per pass
+    from app.maintenance import start_periodic_tasks
+    start_periodic_tasks(app)
+
+    server.log.info(f"Worker {worker.pid} forked")
@@ -0,0 +1 @@
+"""Load-testing tools: a fake Ollama/OpenWeatherMap server and a load generator."""
@@ -0,0 +1,253 @@
+"""Local stand-in for Ollama and OpenWeatherMap.
+
+Implements just enough of both APIs for the app to run against it:
+
+- ``POST /api/generate`` (Ollama): streaming and non-streaming, honouring
+  ``"format": "json"`` with a style/weather classification payload.
+- ``GET /data/2.5/weather`` (OpenWeatherMap current weather).
+
+Latency, error rate and throughput are configurable so LLM queueing and tail
+latency show up in load tests. Point the app at it with:
+
+    OLLAMA_BASE_URL=http://127.0.0.1:11500
+    OPENWEATHER_BASE_URL=http://127.0.0.1:11500/data/2.5
+    OPENWEATHER_API_KEY=fake
+
+Run from the backend directory:
+
+    python -m loadtest.fake_upstream --port 11500 --llm-latency lognormal:800,0.5 --llm-concurrency 1
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+CANNED_EXPLANATION = (
+    "This outfit pairs complementary tones for a balanced look that suits the occasion. "
+    "The fabrics work with today's weather, keeping you comfortable without sacrificing style."
+)
+STYLES = ['casual', 'formal', 'sporty']
+CONDITIONS = [('Clear', 'clear sky'), ('Clouds', 'broken clouds'), ('Rain', 'light rain')]
+
+
+class LatencyModel:
+    """
+    Samples latencies in seconds from a spec string:
+
+    - ``fixed:MS``
+    - ``uniform:MIN_MS,MAX_MS``
+    - ``lognormal:MEDIAN_MS,SIGMA``
+    """
+
+    def __init__(self, spec):
+        kind, _, params = spec.partition(':')
+        values = [float(v) for v in params.split(',')] if params else []
+        if kind == 'fixed' and len(values) == 1:
+            self._sample = lambda: values[0]
+        elif kind == 'uniform' and len(values) == 2:
+            self._sample = lambda: random.uniform(values[0], values[1])
+        elif kind == 'lognormal' and len(values) == 2:
+            import math
+            mu = math.log(values[0])
+            self._sample = lambda: random.lognormvariate(mu, values[1])
+        else:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+        self.spec = spec
+
+    def sample(self):
+        return max(self._sample(), 0.0) / 1000
+
+
+class UpstreamBehaviour:
+    """Latency, error and throughput settings for one simulated upstream."""
+
+    def __init__(self, latency, error_rate=0.0, concurrency=0, max_rps=0.0):
+        self.latency = LatencyModel(latency)
+        self.error_rate = error_rate
+        # Ollama serves a fixed number of requests at a time; the rest queue
+        self._slots = threading.BoundedSemaphore(concurrency) if concurrency > 0 else None
+        self._min_gap = 1.0 / max_rps if max_rps > 0 else 0.0
+        self._next_start = 0.0
+        self._rate_lock = threading.Lock()
+
+    def acquire(self):
+        if self._slots:
+            self._slots.acquire()
+        if self._min_gap:
+            with self._rate_lock:
+                now = time.monotonic()
+                start = max(now, self._next_start)
+                self._next_start = start + self._min_gap
+            if start > now:
+                time.sleep(start - now)
+
+    def release(self):
+        if self._slots:
+            self._slots.release()
+
+    def should_fail(self):
+        return random.random() < self.error_rate
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeUpstream/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/api/generate':
+            return self._send_json(404, {'error': 'not found'})
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError:
+            return self._send_json(400, {'error': 'invalid JSON body'})
+
+        behaviour = self.server.llm
+        behaviour.acquire()
+        try:
+            if behaviour.should_fail():
+                time.sleep(behaviour.latency.sample() / 4)
+                return self._send_json(500, {'error': 'simulated model failure'})
+
+            text = self._completion_text(body)
+            if body.get('stream', True):
+                self._stream_completion(body, text, behaviour.latency.sample())
+            else:
+                time.sleep(behaviour.latency.sample())
+                self._send_json(200, self._generate_chunk(body, text, done=True))
+        finally:
+            behaviour.release()
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path != '/data/2.5/weather':
+            return self._send_json(404, {'message': 'not found'})
+
+        behaviour = self.server.weather
+        behaviour.acquire()
+        try:
+            time.sleep(behaviour.latency.sample())
+            if behaviour.should_fail():
+                return self._send_json(503, {'message': 'simulated upstream failure'})
+
+            query = parse_qs(parsed.query)
+            city = query.get('q', ['Sofia'])[0]
+            condition, description = random.choice(CONDITIONS)
+            self._send_json(200, {
+                'name': city,
+                'main': {'temp': round(random.uniform(-5, 32), 1), 'humidity': random.randint(30, 90)},
+                'weather': [{'main': condition, 'description': description}],
+                'wind': {'speed': round(random.uniform(0, 12), 1)},
+            })
+        finally:
+            behaviour.release()
+
+    def _completion_text(self, body):
+        if body.get('format') == 'json':
+            return json.dumps({
+                'style': random.choice(STYLES),
+                'weather_suitability': random.choice(['warm', 'cold']),
+            })
+        return CANNED_EXPLANATION
+
+    def _generate_chunk(self, body, text, done):
+        chunk = {
+            'model': body.get('model', 'fake'),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'response': text,
+            'done': done,
+        }
+        if done:
+            chunk['done_reason'] = 'stop'
+        return chunk
+
+    def _stream_completion(self, body, text, total_latency):
+        """Emit newline-delimited JSON chunks spread over the sampled latency."""
+        tokens = text.split(' ')
+        delay = total_latency / (len(tokens) + 1)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        time.sleep(delay)  # time to first token
+        for i, token in enumerate(tokens):
+            piece = token if i == 0 else ' ' + token
+            self._write_chunk(json.dumps(self._generate_chunk(body, piece, done=False)) + '\n')
+            time.sleep(delay)
+        self._write_chunk(json.dumps(self._generate_chunk(body, '', done=True)) + '\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, data):
+        payload = data.encode('utf-8')
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(host='127.0.0.1', port=11500, llm=None, weather=None, verbose=False):
+    """Build (but do not start) a fake upstream server."""
+    server = ThreadingHTTPServer((host, port), FakeUpstreamHandler)
+    server.daemon_threads = True
+    server.llm = llm or UpstreamBehaviour('fixed:0')
+    server.weather = weather or UpstreamBehaviour('fixed:0')
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fake Ollama + OpenWeatherMap server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11500)
+    parser.add_argument('--llm-latency', default='lognormal:800,0.5',
+                        help='fixed:MS | uniform:MIN,MAX | lognormal:MEDIAN,SIGMA')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-concurrency', type=int, default=1,
+                        help='Requests served at once (0 = unlimited); Ollama defaults to 1.')
+    parser.add_argument('--llm-max-rps', type=float, default=0.0, help='Throughput cap (0 = none).')
+    parser.add_argument('--weather-latency', default='uniform:50,150')
+    parser.add_argument('--weather-error-rate', type=float, default=0.0)
+    parser.add_argument('--weather-max-rps', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    server = make_server(
+        args.host, args.port,
+        llm=UpstreamBehaviour(args.llm_latency, args.llm_error_rate,
+                              args.llm_concurrency, args.llm_max_rps),
+        weather=UpstreamBehaviour(args.weather_latency, args.weather_error_rate,
+                                  0, args.weather_max_rps),
+        verbose=args.verbose,
+    )
+    print(f"Fake upstream listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""Load generator driving the main user flows against a running StyleSync API.
+
+Each virtual user signs up, uploads a few synthetic garment images, then
+repeatedly generates an outfit and sends feedback on it until the run ends.
+Per-step throughput and latency percentiles are printed at the end.
+
+Run from the backend directory (with the app and, ideally, the fake upstream
+server running):
+
+    python -m loadtest.load --base-url http://127.0.0.1:8000 --users 20 --duration 60
+"""
+
+import io
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from collections import defaultdict
+
+import requests
+
+OCCASIONS = ['gym', 'friends', 'formal', 'casual', 'work']
+ITEM_SPECS = [
+    ('shirt', 'casual', 'top'), ('blouse', 'formal', 'top'), ('hoodie', 'sporty', 'top'),
+    ('jeans', 'casual', 'bottom'), ('pants', 'formal', 'bottom'), ('leggings', 'sporty', 'bottom'),
+]
+
+
+class Recorder:
+    """Thread-safe per-step latency and error recorder."""
+
+    def __init__(self):
+        self._latencies = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, step, seconds, ok):
+        with self._lock:
+            self._latencies[step].append(seconds)
+            if not ok:
+                self._errors[step] += 1
+
+    def summary(self, elapsed):
+        rows = {}
+        with self._lock:
+            for step, samples in self._latencies.items():
+                ordered = sorted(samples)
+                rows[step] = {
+                    'count': len(ordered),
+                    'errors': self._errors[step],
+                    'rps': len(ordered) / elapsed if elapsed else 0.0,
+                    'p50_ms': _percentile(ordered, 50) * 1000,
+                    'p95_ms': _percentile(ordered, 95) * 1000,
+                    'p99_ms': _percentile(ordered, 99) * 1000,
+                    'max_ms': ordered[-1] * 1000,
+                }
+        return rows
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _make_image(rng):
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGB', (480, 640), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([80, 80, 400, 560], fill=tuple(rng.randrange(256) for _ in range(3)))
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=85)
+    return buf.getvalue()
+
+
+class VirtualUser:
+
+    def __init__(self, base_url, recorder, rng, items, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.rng = rng
+        self.items = items
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.user_id = None
+
+    def _call(self, step, method, path, **kwargs):
+        start = time.perf_counter()
+        ok = False
+        response = None
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            pass
+        self.recorder.record(step, time.perf_counter() - start, ok)
+        return response if ok else None
+
+    def setup(self):
+        username = f"load-{uuid.uuid4().hex[:12]}"
+        response = self._call('signup', 'POST', '/api/signup',
+                              json={'username': username, 'password': 'loadtest-pw'})
+        if response is None:
+            return False
+        data = response.json()
+        self.user_id = data['userId']
+        self.session.headers['Authorization'] = f"Bearer {data['token']}"
+
+        for i in range(self.items):
+            category, style, part = ITEM_SPECS[i % len(ITEM_SPECS)]
+            self._call(
+                'upload', 'POST', f'/api/users/{self.user_id}/wardrobe',
+                data={'category': category, 'style': style, 'outfit_part': part,
+                      'weather': self.rng.choice(['warm', 'cold'])},
+                files={'image': (f'item{i}.jpg', _make_image(self.rng), 'image/jpeg')},
+            )
+        return True
+
+    def iterate(self):
+        response = self._call(
+            'generate', 'POST', f'/api/users/{self.user_id}/outfit/generate',
+            json={'occasion': self.rng.choice(OCCASIONS)},
+        )
+        if response is None:
+            return
+        outfit_id = response.json().get('id')
+        self._call(
+            'feedback', 'POST', f'/api/users/{self.user_id}/feedback',
+            json={'outfit_id': outfit_id, 'feedback': self.rng.choice(['liked', 'disliked'])},
+        )
+
+
+def run(base_url, users, duration, items, timeout, seed):
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+
+    def worker(index):
+        vu = VirtualUser(base_url, recorder, random.Random(seed + index), items, timeout)
+        if not vu.setup():
+            return
+        while time.monotonic() < deadline:
+            vu.iterate()
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder.summary(time.monotonic() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Drive StyleSync user flows under load.')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users.')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of generate/feedback traffic.')
+    parser.add_argument('--items', type=int, default=6, help='Images uploaded per user.')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON.')
+    args = parser.parse_args(argv)
+
+    summary = run(args.base_url, args.users, args.duration, args.items, args.timeout, args.seed)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+
+    print(f"{'step':<10} {'count':>7} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for step in ('signup', 'upload', 'generate', 'feedback'):
+        row = summary.get(step)
+        if not row:
+            continue
+        print(f"{step:<10} {row['count']:>7} {row['errors']:>7} {row['rps']:>8.2f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
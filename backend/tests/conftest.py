@@ -0,0 +1,43 @@
+import os
+import sys
+import uuid
+import tempfile
+
+import pytest
+
+# Run from any directory: the app package lives in backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Config reads the environment at import time, so point it at throwaway storage first
+_workdir = tempfile.mkdtemp(prefix='stylesync-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ['UPLOAD_FOLDER'] = os.path.join(_workdir, 'uploads')
+os.environ['FEEDBACK_DATA_DIR'] = os.path.join(_workdir, 'feedback_data')
+os.environ['PREFERENCE_MODEL_DIR'] = os.path.join(_workdir, 'preference_models')
+os.environ['STORAGE_BACKEND'] = 'memory'
+os.environ['OLLAMA_BASE_URL'] = 'http://127.0.0.1:9'  # closed port: LLM calls fail fast
+os.environ['OPENWEATHER_API_KEY'] = ''
+os.environ['PROFILE_TOKEN'] = ''
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    app = create_app('production')
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(client):
+    """A fresh user as (user_id, auth headers)."""
+    response = client.post('/api/signup', json={
+        'username': f'user-{uuid.uuid4().hex[:12]}', 'password': 'secret-password',
+    })
+    data = response.get_json()
+    return data['userId'], {'Authorization': f"Bearer {data['token']}"}
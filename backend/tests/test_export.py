@@ -0,0 +1,80 @@
+"""Columnar export of training signals."""
+
+import os
+import json
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models.outfit import Outfit
+from app.models.feedback import TrainingSignal
+from app.services.export_service import ExportService, read_export, read_manifest
+
+
+def _add_signals(user_id, count, created_at):
+    outfit = Outfit(user_id=user_id, occasion='casual')
+    db.session.add(outfit)
+    db.session.flush()
+    for i in range(count):
+        db.session.add(TrainingSignal(
+            user_id=user_id, outfit_id=outfit.id, reaction='liked' if i % 2 else 'disliked',
+            color_combination=json.dumps({'top_colors': ['#c81e1e'], 'bottom_colors': ['#1c1ccc']}),
+            style_combination='casual+casual', occasion='casual', created_at=created_at,
+        ))
+    db.session.commit()
+
+
+def _exported_rows(directory):
+    return sum(len(part['liked']) for part in read_export(directory))
+
+
+def test_export_appends_past_the_watermark(app, user, tmp_path):
+    directory = str(tmp_path / 'signals')
+    settled = datetime.utcnow() - timedelta(hours=1)
+    with app.app_context():
+        _add_signals(user[0], 5, settled)
+        first, error = ExportService.export_training_signals(directory, chunk_size=2, fmt='npz')
+        assert error is None
+        _add_signals(user[0], 3, settled + timedelta(minutes=1))
+        second, error = ExportService.export_training_signals(directory, chunk_size=2)
+
+    assert second['rows'] == 3
+    assert second['total_rows'] == first['rows'] + 3
+    assert _exported_rows(directory) == second['total_rows']
+
+
+def test_signal_committed_behind_an_exported_one_is_still_exported(app, user, tmp_path):
+    directory = str(tmp_path / 'signals')
+    settle = timedelta(seconds=app.config['SIGNAL_SETTLE_SECONDS'])
+    now = datetime.utcnow() + timedelta(days=1)  # past anything other tests wrote
+    with app.app_context():
+        ExportService.export_training_signals(directory, fmt='npz', now=now - 2 * settle)
+        _add_signals(user[0], 1, now - settle / 10)
+        first, _ = ExportService.export_training_signals(directory, now=now)
+
+        # Stamped before the signal above, but committed after the export
+        _add_signals(user[0], 1, now - settle / 5)
+        second, _ = ExportService.export_training_signals(directory, now=now + 2 * settle)
+
+    assert (first['rows'], second['rows']) == (0, 2)
+
+
+def test_full_export_with_no_rows_leaves_a_readable_manifest(app, tmp_path):
+    directory = str(tmp_path / 'signals')
+    os.makedirs(directory)
+    # An earlier export whose parts --full will delete
+    (tmp_path / 'signals' / 'part-000000.npz').write_bytes(b'stale')
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump({'version': 1, 'format': 'npz', 'max_colors': 3, 'dictionaries': {},
+                   'parts': [{'file': 'part-000000.npz', 'rows': 1, 'watermark': None}],
+                   'rows': 1, 'watermark': None}, f)
+
+    with app.app_context():
+        TrainingSignal.query.delete()
+        db.session.commit()
+        result, error = ExportService.export_training_signals(directory, fmt='npz', full=True)
+
+    assert error is None
+    assert result['total_rows'] == 0
+    assert read_manifest(directory)['parts'] == []
+    assert not os.path.exists(os.path.join(directory, 'part-000000.npz'))
+    assert list(read_export(directory)) == []
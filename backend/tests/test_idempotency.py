@@ -0,0 +1,118 @@
+"""Idempotency keys for outfit generation are honoured across worker processes."""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models.clothing_item import ClothingItem
+from app.models.outfit import Outfit, IdempotencyKey
+from app.services.outfit_service import GenerationCoalescer
+
+WEATHER = {'temperature': 20, 'condition': 'Clear', 'description': 'clear sky', 'city': 'Sofia'}
+
+
+@pytest.fixture
+def wardrobe(app, user):
+    user_id, headers = user
+    with app.app_context():
+        for category, part, colors in (('shirt', 'top', ['#c81e1e']), ('jeans', 'bottom', ['#1c1ccc'])):
+            item = ClothingItem(
+                user_id=user_id, category=category, style='casual',
+                weather_suitability='warm', outfit_part=part,
+            )
+            item.set_dominant_colors(colors)
+            db.session.add(item)
+        db.session.commit()
+    return user_id, headers
+
+
+def _new_worker(app):
+    """Forget per-process state, as a request routed to another worker would."""
+    app.extensions['generation_coalescer'] = GenerationCoalescer()
+
+
+def _generate(client, user_id, headers, key):
+    return client.post(
+        f'/api/users/{user_id}/outfit/generate',
+        json={'occasion': 'casual', 'weather': WEATHER},
+        headers=dict(headers, **{'Idempotency-Key': key}),
+    )
+
+
+def _outfit_count(app, user_id):
+    with app.app_context():
+        return Outfit.query.filter_by(user_id=user_id).count()
+
+
+def test_retry_on_another_worker_returns_the_original_outfit(app, client, wardrobe):
+    user_id, headers = wardrobe
+
+    first = _generate(client, user_id, headers, 'retry-1')
+    _new_worker(app)
+    retry = _generate(client, user_id, headers, 'retry-1')
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json()['id'] == first.get_json()['id']
+    assert _outfit_count(app, user_id) == 1
+
+
+def test_different_keys_generate_separate_outfits(app, client, wardrobe):
+    user_id, headers = wardrobe
+
+    first = _generate(client, user_id, headers, 'key-a')
+    second = _generate(client, user_id, headers, 'key-b')
+
+    assert first.get_json()['id'] != second.get_json()['id']
+    assert _outfit_count(app, user_id) == 2
+
+
+def test_expired_key_generates_again(app, client, wardrobe):
+    user_id, headers = wardrobe
+    first = _generate(client, user_id, headers, 'expiring')
+    with app.app_context():
+        IdempotencyKey.query.filter_by(user_id=user_id).update(
+            {'expires_at': datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.session.commit()
+
+    again = _generate(client, user_id, headers, 'expiring')
+
+    assert again.get_json()['id'] != first.get_json()['id']
+    assert _outfit_count(app, user_id) == 2
+
+
+def test_retry_waits_for_a_generation_in_flight_elsewhere(app, client, wardrobe):
+    user_id, headers = wardrobe
+    with app.app_context():
+        # Another worker has claimed the key and is still generating
+        outfit = Outfit(user_id=user_id, occasion='casual')
+        db.session.add(outfit)
+        db.session.add(IdempotencyKey(
+            user_id=user_id, key='in-flight', expires_at=datetime.utcnow() + timedelta(minutes=2),
+        ))
+        db.session.commit()
+        outfit_id = outfit.id
+
+    def finish():
+        with app.app_context():
+            IdempotencyKey.query.filter_by(user_id=user_id, key='in-flight').update({'outfit_id': outfit_id})
+            db.session.commit()
+
+    timer = threading.Timer(0.5, finish)
+    timer.start()
+    retry = _generate(client, user_id, headers, 'in-flight')
+    timer.join()
+
+    assert retry.status_code == 200
+    assert retry.get_json()['id'] == outfit_id
+    assert _outfit_count(app, user_id) == 1
+
+
+def test_failed_generation_releases_the_key(app, client, user):
+    user_id, headers = user  # empty wardrobe: generation fails
+
+    assert _generate(client, user_id, headers, 'failing').status_code == 422
+    with app.app_context():
+        assert IdempotencyKey.query.filter_by(user_id=user_id).count() == 0
@@ -0,0 +1,57 @@
+"""Validation of outfit generation requests."""
+
+import pytest
+
+
+def _generate(client, user, **body):
+    user_id, headers = user
+    body.setdefault('occasion', 'casual')
+    return client.post(f'/api/users/{user_id}/outfit/generate', json=body, headers=headers)
+
+
+@pytest.mark.parametrize('weather, message', [
+    ('hot', 'weather must be an object'),
+    ([18], 'weather must be an object'),
+    ({'temperature': '18'}, 'weather temperature must be a number'),
+    ({'temp': None}, 'weather temp must be a number'),
+    ({'temperature': True}, 'weather temperature must be a number'),
+])
+def test_malformed_weather_is_rejected(client, user, weather, message):
+    response = _generate(client, user, weather=weather)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == message
+
+
+@pytest.mark.parametrize('city', [123, ['Sofia'], {'name': 'Sofia'}])
+def test_non_string_city_is_rejected(client, user, city):
+    response = _generate(client, user, city=city)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'city must be a string'
+
+
+def test_non_numeric_coordinates_are_rejected(client, user):
+    response = _generate(client, user, lat='north', lon=23.3)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'lat must be a number'
+
+
+@pytest.mark.parametrize('body', [
+    {'weather': {'temperature': 18.5}},
+    {'weather': {'temp': 4}},
+    {'city': 'Sofia'},
+])
+def test_valid_weather_and_city_reach_the_service(client, user, body):
+    # An empty wardrobe gets past validation and fails in the service
+    response = _generate(client, user, **body)
+
+    assert response.status_code == 422
+
+
+def test_unusable_city_is_rejected(client, user):
+    response = _generate(client, user, city='x' * 500)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'city must be 1 to 100 characters'
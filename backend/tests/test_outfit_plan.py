@@ -0,0 +1,41 @@
+"""Validation of outfit plan requests."""
+
+import pytest
+
+
+def _plan(client, user, **body):
+    user_id, headers = user
+    body.setdefault('days', [{'date': '2026-10-20', 'occasion': 'casual'}])
+    return client.post(f'/api/users/{user_id}/outfit/plan', json=body, headers=headers)
+
+
+@pytest.mark.parametrize('weather', [
+    {'temperature': '18'},
+    {'temp': None},
+    {'temperature': True},
+    {'temperature': [18]},
+])
+def test_non_numeric_forecast_temperature_is_rejected(client, user, weather):
+    response = _plan(client, user, days=[{'date': '2026-10-20', 'occasion': 'casual', 'weather': weather}])
+
+    assert response.status_code == 400
+    assert 'must be a number' in response.get_json()['message']
+
+
+@pytest.mark.parametrize('city', [123, ['Sofia'], {'name': 'Sofia'}])
+def test_non_string_city_is_rejected(client, user, city):
+    response = _plan(client, user, city=city)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'city must be a string'
+
+
+def test_valid_forecast_reaches_the_planner(client, user):
+    # An empty wardrobe gets past validation and fails in the service
+    response = _plan(client, user, city='Sofia', days=[
+        {'date': '2026-10-20', 'occasion': 'casual', 'weather': {'temperature': 18.5}},
+        {'date': '2026-10-21', 'occasion': 'work', 'weather': {'temp': 4}},
+        {'date': '2026-10-22', 'occasion': 'gym'},
+    ])
+
+    assert response.status_code == 422
@@ -0,0 +1,174 @@
+"""Feedback is rolled up as it is written, so reads only fold in recent signals."""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models.clothing_item import ClothingItem
+from app.models.outfit import Outfit
+from app.models.feedback import TrainingSignal, PreferenceRollup, PreferenceRollupCursor
+from app.agents.feedback_agent import FeedbackAgent
+
+
+@pytest.fixture
+def outfits(app, user):
+    user_id, headers = user
+    with app.app_context():
+        ids = []
+        for style in ('casual', 'formal'):
+            top = ClothingItem(user_id=user_id, category='shirt', style=style,
+                               weather_suitability='warm', outfit_part='top')
+            bottom = ClothingItem(user_id=user_id, category='jeans', style=style,
+                                  weather_suitability='warm', outfit_part='bottom')
+            top.set_dominant_colors(['#c81e1e'])
+            bottom.set_dominant_colors(['#1c1ccc'])
+            db.session.add_all([top, bottom])
+            db.session.flush()
+            outfit = Outfit(user_id=user_id, top_item_id=top.id, bottom_item_id=bottom.id, occasion='casual')
+            db.session.add(outfit)
+            db.session.flush()
+            ids.append(outfit.id)
+        db.session.commit()
+    return user_id, headers, ids
+
+
+def _add_signal(user_id, outfit_id, style, created_at, reaction='liked'):
+    db.session.add(TrainingSignal(
+        user_id=user_id, outfit_id=outfit_id, reaction=reaction, occasion='casual',
+        style_combination=f'{style}+{style}',
+        color_combination=json.dumps({'top_colors': ['#c81e1e'], 'bottom_colors': ['#1c1ccc']}),
+        created_at=created_at,
+    ))
+
+
+def _pending(app, user_id):
+    with app.app_context():
+        cursor = db.session.get(PreferenceRollupCursor, user_id)
+        return FeedbackAgent._signals_since(user_id, cursor, datetime.utcnow()).count()
+
+
+def _rollups(user_id):
+    return {(r.reaction, r.get_combination()['top_style']): r.weight
+            for r in PreferenceRollup.query.filter_by(user_id=user_id)}
+
+
+def test_settled_feedback_is_rolled_up_when_feedback_is_written(app, client, outfits):
+    user_id, headers, (casual, formal) = outfits
+    settle = timedelta(seconds=app.config['SIGNAL_SETTLE_SECONDS'])
+
+    client.post(f'/api/users/{user_id}/feedback', json={'outfit_id': casual, 'feedback': 'liked'}, headers=headers)
+    assert _pending(app, user_id) == 1
+    with app.app_context():
+        for signal in TrainingSignal.query.filter_by(user_id=user_id):
+            signal.created_at -= 2 * settle
+        db.session.commit()
+
+    client.post(f'/api/users/{user_id}/feedback/batch', json={'reactions': [
+        {'outfit_id': casual, 'feedback': 'liked'}, {'outfit_id': formal, 'feedback': 'disliked'},
+    ]}, headers=headers)
+
+    # The settled swipe was folded in with the batch; the batch itself is still settling
+    assert _pending(app, user_id) == 2
+    with app.app_context():
+        assert _rollups(user_id) == {('liked', 'casual'): pytest.approx(1, abs=1e-3)}
+        preferences = FeedbackAgent(app.config).get_user_preferences(user_id)
+    liked, = preferences['liked_combinations']
+    assert (liked['top_style'], liked['bottom_style']) == ('casual', 'casual')
+    assert liked['weight'] == pytest.approx(2, abs=1e-3)
+    assert len(preferences['disliked_combinations']) == 1
+
+
+def test_signal_committed_behind_a_later_one_is_still_rolled_up(app, outfits):
+    user_id, _, (casual, _) = outfits
+    fa = FeedbackAgent(app.config)
+    now = datetime.utcnow()
+    with app.app_context():
+        _add_signal(user_id, casual, 'casual', now - 2 * fa.settle)
+        _add_signal(user_id, casual, 'casual', now - fa.settle / 10)
+        db.session.commit()
+        assert fa.rollup_user(user_id, now) == 1
+        db.session.commit()
+
+        # Timestamped before the second signal, but committed after the rollup above
+        _add_signal(user_id, casual, 'casual', now - fa.settle / 5)
+        db.session.commit()
+        assert fa.rollup_user(user_id, now + 2 * fa.settle) == 2
+        db.session.commit()
+
+        assert sum(_rollups(user_id).values()) == pytest.approx(3, abs=1e-3)
+
+
+def test_rollup_only_writes_the_combinations_it_folds_into(app, outfits):
+    user_id, _, (casual, formal) = outfits
+    fa = FeedbackAgent(app.config)
+    now = datetime.utcnow()
+    with app.app_context():
+        _add_signal(user_id, casual, 'casual', now - timedelta(days=30))
+        _add_signal(user_id, formal, 'formal', now - timedelta(days=30), reaction='disliked')
+        db.session.commit()
+        fa.rollup_user(user_id, now - timedelta(days=1))
+        db.session.commit()
+        before = _rollups(user_id)
+        as_of = db.session.get(PreferenceRollupCursor, user_id).as_of
+
+        _add_signal(user_id, casual, 'casual', now - 2 * fa.settle)
+        db.session.commit()
+        assert fa.rollup_user(user_id, now) == 1
+        db.session.commit()
+
+        after = _rollups(user_id)
+        assert db.session.get(PreferenceRollupCursor, user_id, populate_existing=True).as_of == as_of
+        assert after[('disliked', 'formal')] == before[('disliked', 'formal')]
+        assert after[('liked', 'casual')] > before[('liked', 'casual')] + 1
+
+        # Weights are decayed when read
+        preferences = fa.get_user_preferences(user_id, now)
+    disliked, = preferences['disliked_combinations']
+    assert disliked['weight'] == pytest.approx(0.5 ** (30 / app.config['PREFERENCE_HALF_LIFE_DAYS']), abs=1e-3)
+
+
+def test_rollups_are_rebased_and_pruned_after_many_half_lives(app, outfits):
+    user_id, _, (casual, formal) = outfits
+    fa = FeedbackAgent(app.config)
+    half_life = timedelta(days=app.config['PREFERENCE_HALF_LIFE_DAYS'])
+    start = datetime.utcnow() - 10 * half_life
+    with app.app_context():
+        _add_signal(user_id, formal, 'formal', start)
+        db.session.commit()
+        fa.rollup_user(user_id, start + timedelta(days=1))
+        db.session.commit()
+
+        _add_signal(user_id, casual, 'casual', datetime.utcnow() - 2 * fa.settle)
+        db.session.commit()
+        fa.rollup_user(user_id)
+        db.session.commit()
+
+        assert db.session.get(PreferenceRollupCursor, user_id, populate_existing=True).as_of > start + 9 * half_life
+        assert _rollups(user_id) == {('liked', 'casual'): pytest.approx(1, abs=1e-3)}
+
+
+def test_history_from_before_rollups_is_folded_once_on_read(app, outfits):
+    user_id, _, (casual, _) = outfits
+    with app.app_context():
+        for _ in range(3):
+            _add_signal(user_id, casual, 'casual', datetime.utcnow() - timedelta(hours=1))
+        db.session.commit()
+    assert _pending(app, user_id) == 3
+
+    with app.app_context():
+        preferences = FeedbackAgent(app.config).get_user_preferences(user_id)
+
+    assert preferences['liked_combinations'][0]['weight'] == pytest.approx(3, abs=1e-3)
+    assert _pending(app, user_id) == 0
+
+
+def test_user_without_feedback_gets_empty_preferences(app, user):
+    user_id, _ = user
+    with app.app_context():
+        preferences = FeedbackAgent(app.config).get_user_preferences(user_id)
+        assert db.session.get(PreferenceRollupCursor, user_id) is None
+
+    assert preferences['liked_combinations'] == []
+    assert preferences['disliked_combinations'] == []
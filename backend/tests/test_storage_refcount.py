@@ -0,0 +1,172 @@
+"""Blob reference counting under concurrent uploads and rolled-back deletes."""
+
+import io
+import time
+import uuid
+import threading
+
+from app.extensions import db
+from app.models.stored_blob import StoredBlob
+from app.services.storage_service import StorageService
+from app.storage import get_storage
+
+
+def _key():
+    digest = uuid.uuid4().hex * 2
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+
+
+def _ref_count(key):
+    blob = db.session.get(StoredBlob, key, populate_existing=True)
+    return blob.ref_count if blob else None
+
+
+def test_concurrent_first_uploads_both_count(app):
+    key = _key()
+    barrier = threading.Barrier(2)
+    errors = []
+
+    def upload():
+        with app.app_context():
+            try:
+                barrier.wait(5)
+                StorageService.acquire(key, 10)
+                db.session.commit()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=upload) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert errors == []
+    with app.app_context():
+        assert _ref_count(key) == 2
+
+
+def test_acquire_increments_an_existing_blob(app):
+    key = _key()
+    with app.app_context():
+        StorageService.acquire(key, 10)
+        db.session.commit()
+        StorageService.acquire(key, 10)
+        db.session.commit()
+        assert _ref_count(key) == 2
+
+
+def test_rolled_back_release_keeps_the_file(app):
+    key = _key()
+    with app.app_context():
+        get_storage().save(key, io.BytesIO(b'image'))
+        StorageService.acquire(key, 5)
+        db.session.commit()
+
+        released = StorageService.release(key)
+        assert released == [key]
+        db.session.rollback()
+
+        assert get_storage().exists(key)
+        assert _ref_count(key) == 1
+
+
+def test_committed_release_deletes_the_files(app):
+    key = _key()
+    variant = key.replace('.jpg', '_thumb.webp')
+    with app.app_context():
+        storage = get_storage()
+        storage.save(key, io.BytesIO(b'image'))
+        storage.save(variant, io.BytesIO(b'thumb'))
+        StorageService.acquire(key, 5)
+        db.session.commit()
+
+        released = StorageService.release(key, [variant])
+        db.session.commit()
+        StorageService.delete_files(released)
+
+        assert not storage.exists(key)
+        assert not storage.exists(variant)
+        assert _ref_count(key) is None
+
+
+def test_shared_blob_survives_one_release(app):
+    key = _key()
+    with app.app_context():
+        get_storage().save(key, io.BytesIO(b'image'))
+        StorageService.acquire(key, 5)
+        StorageService.acquire(key, 5)
+        db.session.commit()
+
+        assert StorageService.release(key) == []
+        db.session.commit()
+
+        assert get_storage().exists(key)
+        assert _ref_count(key) == 1
+
+
+def test_reupload_before_delete_keeps_the_file(app):
+    content = uuid.uuid4().bytes
+    with app.app_context():
+        (key, _), _ = StorageService.store_upload(io.BytesIO(content))
+        db.session.commit()
+        released = StorageService.release(key)
+        db.session.commit()
+
+        # The same image is uploaded again before the deleting request gets to its files
+        (again, is_new), _ = StorageService.store_upload(io.BytesIO(content))
+        db.session.commit()
+        StorageService.delete_files(released)
+
+        assert (again, is_new) == (key, False)
+        assert get_storage().exists(key)
+        assert _ref_count(key) == 1
+
+
+def test_upload_after_delete_writes_the_file_again(app):
+    content = uuid.uuid4().bytes
+    with app.app_context():
+        (key, _), _ = StorageService.store_upload(io.BytesIO(content))
+        db.session.commit()
+        released = StorageService.release(key)
+        db.session.commit()
+        StorageService.delete_files(released)
+        assert not get_storage().exists(key)
+
+        (again, is_new), _ = StorageService.store_upload(io.BytesIO(content))
+        db.session.commit()
+
+        assert (again, is_new) == (key, True)
+        assert get_storage().exists(key)
+        assert _ref_count(key) == 1
+
+
+def test_delete_waits_for_an_uncommitted_reupload(app):
+    content = uuid.uuid4().bytes
+    with app.app_context():
+        (key, _), _ = StorageService.store_upload(io.BytesIO(content))
+        db.session.commit()
+        released = StorageService.release(key)
+        db.session.commit()
+
+    acquired = threading.Event()
+    results = []
+
+    def reupload():
+        with app.app_context():
+            results.append(StorageService.store_upload(io.BytesIO(content)))
+            acquired.set()
+            time.sleep(0.5)  # still uncommitted while the delete below starts
+            db.session.commit()
+
+    thread = threading.Thread(target=reupload)
+    thread.start()
+    assert acquired.wait(5)
+    with app.app_context():
+        StorageService.delete_files(released)
+    thread.join(10)
+
+    assert results == [((key, False), None)]
+    with app.app_context():
+        assert get_storage().exists(key)
+        assert _ref_count(key) == 1
@@ -0,0 +1,73 @@
+"""Upload validation by image header."""
+
+import io
+import hmac
+import hashlib
+
+from PIL import Image
+
+
+def _image(fmt, frames=((200, 30, 30),), size=(64, 48)):
+    buf = io.BytesIO()
+    first, *rest = [Image.new('RGB', size, color) for color in frames]
+    if rest:
+        first.save(buf, fmt, save_all=True, append_images=rest)
+    else:
+        first.save(buf, fmt)
+    buf.seek(0)
+    return buf
+
+
+def _upload(client, user, image, filename):
+    user_id, headers = user
+    return client.post(
+        f'/api/users/{user_id}/wardrobe',
+        data={
+            'category': 'shirt', 'style': 'casual', 'weather': 'warm', 'outfit_part': 'top',
+            'image': (image, filename),
+        },
+        headers=headers,
+        content_type='multipart/form-data',
+    )
+
+
+def test_phone_mpo_jpeg_is_accepted_from_its_first_frame(client, user):
+    # Red primary image followed by a blue second frame, as phones write them
+    response = _upload(client, user, _image('MPO', frames=((200, 30, 30), (30, 30, 200))), 'phone.jpg')
+
+    assert response.status_code == 201
+    item = response.get_json()
+    assert item['image_url'].endswith('.jpg')
+    assert item['image_variants']
+    red, green, blue = (int(item['dominant_colors'][0][i:i + 2], 16) for i in (1, 3, 5))
+    assert red > 150 and blue < 80
+
+
+def test_jpeg_and_png_are_accepted(client, user):
+    assert _upload(client, user, _image('JPEG'), 'photo.jpg').status_code == 201
+    assert _upload(client, user, _image('PNG'), 'photo.png').status_code == 201
+
+
+def test_unsupported_format_is_rejected(client, user):
+    response = _upload(client, user, _image('BMP'), 'photo.png')
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Unsupported image format: BMP'
+
+
+def test_non_image_is_rejected(client, user):
+    response = _upload(client, user, io.BytesIO(b'not an image'), 'photo.jpg')
+
+    assert response.status_code == 400
+
+
+def test_upload_name_is_keyed_not_the_plain_content_hash(app, client, user):
+    image = _image('PNG', frames=((12, 34, 56),)).getvalue()
+
+    first = _upload(client, user, io.BytesIO(image), 'photo.png').get_json()
+    second = _upload(client, user, io.BytesIO(image), 'photo.png').get_json()
+
+    name = first['image_url'].rsplit('/', 1)[-1]
+    assert second['image_url'] == first['image_url']
+    assert name != f"{hashlib.sha256(image).hexdigest()}.png"
+    assert name == f"{hmac.new(app.config['UPLOAD_KEY_SECRET'].encode(), image, hashlib.sha256).hexdigest()}.png"
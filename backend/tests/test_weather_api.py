@@ -0,0 +1,34 @@
+"""Access and location validation for the weather endpoints."""
+
+import pytest
+
+
+def test_weather_requires_sign_in(client):
+    assert client.get('/api/weather').status_code == 401
+    assert client.get('/api/weather/stats').status_code == 401
+
+
+def test_signed_in_user_gets_weather(client, user):
+    _, headers = user
+
+    response = client.get('/api/weather?city=%20Saint-%C3%89tienne%20', headers=headers)
+
+    assert response.status_code == 200
+    assert response.get_json()['city'] == 'Saint-Étienne'
+
+
+@pytest.mark.parametrize('query, message', [
+    ('city=' + 'a' * 101, 'city must be 1 to 100 characters'),
+    ('city=%20', 'city must be 1 to 100 characters'),
+    ('city=Sofia%3Bdrop', 'city may only contain letters, spaces, hyphens, apostrophes, periods and commas'),
+    ('lat=north&lon=23.3', 'lat must be a number'),
+    ('lat=91&lon=23.3', 'lat must be between -90 and 90'),
+    ('lat=42.7&lon=nan', 'lon must be between -180 and 180'),
+])
+def test_invalid_location_is_rejected(client, user, query, message):
+    _, headers = user
+
+    response = client.get(f'/api/weather?{query}', headers=headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == message
@@ -0,0 +1,195 @@
+"""WeatherCache and OpenWeatherClient against a local OpenWeatherMap stand-in."""
+
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from app.services.weather_service import OpenWeatherClient, WeatherCache
+
+
+class _StubUpstream:
+    """Serves ``GET /weather``; counts requests and can hold them on a gate."""
+
+    def __init__(self):
+        self.requests = 0
+        self.gate = threading.Event()
+        self.gate.set()
+        self.temperature = 18.0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != '/data/2.5/weather':
+                    self.send_error(404)
+                    return
+                with stub.lock:
+                    stub.requests += 1
+                stub.gate.wait(5)
+                city = parse_qs(url.query).get('q', ['Nowhere'])[0]
+                body = json.dumps({
+                    'name': city,
+                    'main': {'temp': stub.temperature, 'humidity': 60},
+                    'weather': [{'main': 'Clear', 'description': 'clear sky'}],
+                    'wind': {'speed': 3.0},
+                }).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/data/2.5"
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.gate.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def upstream():
+    with _StubUpstream() as stub:
+        yield stub
+
+
+@pytest.fixture
+def client(upstream):
+    return OpenWeatherClient('test-key', upstream.base_url, timeout=5)
+
+
+def _wait_for(predicate, timeout=5):
+    """Poll until predicate() holds; background refreshes update stats asynchronously."""
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def _expire(cache, key, seconds):
+    """Age a cached entry by `seconds`."""
+    data, fetched_at = cache._entries[key]
+    cache._entries[key] = (data, fetched_at - seconds)
+
+
+def test_client_parses_current_weather(client):
+    weather = client.fetch({'city': 'Sofia'})
+    assert weather == {
+        'temperature': 18.0,
+        'condition': 'Clear',
+        'description': 'clear sky',
+        'city': 'Sofia',
+        'humidity': 60,
+        'wind_speed': 3.0,
+    }
+
+
+def test_fresh_entry_is_served_from_cache(upstream, client):
+    cache = WeatherCache(client.fetch, ttl=600, stale_ttl=3600)
+
+    first = cache.get('city:sofia', {'city': 'Sofia'})
+    second = cache.get('city:sofia', {'city': 'Sofia'})
+
+    assert first == second
+    assert upstream.requests == 1
+    stats = cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+    assert stats['upstream_requests'] == 1
+    assert stats['entries'] == 1
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(upstream, client):
+    cache = WeatherCache(client.fetch, ttl=600, stale_ttl=3600)
+    cache.get('city:sofia', {'city': 'Sofia'})
+    _expire(cache, 'city:sofia', 700)
+
+    upstream.temperature = 25.0
+    upstream.gate.clear()
+    stale = [cache.get('city:sofia', {'city': 'Sofia'}) for _ in range(5)]
+
+    # Served immediately from the old entry, with a single refresh in flight
+    assert all(weather['temperature'] == 18.0 for weather in stale)
+    assert cache.stats()['stale_hits'] == 5
+    assert _wait_for(lambda: upstream.requests == 2)
+    assert cache.stats()['refreshes'] == 1
+
+    upstream.gate.set()
+    assert _wait_for(lambda: cache.stats()['upstream_requests'] == 2)
+    assert upstream.requests == 2
+    assert cache.get('city:sofia', {'city': 'Sofia'})['temperature'] == 25.0
+
+
+def test_concurrent_misses_share_one_upstream_call(upstream, client):
+    cache = WeatherCache(client.fetch, ttl=600, stale_ttl=3600)
+    upstream.gate.clear()
+    results = []
+
+    def lookup():
+        results.append(cache.get('city:sofia', {'city': 'Sofia'}))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    assert _wait_for(lambda: cache.stats()['misses'] == 8)
+    upstream.gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert upstream.requests == 1
+    assert len(results) == 8
+    assert all(weather['city'] == 'Sofia' for weather in results)
+    stats = cache.stats()
+    assert stats['misses'] == 8
+    assert stats['coalesced'] == 7
+    assert stats['upstream_requests'] == 1
+
+
+def test_upstream_failure_counts_an_error(client):
+    failing = OpenWeatherClient('test-key', client.base_url.replace('/data/2.5', '/missing'), timeout=5)
+    cache = WeatherCache(failing.fetch, ttl=600, stale_ttl=3600)
+
+    assert cache.get('city:sofia', {'city': 'Sofia'}) is None
+    stats = cache.stats()
+    assert stats['misses'] == 1
+    assert stats['errors'] == 1
+    assert stats['entries'] == 0
+
+
+def test_least_recently_used_location_is_evicted(upstream, client):
+    cache = WeatherCache(client.fetch, ttl=600, stale_ttl=3600, max_entries=2)
+    cache.get('city:sofia', {'city': 'Sofia'})
+    cache.get('city:plovdiv', {'city': 'Plovdiv'})
+    cache.get('city:sofia', {'city': 'Sofia'})
+    cache.get('city:varna', {'city': 'Varna'})
+
+    assert list(cache._entries) == ['city:sofia', 'city:varna']
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 2
+
+
+def test_entry_past_the_stale_window_is_dropped(upstream, client):
+    failing = OpenWeatherClient('test-key', client.base_url.replace('/data/2.5', '/missing'), timeout=5)
+    cache = WeatherCache(client.fetch, ttl=600, stale_ttl=3600)
+    cache.get('city:sofia', {'city': 'Sofia'})
+    _expire(cache, 'city:sofia', 5000)
+    cache._fetcher = failing.fetch
+
+    # The expired entry still beats no data when the upstream fails, but is not kept
+    assert cache.get('city:sofia', {'city': 'Sofia'})['city'] == 'Sofia'
+    assert cache.stats()['entries'] == 0
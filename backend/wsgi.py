@@ -0,0 +1,16 @@
+"""Production WSGI entry point for the StyleSync Flask backend.
+
+Used by gunicorn (see gunicorn.conf.py). With preload_app enabled this module
+is imported once in the master process, so the app and the shared vision
+model are loaded before workers fork and their memory is shared copy-on-write.
+"""
+
+import os
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import create_app
+from app.warmup import warm_up
+
+app = create_app(os.environ.get('FLASK_ENV', 'production'))
+warm_up(app)
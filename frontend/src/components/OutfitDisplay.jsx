@@ -50,7 +50,7 @@ const OutfitDisplay = ({ outfit, onFeedback, onSave }) => {
           <div className="aspect-square bg-soft-grey rounded-lg overflow-hidden mb-4">
             {top?.image_url || top?.imageUrl ? (
               <img
-                src={top.image_url || top.imageUrl}
+                src={top.image_variants?.medium || top.image_url || top.imageUrl}
                 alt={top.category || 'Top'}
                 className="w-full h-full object-cover"
               />
@@ -72,7 +72,7 @@ const OutfitDisplay = ({ outfit, onFeedback, onSave }) => {
           <div className="aspect-square bg-soft-grey rounded-lg overflow-hidden mb-4">
             {bottom?.image_url || bottom?.imageUrl ? (
               <img
-                src={bottom.image_url || bottom.imageUrl}
+                src={bottom.image_variants?.medium || bottom.image_url || bottom.imageUrl}
                 alt={bottom.category || 'Bottom'}
                 className="w-full h-full object-cover"
               />
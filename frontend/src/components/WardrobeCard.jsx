@@ -33,7 +33,14 @@ const WardrobeCard = ({ item, onDelete, isLoading }) => {
               </div>
             ) : (
               <img
-                src={item.image_url || item.imageUrl || '/placeholder-clothing.jpg'}
+                src={item.image_variants?.medium || item.image_url || item.imageUrl || '/placeholder-clothing.jpg'}
+                srcSet={
+                  item.image_variants?.thumb && item.image_variants?.medium
+                    ? `${item.image_variants.thumb} 256w, ${item.image_variants.medium} 768w`
+                    : undefined
+                }
+                sizes="(min-width: 1024px) 25vw, (min-width: 640px) 33vw, 50vw"
+                loading="lazy"
                 alt={item.category || 'Clothing item'}
                 className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
                 onError={() => setImageError(true)}
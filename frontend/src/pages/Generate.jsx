@@ -20,16 +20,12 @@ const Generate = () => {
       return;
     }
 
-    if (!weather) {
-      setError('Weather data not available. Please wait...');
-      return;
-    }
-
     setError('');
     setIsGenerating(true);
     setGeneratedOutfit(null);
 
     try {
+      // Weather is optional: the backend resolves it from its shared cache
       const response = await outfitAPI.generateOutfit(user.userId, occasion, weather);
       setGeneratedOutfit(response);
     } catch (err) {
@@ -127,7 +123,7 @@ const Generate = () => {
 
               <button
                 onClick={handleGenerate}
-                disabled={isGenerating || !occasion || weatherLoading}
+                disabled={isGenerating || !occasion}
                 className="w-full btn-primary disabled:opacity-50 disabled:cursor-not-allowed flex items-center justify-center space-x-2"
               >
                 {isGenerating ? (
@@ -106,7 +106,8 @@ const Saved = () => {
                   <div className="aspect-square bg-soft-grey rounded-lg overflow-hidden">
                     {top?.image_url || top?.imageUrl ? (
                       <img
-                        src={top.image_url || top.imageUrl}
+                        src={top.image_variants?.thumb || top.image_url || top.imageUrl}
+                        loading="lazy"
                         alt={top.category || 'Top'}
                         className="w-full h-full object-cover"
                       />
@@ -120,7 +121,8 @@ const Saved = () => {
                   <div className="aspect-square bg-soft-grey rounded-lg overflow-hidden">
                     {bottom?.image_url || bottom?.imageUrl ? (
                       <img
-                        src={bottom.image_url || bottom.imageUrl}
+                        src={bottom.image_variants?.thumb || bottom.image_url || bottom.imageUrl}
+                        loading="lazy"
                         alt={bottom.category || 'Bottom'}
                         className="w-full h-full object-cover"
                       />
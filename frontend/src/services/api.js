@@ -94,7 +94,7 @@ export const outfitAPI = {
   generateOutfit: async (userId, occasion, weatherData) => {
     const response = await api.post(`/api/users/${userId}/outfit/generate`, {
       occasion,
-      weather: weatherData,
+      ...(weatherData ? { weather: weatherData } : {}),
     });
     return response.data;
   },